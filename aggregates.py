@@ -0,0 +1,123 @@
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+import pandas as pd
+from parallel_aggregates import PARALLEL_MIN_ROWS, ParallelAggregator
+from utils import to_day, days_to_datetime64
+
+# --- CONFIGURATION ---
+CACHE_SIZE = 64              # Periods kept in the aggregate cache
+
+# Per-period aggregates, the Series are sorted by minutes descending
+Summary = namedtuple('Summary', ['apps', 'categories', 'total', 'period_total', 'rows'])
+
+# One page of a ranking plus what is left after it
+RankedPage = namedtuple('RankedPage', ['items', 'remainder', 'remaining', 'total'])
+
+
+def get_date_range(date, span):
+    """Get start and end dates for the selected time span"""
+    if span == "Day":
+        return date, date
+    elif span == "Week":
+        start = date - timedelta(days=date.weekday())
+        end = start + timedelta(days=6)
+    elif span == "Month":
+        start = date.replace(day=1)
+        if date.month == 12:
+            end = date.replace(year=date.year + 1, month=1, day=1) - timedelta(days=1)
+        else:
+            end = date.replace(month=date.month + 1, day=1) - timedelta(days=1)
+    else:  # Year
+        start = date.replace(month=1, day=1)
+        end = date.replace(month=12, day=31)
+    return start, end
+
+
+def frame_from_columns(columns):
+    """Visualizer DataFrame of an EntryColumns, the name columns share one string object per name"""
+    entries, app_names, category_names = columns
+    return pd.DataFrame({
+        "App Name": app_names[entries['app']],
+        "Category Name": category_names[entries['category']],
+        "Time Spent": entries['minutes'],
+        "Date": days_to_datetime64(entries['day']),
+    })
+
+
+def _ranked(frame, column):
+    """Non-zero totals sorted descending, ties by name, as ParallelAggregator.ranked"""
+    summary = frame.groupby(column, observed=True)["Time Spent"].sum().astype(int)
+    return summary[summary > 0].sort_values(ascending=False, kind='stable')
+
+
+def summarize(df, start_date, end_date, category=None):
+    """Aggregate a visualizer DataFrame over a period, optionally for one category"""
+    period = df[(df["Date"] >= start_date) & (df["Date"] <= end_date)]
+    categories = _ranked(period, "Category Name")
+    period_total = int(categories.sum())
+    if category:
+        period = period[period["Category Name"] == category]
+        apps = _ranked(period, "App Name")
+        total = int(apps.sum())
+    else:
+        apps = _ranked(period, "App Name")
+        total = period_total
+    return Summary(apps, categories, total, period_total, len(period))
+
+
+def rank_page(series, offset, limit):
+    """Page of a sorted summary Series, with the remainder after it"""
+    end = offset + limit
+    values = series.to_numpy()
+    items = list(zip(series.index[offset:end], values[offset:end].tolist()))
+    return RankedPage(items, int(values[end:].sum()), max(len(values) - end, 0), int(values.sum()))
+
+
+def summarize_parallel(engine, start_date, end_date, category=None):
+    """Same as summarize() using the partitioned engine"""
+    code = None
+    if category:
+        # An unknown category matches no rows
+        code = engine.category_names.index(category) if category in engine.category_names else -1
+    app_totals, category_totals, rows = engine.aggregate(to_day(start_date), to_day(end_date), code)
+    apps = engine.ranked(app_totals, engine.app_names)
+    categories = engine.ranked(category_totals, engine.category_names)
+    return Summary(apps, categories, int(apps.sum()), int(categories.sum()), rows)
+
+
+class AggregateCache:
+    """Least recently used Summary per (start, end, category)"""
+
+    def __init__(self, df, size=CACHE_SIZE):
+        self.df = df
+        self.size = size
+        self.entries = OrderedDict()
+        # Large inputs are aggregated by the partitioned engine, built on first use
+        self.engine = None
+
+    def get(self, start_date, end_date, category=None):
+        key = (start_date, end_date, category)
+        summary = self.entries.get(key)
+        if summary is None:
+            summary = self.entries[key] = self.summarize(start_date, end_date, category)
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(key)
+        return summary
+
+    def summarize(self, start_date, end_date, category=None):
+        if len(self.df) < PARALLEL_MIN_ROWS:
+            return summarize(self.df, start_date, end_date, category)
+        if self.engine is None:
+            self.engine = ParallelAggregator.from_frame(self.df)
+        return summarize_parallel(self.engine, start_date, end_date, category)
+
+    def clear(self):
+        self.entries.clear()
+
+    def close(self):
+        self.clear()
+        if self.engine is not None:
+            self.engine.close()
+            self.engine = None
@@ -0,0 +1,232 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import queue
+import sqlite3
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+import pandas as pd
+from aggregates import AggregateCache, frame_from_columns, get_date_range, rank_page
+from database import fetch_screen_time_columns, entry_rows, get_db_path, require_schema
+from utils import to_day
+
+# --- CONFIGURATION ---
+API_HOST = '127.0.0.1'       # Local dashboards only
+API_PORT = 8780
+POOL_SIZE = 4                # Read-only connections shared by the request handlers
+RESPONSE_CACHE_SIZE = 256    # Encoded responses kept per data version
+DEFAULT_LIMIT = 10           # Apps and categories listed per summary
+SPANS = ("Day", "Week", "Month", "Year")
+
+STATUS_TEXT = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ReadPool:
+    """Fixed set of read-only connections handed out one request at a time"""
+
+    def __init__(self, db_path, size=POOL_SIZE):
+        self.connections = queue.Queue()
+        for _ in range(size):
+            conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True, check_same_thread=False)
+            self.connections.put(conn)
+        self.size = size
+
+    @contextmanager
+    def connection(self):
+        conn = self.connections.get()
+        try:
+            yield conn
+        finally:
+            self.connections.put(conn)
+
+    def close(self):
+        for _ in range(self.size):
+            self.connections.get().close()
+
+
+class ApiServer:
+    """
+    Serves summaries from an AggregateCache over the whole store. The data
+    is reloaded when another connection commits (PRAGMA data_version), which
+    also starts a new ETag generation; encoded responses are cached per
+    generation, so a repeated query costs a dict lookup.
+    """
+
+    def __init__(self, db_path=None, pool_size=POOL_SIZE):
+        self.pool = ReadPool(db_path or get_db_path(), pool_size)
+        # Polled from the event loop thread, which may not be the creating one
+        self.watch = sqlite3.connect(f'file:{db_path or get_db_path()}?mode=ro', uri=True, check_same_thread=False)
+        self.data_version = None
+        self.generation = 0
+        self.aggregates = None
+        self.responses = OrderedDict()   # request target -> (etag, body)
+        self.reload_lock = asyncio.Lock()
+
+    def load(self):
+        with self.pool.connection() as conn:
+            df = frame_from_columns(fetch_screen_time_columns(conn=conn))
+        if self.aggregates is not None:
+            self.aggregates.close()
+        self.aggregates = AggregateCache(df)
+
+    async def refresh(self):
+        """Reload after an outside write"""
+        version = self.watch.execute('PRAGMA data_version').fetchone()[0]
+        if version == self.data_version:
+            return
+        async with self.reload_lock:
+            if version != self.data_version:
+                await asyncio.get_running_loop().run_in_executor(None, self.load)
+                self.responses.clear()
+                self.generation += 1
+                self.data_version = version
+
+    # Endpoints, each returning a JSON-serializable result
+
+    def get_summary(self, params):
+        span = params.get('span', 'Day').capitalize()
+        if span not in SPANS:
+            raise RequestError(400, f"span must be one of {', '.join(SPANS)}")
+        start, end = get_date_range(parse_date(params.get('date')), span)
+        limit = parse_int(params.get('limit'), DEFAULT_LIMIT)
+        category = params.get('category') or None
+        result = self.aggregates.get(pd.Timestamp(start), pd.Timestamp(end), category)
+        apps, categories = rank_page(result.apps, 0, limit), rank_page(result.categories, 0, limit)
+        return {
+            'span': span, 'start': start.isoformat(), 'end': end.isoformat(), 'category': category,
+            'total': result.total, 'period_total': result.period_total, 'rows': result.rows,
+            'apps': apps.items, 'other_apps': apps.remainder,
+            'categories': categories.items, 'other_categories': categories.remainder,
+        }
+
+    def get_range(self, params):
+        start, end = parse_date(params.get('start')), parse_date(params.get('end'))
+        app, category = params.get('app'), params.get('category')
+        with self.pool.connection() as conn:
+            columns = fetch_screen_time_columns(to_day(start), to_day(end), ordered=True, conn=conn)
+        dates = np.datetime_as_string(columns.entries['day'].astype('datetime64[D]'))
+        return [{'app': row_app, 'category': row_category, 'minutes': minutes, 'date': day}
+                for row_app, row_category, minutes, day in entry_rows(columns, dates)
+                if (app is None or row_app == app) and (category is None or row_category == category)]
+
+    ROUTES = {'/summary': get_summary, '/range': get_range}
+
+    async def respond(self, method, target, headers):
+        """(status, headers, body) of one request"""
+        if method != 'GET':
+            raise RequestError(405, "Only GET is supported")
+        await self.refresh()
+        cached = self.responses.get(target)
+        if cached is None:
+            url = urlsplit(target)
+            handler = self.ROUTES.get(url.path)
+            if handler is None:
+                raise RequestError(404, f"No endpoint {url.path}")
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            result = await asyncio.get_running_loop().run_in_executor(None, handler, self, params)
+            body = json.dumps(result, separators=(',', ':')).encode()
+            etag = f'"{self.generation}-{hashlib.sha1(body).hexdigest()[:16]}"'
+            cached = self.responses[target] = (etag, body)
+            if len(self.responses) > RESPONSE_CACHE_SIZE:
+                self.responses.popitem(last=False)
+        else:
+            self.responses.move_to_end(target)
+        etag, body = cached
+        if etag in headers.get('if-none-match', ''):
+            return 304, {'ETag': etag}, b''
+        return 200, {'ETag': etag, 'Content-Type': 'application/json'}, body
+
+    async def handle(self, reader, writer):
+        """One HTTP/1.1 connection, kept alive between requests"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    status, extra, body = await self.respond(method, target, headers)
+                except RequestError as e:
+                    status, extra, body = e.status, {'Content-Type': 'application/json'}, json.dumps({'error': str(e)}).encode()
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                head = [f'HTTP/1.1 {status} {STATUS_TEXT[status]}', f'Content-Length: {len(body)}',
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                head += [f'{name}: {value}' for name, value in extra.items()]
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=API_HOST, port=API_PORT, ready=None):
+        await self.refresh()
+        server = await asyncio.start_server(self.handle, host, port)
+        if ready is not None:
+            ready.set()
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.close()
+        self.watch.close()
+        if self.aggregates is not None:
+            self.aggregates.close()
+
+
+def parse_date(value):
+    if not value:
+        raise RequestError(400, "Missing date (YYYY-MM-DD)")
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise RequestError(400, f"Bad date {value!r}, expected YYYY-MM-DD")
+
+
+def parse_int(value, default):
+    if value is None:
+        return default
+    try:
+        return max(int(value), 0)
+    except ValueError:
+        raise RequestError(400, f"Bad number {value!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON API over the screen time database")
+    parser.add_argument('--db', help="Database (default: current profile)")
+    parser.add_argument('--host', default=API_HOST)
+    parser.add_argument('--port', type=int, default=API_PORT)
+    args = parser.parse_args()
+    require_schema(args.db)
+    server = ApiServer(args.db)
+    print(f"Serving http://{args.host}:{args.port}/summary?span=Week&date=YYYY-MM-DD and /range?start=&end=")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -37,4 +37,30 @@ APP_CONFIG = {
     "Other": [
         "Other"
     ]
-} 
\ No newline at end of file
+} 
+
+# Automatic categorization of apps not listed above, first matching rule wins.
+# Kinds: 'exact' (whole name), 'prefix', 'regex' (searched anywhere) and
+# 'package' (reverse-domain names where * matches any run of characters).
+# All matching ignores case; names in APP_CONFIG always match exactly first.
+CATEGORY_RULES = [
+    ('package', 'com.supercell.*', "Gaming"),
+    ('package', 'com.pokemon.*', "Gaming"),
+    ('package', 'com.instagram.*', "Social Media"),
+    ('package', 'com.facebook.*', "Social Media"),
+    ('package', 'com.whatsapp*', "Social Media"),
+    ('package', 'com.discord*', "Social Media"),
+    ('package', 'com.twitter.*', "Social Media"),
+    ('package', 'com.google.android.youtube*', "Entertainment"),
+    ('package', 'com.netflix.*', "Entertainment"),
+    ('package', 'com.spotify.*', "Entertainment"),
+    ('package', 'com.google.*', "Productivity"),
+    ('package', 'com.android.*', "Productivity"),
+    ('prefix', "Google ", "Productivity"),
+    ('prefix', "Clash ", "Gaming"),
+    ('regex', r"\b(games?|brawl|poker|chess|solitaire|sudoku|puzzle|pok[eé]mon)\b", "Gaming"),
+    ('regex', r"\b(mail|calendar|agenda|docs?|sheets|notes|calculator|calculadora|bank|banco|office|drive|maps?)\b", "Productivity"),
+    ('regex', r"\b(music|tv|video|movies?|podcasts?|radio|player|stream(ing)?)\b", "Entertainment"),
+    ('regex', r"\b(chat|messenger|social|forum|dating)\b", "Social Media"),
+]
+DEFAULT_CATEGORY = "Other"
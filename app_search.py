@@ -0,0 +1,164 @@
+from database import fetch_app_last_used
+from metadata import get_registry
+
+# Search index configuration
+NGRAM_SIZES = (1, 2, 3)      # Substring lengths stored in the n-gram index
+MAX_RESULTS = None           # Limit on returned matches (None = all)
+
+# Match classes, lower sorts first
+MATCH_PREFIX = 0             # Name starts with the query
+MATCH_WORD = 1               # A word inside the name starts with the query
+MATCH_SUBSTRING = 2          # Query appears anywhere in the name
+
+
+class AppSearchIndex:
+    """
+    Incremental fuzzy search over app names shared by the app pickers.
+    Names are lowered once when indexed and looked up through an n-gram
+    table. Results are ranked by match type (prefix, word start, substring),
+    then favorite status, recent usage and name.
+    """
+
+    def __init__(self, names=(), favorites=(), last_used=None):
+        self.build(names, favorites, last_used)
+
+    def build(self, names, favorites=(), last_used=None):
+        """(Re)build the index from scratch"""
+        self.names = []
+        self.lowered = []
+        self.ids = {}
+        self.favorites = set(favorites)
+        self.last_used = dict(last_used or {})
+        self.ngrams = {}
+        self._order = []          # Static rank of every id
+        self._last_query = None
+        self._last_matches = None
+
+        for name in names:
+            self._index_name(name)
+        self._rank()
+
+    def _index_name(self, name):
+        if name in self.ids:
+            return self.ids[name]
+        app_id = len(self.names)
+        lowered = name.lower()
+        self.names.append(name)
+        self.lowered.append(lowered)
+        self.ids[name] = app_id
+
+        for size in NGRAM_SIZES:
+            for i in range(len(lowered) - size + 1):
+                self.ngrams.setdefault(lowered[i:i + size], set()).add(app_id)
+        return app_id
+
+    def _rank(self):
+        """Compute the static rank (favorites, recency, name) of every app"""
+        by_name = sorted(range(len(self.names)), key=lambda i: self.lowered[i])
+        used = sorted((i for i in by_name if self.names[i] in self.last_used),
+                      key=lambda i: self.last_used[self.names[i]], reverse=True)
+        unused = [i for i in by_name if self.names[i] not in self.last_used]
+        ranked = sorted(used + unused, key=lambda i: self.names[i] not in self.favorites)
+
+        self._order = [0] * len(ranked)
+        for position, app_id in enumerate(ranked):
+            self._order[app_id] = position
+        self._last_query = None
+        self._last_matches = None
+
+    def add(self, name, is_favorite=False, last_used=None):
+        """Add a single app without rebuilding the index"""
+        self._index_name(name)
+        if is_favorite:
+            self.favorites.add(name)
+        if last_used is not None:
+            self.last_used[name] = last_used
+        self._rank()
+
+    def set_favorite(self, name, is_favorite):
+        """Update favorite status and re-rank"""
+        if is_favorite:
+            self.favorites.add(name)
+        else:
+            self.favorites.discard(name)
+        self._rank()
+
+    def touch(self, name, day):
+        """Record that an app was used on a given day"""
+        if name not in self.last_used or day > self.last_used[name]:
+            self.last_used[name] = day
+            self._rank()
+
+    def ranked_names(self):
+        """All names in rank order"""
+        return sorted(self.names, key=lambda name: self._order[self.ids[name]])
+
+    def _candidates(self, query):
+        """Ids that contain the query, using the previous result when possible"""
+        if self._last_query and query.startswith(self._last_query):
+            # Query grew: refine the previous matches instead of a new lookup
+            return [i for i in self._last_matches if query in self.lowered[i]]
+
+        size = min(len(query), max(NGRAM_SIZES))
+        grams = [query[i:i + size] for i in range(len(query) - size + 1)]
+        sets = [self.ngrams.get(gram) for gram in grams]
+        if not all(sets):
+            return []
+        sets.sort(key=len)
+        candidates = set(sets[0]).intersection(*sets[1:])
+        if len(query) > size:
+            return [i for i in candidates if query in self.lowered[i]]
+        return list(candidates)
+
+    def search(self, query):
+        """Return matching names, best first"""
+        query = query.strip().lower()
+        if not query:
+            self._last_query = None
+            self._last_matches = None
+            return self.ranked_names()
+
+        matches = self._candidates(query)
+        self._last_query = query
+        self._last_matches = matches
+
+        order = self._order
+        lowered = self.lowered
+        word_start = ' ' + query
+        stride = len(order)
+
+        def sort_key(app_id):
+            # Single int key: match class first, static rank second
+            name = lowered[app_id]
+            if name.startswith(query):
+                match = MATCH_PREFIX
+            elif word_start in name:
+                match = MATCH_WORD
+            else:
+                match = MATCH_SUBSTRING
+            return match * stride + order[app_id]
+
+        ranked = sorted(matches, key=sort_key)
+        if MAX_RESULTS is not None:
+            ranked = ranked[:MAX_RESULTS]
+        return [self.names[i] for i in ranked]
+
+    def matches(self, query):
+        """Return the set of matching names (unordered, for row filtering)"""
+        query = query.strip().lower()
+        if not query:
+            return set(self.names)
+        matches = self._candidates(query)
+        self._last_query = query
+        self._last_matches = matches
+        return {self.names[i] for i in matches}
+
+
+def load_app_index():
+    """Build an index from the apps table with favorites and last usage"""
+    apps = get_registry().apps_with_favorites()
+    return AppSearchIndex(
+        [name for name, _ in apps],
+        favorites=[name for name, is_favorite in apps if is_favorite],
+        last_used=dict(fetch_app_last_used())
+    )
@@ -0,0 +1,177 @@
+import argparse
+import os
+import stat
+from contextlib import closing
+from datetime import date
+from database import get_connection, get_db_path, init_db, archive_file_path
+from utils import to_day, from_day
+import sync
+
+# --- CONFIGURATION ---
+ARCHIVE_DIR = 'archive'      # Relative to the live database
+FILE_PATTERN = 'screen_time_{year}.db'
+
+
+def archive_schema(conn, schema):
+    """Create the tables of an archive file attached as schema"""
+    conn.executescript(f'''
+        CREATE TABLE {schema}.categories (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,           -- Older databases repeat names
+            color TEXT DEFAULT '#808080'
+        );
+        CREATE TABLE {schema}.apps (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            category_id INTEGER NOT NULL,
+            is_favorite BOOLEAN DEFAULT 0
+        );
+        CREATE TABLE {schema}.screen_time_entries (
+            id INTEGER PRIMARY KEY,
+            app_id INTEGER NOT NULL,
+            time_spent INTEGER NOT NULL,
+            day INTEGER NOT NULL
+        );
+    ''')
+
+
+def closed_years(db_path=None):
+    """Years with entries in the live database that are over"""
+    with closing(get_connection(db_path)) as conn:
+        first, last = conn.execute('SELECT MIN(day), MAX(day) FROM screen_time_entries').fetchone()
+    if first is None:
+        return []
+    return [year for year in range(from_day(first).year, from_day(last).year + 1)
+            if year < date.today().year]
+
+
+def archive_year(year, db_path=None, directory=ARCHIVE_DIR):
+    """
+    Move one year out of the live database into a vacuumed, read-only
+    archive file and register it. Returns (rows, minutes) moved.
+    """
+    db_path = db_path or get_db_path()
+    first_day, last_day = to_day(date(year, 1, 1)), to_day(date(year, 12, 31))
+    relative = os.path.join(directory, FILE_PATTERN.format(year=year))
+    path = archive_file_path(relative, db_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    with closing(get_connection(db_path)) as conn:
+        if conn.execute('SELECT 1 FROM archives WHERE year = ?', (year,)).fetchone():
+            raise ValueError(f"{year} is already archived")
+        rows, minutes = conn.execute('''
+            SELECT COUNT(*), COALESCE(SUM(time_spent), 0) FROM screen_time_entries
+            WHERE day BETWEEN ? AND ?
+        ''', (first_day, last_day)).fetchone()
+        if not rows:
+            return 0, 0
+
+        # Fill the new file through ATTACH, in one transaction
+        conn.execute('ATTACH DATABASE ? AS archive', (tmp_path,))
+        archive_schema(conn, 'archive')
+        with conn:
+            conn.execute('INSERT INTO archive.categories SELECT id, name, color FROM main.categories')
+            conn.execute('INSERT INTO archive.apps SELECT id, name, category_id, is_favorite FROM main.apps')
+            conn.execute('''
+                INSERT INTO archive.screen_time_entries
+                SELECT id, app_id, time_spent, day FROM main.screen_time_entries
+                WHERE day BETWEEN ? AND ? ORDER BY day
+            ''', (first_day, last_day))
+            conn.execute('CREATE INDEX archive.idx_entries_day ON screen_time_entries (day)')
+        copied = conn.execute('SELECT COUNT(*), SUM(time_spent) FROM archive.screen_time_entries').fetchone()
+        conn.execute('DETACH DATABASE archive')
+        if copied != (rows, minutes):
+            os.remove(tmp_path)
+            raise RuntimeError(f"Archive of {year} is incomplete: {copied} != {(rows, minutes)}")
+
+        # Compact the archive, then make it read-only
+        with closing(get_connection(tmp_path, profile={})) as archive:
+            archive.execute('PRAGMA journal_mode = DELETE')
+            archive.execute('VACUUM')
+        os.chmod(tmp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        os.replace(tmp_path, path)
+
+        # Register it and drop the rows from the live database, which is
+        # not a change to send to other devices
+        with conn:
+            sync.pause(conn)
+            conn.execute('INSERT INTO archives (year, path, first_day, last_day, rows, minutes) VALUES (?, ?, ?, ?, ?, ?)',
+                         (year, relative, first_day, last_day, rows, minutes))
+            conn.execute('DELETE FROM screen_time_entries WHERE day BETWEEN ? AND ?', (first_day, last_day))
+            sync.resume(conn)
+    return rows, minutes
+
+
+def restore_year(year, db_path=None):
+    """
+    Move an archived year back into the live database with the original
+    entry ids, which audit reports and session entries refer to. Refused
+    if newer entries have taken any of those ids since.
+    """
+    db_path = db_path or get_db_path()
+    with closing(get_connection(db_path)) as conn:
+        result = conn.execute('SELECT path FROM archives WHERE year = ?', (year,)).fetchone()
+        if result is None:
+            raise ValueError(f"{year} is not archived")
+        path = archive_file_path(result[0], db_path)
+        conn.execute('ATTACH DATABASE ? AS archive', (f'file:{path}?mode=ro',))
+        taken = conn.execute('''
+            SELECT COUNT(*) FROM archive.screen_time_entries a
+            JOIN main.screen_time_entries m ON m.id = a.id
+        ''').fetchone()[0]
+        if taken:
+            conn.execute('DETACH DATABASE archive')
+            raise ValueError(f"{taken} entry ids of {year} are used by newer entries, {year} was not restored")
+        with conn:
+            sync.pause(conn)
+            conn.execute('''
+                INSERT INTO screen_time_entries (id, app_id, time_spent, day)
+                SELECT id, app_id, time_spent, day FROM archive.screen_time_entries
+            ''')
+            conn.execute('DELETE FROM archives WHERE year = ?', (year,))
+            sync.resume(conn)
+        conn.execute('DETACH DATABASE archive')
+    os.chmod(path, stat.S_IRUSR | stat.S_IWUSR)
+    os.remove(path)
+
+
+def list_archives(db_path=None):
+    with closing(get_connection(db_path)) as conn:
+        return conn.execute('SELECT year, path, rows, minutes FROM archives ORDER BY year').fetchall()
+
+
+def vacuum_live(db_path=None):
+    """Give the space freed by archiving back to the file system"""
+    with closing(get_connection(db_path)) as conn:
+        conn.execute('VACUUM')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')  # No-op outside WAL mode
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move closed years into read-only archive databases")
+    parser.add_argument('command', choices=['archive', 'restore', 'list'])
+    parser.add_argument('--db', help="Live database (default: current profile)")
+    parser.add_argument('--years', type=int, nargs='*', help="Years (default: every closed year)")
+    parser.add_argument('--dir', default=ARCHIVE_DIR)
+    args = parser.parse_args()
+    init_db(args.db)
+
+    if args.command == 'archive':
+        for year in args.years or closed_years(args.db):
+            rows, minutes = archive_year(year, args.db, args.dir)
+            print(f"{year}: {rows} rows, {minutes} min archived")
+        vacuum_live(args.db)
+    elif args.command == 'restore':
+        for year in args.years or []:
+            restore_year(year, args.db)
+            print(f"{year}: restored")
+    else:
+        for year, path, rows, minutes in list_archives(args.db):
+            print(f"{year}: {rows} rows, {minutes} min in {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import closing
+from datetime import date, datetime
+import numpy as np
+from database import FETCH_BATCH, get_connection, get_db_path, init_db
+from utils import to_day
+
+# --- CONFIGURATION ---
+REPORT_FILE = 'audit.json'    # Relative to the live database
+MINUTES_PER_DAY = 1440
+FIRST_DATE = '2000-01-01'     # Earlier days are treated as corrupt
+SAMPLE_SIZE = 20              # Offending ids (or days) listed per check
+
+AUDIT_DTYPE = np.dtype([('id', np.int64), ('app', np.int64), ('minutes', np.int64),
+                        ('day', np.int64), ('integer_day', np.int8)])
+
+# Days whose entries changed since the last audit, kept by triggers
+DIRTY_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS audit_dirty (day PRIMARY KEY) WITHOUT ROWID;
+    CREATE TRIGGER IF NOT EXISTS audit_mark_insert AFTER INSERT ON screen_time_entries
+    BEGIN
+        INSERT OR IGNORE INTO audit_dirty (day) VALUES (NEW.day);
+    END;
+    CREATE TRIGGER IF NOT EXISTS audit_mark_update AFTER UPDATE ON screen_time_entries
+    BEGIN
+        INSERT OR IGNORE INTO audit_dirty (day) VALUES (NEW.day);
+        INSERT OR IGNORE INTO audit_dirty (day) VALUES (OLD.day);
+    END;
+    CREATE TRIGGER IF NOT EXISTS audit_mark_delete AFTER DELETE ON screen_time_entries
+    BEGIN
+        INSERT OR IGNORE INTO audit_dirty (day) VALUES (OLD.day);
+    END;
+'''
+
+
+def ensure_schema(conn):
+    """Start tracking changed days, returns whether tracking was already on"""
+    tracked = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'audit_dirty'").fetchone() is not None
+    if not tracked:
+        conn.executescript(DIRTY_SCHEMA)
+    return tracked
+
+
+def fetch_entries(conn, dirty_only=False):
+    """
+    All entries (or those on changed days) as an AUDIT_DTYPE array, in one
+    scan. Days not stored as integers (e.g. leftover text dates) are kept
+    with integer_day = 0 so they can be reported.
+    """
+    where = ' WHERE day IN (SELECT day FROM audit_dirty)' if dirty_only else ''
+    count = conn.execute('SELECT COUNT(*) FROM screen_time_entries' + where).fetchone()[0]
+    entries = np.empty(count, dtype=AUDIT_DTYPE)
+    cursor = conn.execute('''
+        SELECT id, app_id, time_spent,
+               CASE WHEN typeof(day) = 'integer' THEN day ELSE 0 END,
+               typeof(day) = 'integer'
+        FROM screen_time_entries''' + where)
+    filled = 0
+    while True:
+        rows = cursor.fetchmany(FETCH_BATCH)
+        if not rows:
+            break
+        entries[filled:filled + len(rows)] = rows
+        filled += len(rows)
+    return entries[:filled]
+
+
+def finding(check, severity, items, description):
+    items = np.asarray(items)
+    return {'check': check, 'severity': severity, 'count': int(len(items)),
+            'description': description, 'sample': items[:SAMPLE_SIZE].tolist()}
+
+
+def check_entries(entries, app_ids, last_day):
+    """Row and day level checks over the entries array"""
+    ids, days, minutes = entries['id'], entries['day'], entries['minutes']
+    integer_days = entries['integer_day'].astype(bool)
+    valid_days = integer_days & (days >= to_day(FIRST_DATE))
+    findings = [
+        finding('negative_minutes', 'error', ids[minutes < 0], "Entries with a negative time_spent"),
+        finding('entry_over_day', 'error', ids[minutes > MINUTES_PER_DAY],
+                f"Entries longer than {MINUTES_PER_DAY} minutes"),
+        finding('bad_day', 'error', ids[~valid_days],
+                f"Entries whose day is not an integer day number on or after {FIRST_DATE}"),
+        finding('future_day', 'warning', ids[valid_days & (days > last_day)], "Entries dated after today"),
+        finding('orphan_entries', 'error', ids[~np.isin(entries['app'], app_ids)],
+                "Entries whose app_id has no app"),
+    ]
+
+    # Day totals over all apps, through one bincount over the valid days
+    first_day = days[valid_days].min() if valid_days.any() else 0
+    totals = np.bincount(days[valid_days] - first_day, weights=minutes[valid_days])
+    over = np.flatnonzero(totals > MINUTES_PER_DAY)
+    findings.append(finding('day_over_limit', 'error', over + first_day,
+                            f"Days (day numbers) whose entries add up to more than {MINUTES_PER_DAY} minutes"))
+
+    # Identical (app, day, minutes) rows, usually an import run twice
+    order = np.lexsort((ids, minutes, days, entries['app']))
+    ordered = entries[order]
+    same = ((ordered['app'][1:] == ordered['app'][:-1]) & (ordered['day'][1:] == ordered['day'][:-1])
+            & (ordered['minutes'][1:] == ordered['minutes'][:-1]))
+    findings.append(finding('duplicate_entries', 'warning', ordered['id'][1:][same],
+                            "Entries repeating the app, day and minutes of an earlier entry"))
+    return findings
+
+
+def check_metadata(conn):
+    """Checks over apps, categories and sessions, small enough to leave to SQL"""
+    queries = [
+        ('orphan_apps', 'error', "Apps whose category_id has no category",
+         'SELECT id FROM apps WHERE category_id NOT IN (SELECT id FROM categories) ORDER BY id'),
+        ('duplicate_categories', 'warning', "Categories repeating the name of an earlier one, ignoring case",
+         '''SELECT c.id FROM categories c
+            WHERE EXISTS (SELECT 1 FROM categories o WHERE o.name = c.name COLLATE NOCASE AND o.id < c.id)
+            ORDER BY c.id'''),
+        ('duplicate_apps', 'warning', "Apps repeating the name of an earlier one, ignoring case",
+         '''SELECT a.id FROM apps a
+            WHERE EXISTS (SELECT 1 FROM apps o WHERE o.name = a.name COLLATE NOCASE AND o.id < a.id)
+            ORDER BY a.id'''),
+        ('orphan_sessions', 'error', "Sessions whose app_id has no app",
+         'SELECT id FROM sessions WHERE app_id NOT IN (SELECT id FROM apps) ORDER BY id'),
+    ]
+    return [finding(check, severity, [row[0] for row in conn.execute(query)], description)
+            for check, severity, description, query in queries]
+
+
+def audit(db_path=None, incremental=False):
+    """
+    Run every check and return the report. An incremental audit only
+    scans the entries of days changed since the previous audit; the first
+    audit of a database is always full.
+    """
+    db_path = db_path or get_db_path()
+    start = time.perf_counter()
+    with closing(get_connection(db_path)) as conn:
+        incremental = ensure_schema(conn) and incremental
+        conn.execute('BEGIN IMMEDIATE')  # No writes between the scan and clearing the changed days
+        try:
+            entries = fetch_entries(conn, dirty_only=incremental)
+            app_ids = np.array([row[0] for row in conn.execute('SELECT id FROM apps')], dtype=np.int64)
+            findings = check_entries(entries, app_ids, to_day(date.today())) + check_metadata(conn)
+            changed_days = conn.execute('SELECT COUNT(*) FROM audit_dirty').fetchone()[0]
+            conn.execute('DELETE FROM audit_dirty')
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return {
+        'database': os.path.abspath(db_path),
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'mode': 'incremental' if incremental else 'full',
+        'entries_scanned': int(len(entries)),
+        'changed_days': changed_days,
+        'seconds': round(time.perf_counter() - start, 3),
+        'errors': sum(f['count'] for f in findings if f['severity'] == 'error'),
+        'warnings': sum(f['count'] for f in findings if f['severity'] == 'warning'),
+        'checks': findings,
+    }
+
+
+def report_path(db_path=None, name=REPORT_FILE):
+    return os.path.join(os.path.dirname(os.path.abspath(db_path or get_db_path())), name)
+
+
+def write_report(report, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the screen time database for invalid or inconsistent data")
+    parser.add_argument('--db', help="Database (default: current profile)")
+    parser.add_argument('--incremental', action='store_true', help="Only scan days changed since the last audit")
+    parser.add_argument('--report', help=f"JSON report path (default: {REPORT_FILE} next to the database)")
+    args = parser.parse_args()
+
+    init_db(args.db)
+    report = audit(args.db, args.incremental)
+    path = args.report or report_path(args.db)
+    write_report(report, path)
+    print(f"Audit ({report['mode']}) of {report['entries_scanned']} entries in {report['seconds']:.2f} s")
+    for f in report['checks']:
+        if f['count']:
+            print(f"  {f['severity']:<7} {f['check']}: {f['count']}")
+    print(f"{report['errors']} errors, {report['warnings']} warnings, report written to {path}")
+    sys.exit(1 if report['errors'] else 0)
+
+
+if __name__ == "__main__":
+    main()
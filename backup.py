@@ -0,0 +1,201 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import closing
+from datetime import datetime
+from config import BACKUP_EVERY_WRITES
+from database import get_connection, get_db_path
+import events
+
+# --- CONFIGURATION ---
+BACKUP_DIR = 'backups'        # Relative to the live database
+TIMESTAMP = '%Y%m%d-%H%M%S-%f'  # In file names: <database name>-<timestamp>.db
+PAGES_PER_STEP = 256          # Pages copied per backup step
+STEP_SLEEP = 0.002            # Seconds between steps, lets writers in
+MAX_RESTARTS = 3              # Copies restarted by outside writes before copying in one step
+KEEP_LAST = 5                 # Most recent snapshots always kept
+KEEP_DAILY = 7                # Plus the newest of each of the last days with snapshots
+KEEP_WEEKLY = 4               # Plus the newest of each of the last ISO weeks
+
+BackupReport = namedtuple('BackupReport', ['path', 'reason', 'pages', 'bytes', 'seconds', 'restarts'])
+
+
+class _Restarted(Exception):
+    pass
+
+
+def describe(report):
+    mib = report.bytes / 2**20
+    rate = mib / report.seconds if report.seconds else float('inf')
+    return (f"Backup ({report.reason}) written to {report.path}: "
+            f"{mib:.1f} MiB, {report.pages} pages in {report.seconds:.2f} s, {rate:.1f} MiB/s"
+            + (f", {report.restarts} restarts" if report.restarts else ""))
+
+
+def backup_dir(db_path=None, directory=BACKUP_DIR):
+    return os.path.join(os.path.dirname(os.path.abspath(db_path or get_db_path())), directory)
+
+
+def snapshot_name(db_path, when):
+    stem = os.path.splitext(os.path.basename(db_path))[0]
+    return f"{stem}-{when.strftime(TIMESTAMP)}.db"
+
+
+def backup(db_path=None, directory=BACKUP_DIR, reason='manual', pages=PAGES_PER_STEP, sleep=STEP_SLEEP):
+    """
+    Copy the live database page by page with the SQLite online backup API.
+    Each step holds the read lock for only `pages` pages, then sleeps, so
+    writers are not blocked for the whole copy. A write from another
+    connection restarts the copy; after MAX_RESTARTS it is done in a single
+    step, which under WAL still never blocks writers. The snapshot is
+    written to a temporary name and renamed once complete.
+    """
+    db_path = db_path or get_db_path()
+    target_dir = backup_dir(db_path, directory)
+    os.makedirs(target_dir, exist_ok=True)
+    path = os.path.join(target_dir, snapshot_name(db_path, datetime.now()))
+    tmp_path = path + '.tmp'
+    remaining_before = [None]
+    restarts = [0]
+
+    def progress(status, remaining, total):
+        if remaining_before[0] is not None and remaining > remaining_before[0]:
+            restarts[0] += 1
+            if restarts[0] >= MAX_RESTARTS:
+                raise _Restarted()
+        remaining_before[0] = remaining
+        if remaining:
+            time.sleep(sleep)
+
+    start = time.perf_counter()
+    with closing(get_connection(db_path)) as source, closing(sqlite3.connect(tmp_path)) as target:
+        try:
+            source.backup(target, pages=pages, progress=progress)
+        except _Restarted:
+            source.backup(target, pages=-1)
+        page_size = target.execute('PRAGMA page_size').fetchone()[0]
+        pages_copied = target.execute('PRAGMA page_count').fetchone()[0]
+        target.execute('PRAGMA journal_mode = DELETE')  # Self-contained file, no -wal next to it
+    os.replace(tmp_path, path)
+    return BackupReport(path, reason, pages_copied, pages_copied * page_size,
+                        time.perf_counter() - start, restarts[0])
+
+
+def list_snapshots(db_path=None, directory=BACKUP_DIR):
+    """(time, path) of the snapshots of a database, newest first"""
+    db_path = db_path or get_db_path()
+    target_dir = backup_dir(db_path, directory)
+    stem = os.path.splitext(os.path.basename(db_path))[0]
+    snapshots = []
+    if os.path.isdir(target_dir):
+        for name in os.listdir(target_dir):
+            if name.startswith(stem + '-') and name.endswith('.db'):
+                try:
+                    when = datetime.strptime(name[len(stem) + 1:-3], TIMESTAMP)
+                except ValueError:
+                    continue
+                snapshots.append((when, os.path.join(target_dir, name)))
+    return sorted(snapshots, reverse=True)
+
+
+def rotate(db_path=None, directory=BACKUP_DIR, keep_last=KEEP_LAST, keep_daily=KEEP_DAILY, keep_weekly=KEEP_WEEKLY):
+    """Delete the snapshots no retention rule keeps, returns their paths"""
+    snapshots = list_snapshots(db_path, directory)
+    keep = {path for _, path in snapshots[:keep_last]}
+    days, weeks = {}, {}
+    for when, path in snapshots:  # Newest first, so the first seen per period is its newest
+        days.setdefault(when.date(), path)
+        weeks.setdefault(when.isocalendar()[:2], path)
+    keep.update(list(days.values())[:keep_daily])
+    keep.update(list(weeks.values())[:keep_weekly])
+    removed = [path for _, path in snapshots if path not in keep]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+class BackupManager:
+    """
+    Runs backups on a background thread, one at a time, so the UI keeps
+    responding. A backup is started on request or after every_writes
+    records have been written since the last one.
+    """
+
+    def __init__(self, db_path=None, every_writes=BACKUP_EVERY_WRITES):
+        self.db_path = db_path
+        self.every_writes = every_writes
+        self.writes = 0
+        self.thread = None
+        self.reports = []
+        self.errors = []
+
+    def request(self, reason='manual'):
+        """Start a backup unless one is running, returns whether it started"""
+        if self.thread is not None and self.thread.is_alive():
+            return False
+        self.writes = 0
+        self.thread = threading.Thread(target=self.run, args=(reason,), name='backup')
+        self.thread.start()
+        return True
+
+    def run(self, reason):
+        try:
+            self.reports.append(backup(self.db_path, reason=reason))
+            rotate(self.db_path)
+        except (sqlite3.Error, OSError) as e:
+            self.errors.append(e)
+
+    def on_record_added(self, app_id, time_spent, day):
+        self.writes += 1
+        if self.every_writes and self.writes >= self.every_writes:
+            self.request('writes')
+
+    def wait(self, timeout=None):
+        """Block until the running backup (if any) is done"""
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+
+_manager = None
+
+
+def set_backup_manager(manager):
+    """Make manager the shared one (None creates one on next use), returns the previous one"""
+    global _manager
+    previous, _manager = _manager, manager
+    if previous is not None:
+        events.unsubscribe('record_added', previous.on_record_added)
+    if manager is not None:
+        events.subscribe('record_added', manager.on_record_added)
+    return previous
+
+
+def get_backup_manager():
+    """Shared manager of the current database, counting record writes from first use"""
+    if _manager is None:
+        set_backup_manager(BackupManager(get_db_path()))
+    return _manager
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online backups of the screen time database")
+    parser.add_argument('command', choices=['backup', 'list', 'rotate'], nargs='?', default='backup')
+    parser.add_argument('--db', help="Database (default: current profile)")
+    parser.add_argument('--dir', default=BACKUP_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'backup':
+        print(describe(backup(args.db, args.dir)))
+    if args.command in ('backup', 'rotate'):
+        for path in rotate(args.db, args.dir):
+            print(f"Removed {path}")
+    if args.command == 'list':
+        for when, path in list_snapshots(args.db, args.dir):
+            print(f"{when:%Y-%m-%d %H:%M:%S}  {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,20 @@ from tkinter import ttk, messagebox
 from datetime import datetime, timedelta
 from utils import format_date_for_display, format_date_for_db, format_time_display
 from tkcalendar import DateEntry
-from database import toggle_app_favorite, fetch_apps
+from database import toggle_app_favorite
+from metadata import get_registry
+from app_search import load_app_index
+from instrumentation import traced
+from limits import get_tracker, describe
+import events
 
 class BatchEntryDialog:
+    """
+    Built once, then hidden on close and shown again. Entry rows are kept
+    per app: showing the dialog again only creates, removes or moves the
+    rows whose app or favorite status changed.
+    """
+
     def __init__(self, parent, apps, submit_callback):
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Batch Time Entry")
@@ -14,6 +25,13 @@ class BatchEntryDialog:
         self.submit_callback = submit_callback
         self.apps = apps  # Store apps list
         self.entries = []
+        self.rows = {}  # app name -> row widgets, used to filter rows
+        self.positions = {}  # app name -> index in entries
+        self.visible_rows = set()
+        self.app_index = load_app_index()
+        self.index_stale = False
+        # Last used days order the search results, new records change them
+        events.subscribe('record_added', self.on_record_added)
 
         # Date frame with total
         date_frame = ttk.LabelFrame(self.dialog, text="Date", padding=10)
@@ -61,6 +79,15 @@ class BatchEntryDialog:
         self.total_label = ttk.Label(total_frame, text="0")
         self.total_label.pack(side='left', padx=5)
 
+        # Search frame
+        search_frame = ttk.Frame(self.dialog)
+        search_frame.pack(fill='x', padx=5, pady=(5, 0))
+        ttk.Label(search_frame, text="Search:").pack(side='left')
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
+        search_entry.pack(side='left', fill='x', expand=True, padx=5)
+        search_entry.bind('<KeyRelease>', lambda e: self.apply_search())
+
         # Entries frame with scrollbar
         entries_frame = ttk.LabelFrame(self.dialog, text="Time Entries", padding=10)
         entries_frame.pack(fill='both', expand=True, padx=5, pady=5)
@@ -93,14 +120,15 @@ class BatchEntryDialog:
         # Bind mousewheel to canvas only
         canvas.bind("<MouseWheel>", _on_mousewheel)
         
-        # Unbind when dialog is closed
-        self.dialog.protocol("WM_DELETE_WINDOW", lambda: (
-            canvas.unbind("<MouseWheel>"),
-            self.dialog.destroy()
-        ))
+        # Hidden, not destroyed, when closed
+        self.dialog.protocol("WM_DELETE_WINDOW", self.hide)
 
-        # Create entries
-        self.create_entries()
+        # Create headers and entries
+        ttk.Label(self.scrollable_frame, text="⭐", width=3).grid(row=0, column=0, padx=2)
+        ttk.Label(self.scrollable_frame, text="App", width=20).grid(row=0, column=1, padx=5)
+        ttk.Label(self.scrollable_frame, text="Time (minutes)", width=15).grid(row=0, column=2, padx=5)
+        self.vcmd = self.dialog.register(lambda P: P == "" or P.isdigit())  # Only allow numbers
+        self.sync_rows()
 
         # Pack canvas and scrollbar
         canvas.pack(side="left", fill="both", expand=True)
@@ -122,14 +150,58 @@ class BatchEntryDialog:
         if self.entries:
             self.entries[0][1].focus()
 
+    @traced('batch_entry.show', 'dialog')
+    def show(self, apps):
+        """Show the dialog again for the given apps, cleared as if new"""
+        if self.index_stale or set(apps) != set(self.apps):
+            self.app_index = load_app_index()
+            self.index_stale = False
+        self.apps = apps
+        self.sync_rows()
+        self.search_var.set('')
+        self.apply_search()
+        for _, entry, _ in self.entries:
+            entry.delete(0, tk.END)
+        self.update_total()
+        self.set_relative_date(-1)
+        self.dialog.deiconify()
+        self.dialog.lift()
+        if self.entries:
+            self.entries[0][1].focus()
+
+    def hide(self):
+        self.dialog.withdraw()
+
+    def on_record_added(self, app_id, time_spent, day):
+        self.index_stale = True
+
     def set_relative_date(self, days_offset):
         """Set date relative to today"""
         target_date = datetime.today() + timedelta(days=days_offset)
         self.date_entry.set_date(target_date)  # DateEntry uses set_date instead of insert
 
-    def focus_next(self, current_idx):
-        if current_idx < len(self.entries):
-            self.entries[current_idx][1].focus()
+    def focus_next(self, app_name):
+        # Skip rows hidden by the search filter
+        current_idx = self.positions[app_name] + 1
+        while current_idx < len(self.entries):
+            if self.entries[current_idx][0] in self.visible_rows:
+                self.entries[current_idx][1].focus()
+                return
+            current_idx += 1
+
+    def apply_search(self):
+        """Show only the rows matching the search text"""
+        matches = self.app_index.matches(self.search_var.get())
+        # Only touch rows whose visibility changed
+        for app_name in self.visible_rows - matches:
+            if app_name in self.rows:
+                for widget in self.rows[app_name]:
+                    widget.grid_remove()
+        for app_name in matches - self.visible_rows:
+            if app_name in self.rows:
+                for widget in self.rows[app_name]:
+                    widget.grid()
+        self.visible_rows = matches & set(self.rows)
 
     def clear_all(self):
         for _, entry, _ in self.entries:  # Unpack 3 values
@@ -137,6 +209,7 @@ class BatchEntryDialog:
         self.entries[0][1].focus()
         self.total_label.config(text="0 min")  # Reset total display
 
+    @traced('batch_entry.submit_all', 'dialog')
     def submit_all(self):
         date = self.date_entry.get_date()  # Get datetime object directly
         if not date:
@@ -160,91 +233,74 @@ class BatchEntryDialog:
                 self.submit_callback(app, time_spent, db_date)
             
             messagebox.showinfo("Success", "All entries submitted successfully!")
+            exceeded = get_tracker().take_exceeded()
+            if exceeded:
+                messagebox.showwarning("Limits Exceeded", describe(exceeded))
             self.clear_all()
         else:
             messagebox.showwarning("Warning", "No entries to submit") 
 
-    def toggle_favorite(self, app_name, current_state):
-        """Toggle favorite status and update button"""
+    def toggle_favorite(self, app_name):
+        """Toggle favorite status and move the row"""
+        is_favorite = self.rows[app_name][0].cget('text') == "⭐"
         toggle_app_favorite(app_name)
-        btn = next(btn for app, _, btn in self.entries if app == app_name)
-        btn.configure(text="☆" if current_state == "⭐" else "⭐")
-        # Refresh the app list to reorder
-        self.refresh_app_list()
-
-    def refresh_app_list(self):
-        """Refresh and reorder the app list"""
-        # Store current values
-        current_values = {app: entry.get() for app, entry, _ in self.entries}
+        self.app_index.set_favorite(app_name, not is_favorite)
+        self.sync_rows()
+
+    def update_total(self, *args):
+        """Update total minutes display"""
+        self.total_label.config(text=format_time_display(
+            sum(int(entry.get().strip()) for _, entry, _ in self.entries
+                if entry.get().strip().isdigit())
+        ))
+
+    def create_row(self, app_name, row):
+        """Favorite button, name and time entry of one app"""
+        fav_btn = ttk.Button(self.scrollable_frame, width=3,
+                             command=lambda a=app_name: self.toggle_favorite(a))
+        fav_btn.grid(row=row, column=0, padx=2, pady=2)
         
-        # Clear frame
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
+        # App name and time entry
+        app_label = ttk.Label(self.scrollable_frame, text=app_name, width=20)
+        time_entry = ttk.Entry(self.scrollable_frame, width=15, 
+                             validate='key', 
+                             validatecommand=(self.vcmd, '%P'))
         
-        # Recreate headers and entries
-        self.create_entries()
+        app_label.grid(row=row, column=1, padx=5, pady=2)
+        time_entry.grid(row=row, column=2, padx=5, pady=2)
         
-        # Restore values
-        for app, entry, _ in self.entries:
-            if app in current_values:
-                entry.insert(0, current_values[app]) 
-
-    def create_entries(self):
-        """Create entry rows for apps"""
-        apps_data = fetch_apps()  # Get fresh data with favorites
-        apps_dict = {name: is_favorite for name, is_favorite in apps_data}  # Create lookup dict
-        self.entries = []
+        time_entry.bind('<Return>', lambda e, a=app_name: self.focus_next(a))
 
-        # Create headers
-        ttk.Label(self.scrollable_frame, text="⭐", width=3).grid(row=0, column=0, padx=2)
-        ttk.Label(self.scrollable_frame, text="App", width=20).grid(row=0, column=1, padx=5)
-        ttk.Label(self.scrollable_frame, text="Time (minutes)", width=15).grid(row=0, column=2, padx=5)
+        # Bind to update total when value changes
+        time_entry.bind('<KeyRelease>', self.update_total)
+        time_entry.bind('<FocusOut>', self.update_total)
+        return fav_btn, app_label, time_entry
+
+    def sync_rows(self):
+        """Create, remove and move entry rows to match the apps, keeping typed values"""
+        apps_dict = dict(get_registry().apps_with_favorites())  # Favorites are kept current in memory
 
         # Sort apps by favorite status and then alphabetically
         sorted_apps = sorted(self.apps, key=lambda x: (-apps_dict.get(x, False), x))
 
-        def validate_number(P):
-            """Validate entry to only allow numbers"""
-            if P == "": return True
-            return P.isdigit()
-
-        vcmd = self.dialog.register(validate_number)
-
-        def update_total(*args):
-            """Update total minutes display"""
-            total = 0
-            for _, entry, _ in self.entries:
-                value = entry.get().strip()
-                if value.isdigit():
-                    total += int(value)
-            self.total_label.config(text=format_time_display(total))
-
-        # Create entry rows
+        for app_name in set(self.rows) - set(sorted_apps):
+            for widget in self.rows.pop(app_name):
+                widget.destroy()
         for i, app_name in enumerate(sorted_apps, 1):
-            # Favorite toggle button
-            is_favorite = apps_dict.get(app_name, False)
-            fav_text = "⭐" if is_favorite else "☆"
-            fav_btn = ttk.Button(self.scrollable_frame, text=fav_text, width=3,
-                                command=lambda a=app_name, b=fav_text: self.toggle_favorite(a, b))
-            fav_btn.grid(row=i, column=0, padx=2, pady=2)
-            
-            # App name and time entry
-            app_label = ttk.Label(self.scrollable_frame, text=app_name, width=20)
-            time_entry = ttk.Entry(self.scrollable_frame, width=15, 
-                                 validate='key', 
-                                 validatecommand=(vcmd, '%P'))
-            
-            app_label.grid(row=i, column=1, padx=5, pady=2)
-            time_entry.grid(row=i, column=2, padx=5, pady=2)
-            
-            time_entry.bind('<Return>', lambda e, idx=i: self.focus_next(idx))
-            self.entries.append((app_name, time_entry, fav_btn))
-
-            # Bind to update total when value changes
-            time_entry.bind('<KeyRelease>', update_total)
-            time_entry.bind('<FocusOut>', update_total)
-            
-        self.total_label.config(text=format_time_display(
-            sum(int(entry.get().strip()) for _, entry, _ in self.entries 
-                if entry.get().strip().isdigit())
-        )) 
\ No newline at end of file
+            if app_name not in self.rows:
+                self.rows[app_name] = self.create_row(app_name, i)
+            elif self.positions.get(app_name) != i - 1:
+                for widget in self.rows[app_name]:
+                    widget.grid_configure(row=i)
+            fav_btn = self.rows[app_name][0]
+            fav_text = "⭐" if apps_dict.get(app_name, False) else "☆"
+            if fav_btn.cget('text') != fav_text:
+                fav_btn.configure(text=fav_text)
+        self.entries = [(app_name, self.rows[app_name][2], self.rows[app_name][0]) for app_name in sorted_apps]
+        self.positions = {app_name: i for i, app_name in enumerate(sorted_apps)}
+        self.update_total()
+
+        # Keep the current search applied, moved rows were shown again
+        self.visible_rows = set(self.rows)
+        if self.search_var.get().strip():
+            self.apply_search()
@@ -0,0 +1,800 @@
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+# --- CONFIGURATION ---
+SEED = 42                     # Fixed seed so runs are comparable
+REPEAT = 5                    # Runs per measurement, best one is reported
+SEARCH_APP_COUNT = 10000      # App names in the search benchmark
+SEARCH_QUERIES = ["g", "go", "goo", "goog", "googl", "google", "clash", "cla", "x", "tube"]
+STORAGE_SINGLE_INSERTS = 1000 # Committed one by one, like the entry dialogs
+STORAGE_BULK_ROWS = 100000    # Rows loaded before measuring reads
+STORAGE_APPS = 20
+AGGREGATE_ROWS = 10_000_000  # Synthetic rows in the aggregation benchmark
+AGGREGATE_APPS = 200
+AGGREGATE_CATEGORIES = 12
+AGGREGATE_YEARS = 8
+TRENDS_YEARS = 5             # Years of daily records in the trends benchmark
+TRENDS_APPS = 30
+PIE_WEDGES = 12               # Wedges per pie in the label toggle benchmark
+FETCH_ROWS = 1_000_000        # Records read back in the fetch memory benchmark
+FETCH_APPS = 200
+SESSION_YEARS = 5             # Years of timed sessions in the sessions benchmark
+SESSIONS_PER_DAY = 40
+API_ROWS = 200_000            # Records behind the API load test
+API_CONCURRENCY = 8           # Keep-alive client connections
+API_SECONDS = 3               # Duration of each load test scenario
+API_BENCH_PORT = 8781
+BACKUP_ROWS = 500_000         # Records in the database being backed up
+BACKUP_STEPS = [16, 256, -1]  # Pages per backup step, -1 copies everything in one step
+CATEGORIZE_NAMES = 50_000     # App names categorized, half plain names and half package names
+CATEGORIZE_IMPORT = 20_000    # Of which imported into a fresh database
+AUDIT_ROWS = 1_000_000        # Records checked by the audit benchmark
+AUDIT_APPS = 200
+AUDIT_CHANGED_DAYS = 7        # Days written to before the incremental audit
+IMPUTATION_YEARS = 5          # Daily history in the imputation benchmark
+IMPUTATION_APPS = 200
+IMPUTATION_ROUNDS = 20        # Backtest rounds, each hiding 10% of the days
+PROFILE_ROWS = 500_000        # Records in each of the two profiles switched between
+DIALOG_APPS = 500             # Apps listed by the dialogs in the time-to-open benchmark
+
+WORDS = [
+    "google", "clash", "photo", "music", "chat", "maps", "docs", "mail", "video",
+    "game", "news", "bank", "pay", "notes", "tube", "star", "cloud", "fit", "shop",
+    "wallet", "camera", "reader", "royale", "brawl", "tabs", "agenda", "sheets"
+]
+
+
+def best_time(func, repeat=REPEAT):
+    """Run func repeat times and return the best wall time in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def print_table(title, rows):
+    print(f"\n--- {title} ---")
+    width = max(len(str(row[0])) for row in rows)
+    for label, *values in rows:
+        print(f"{str(label):<{width}}  " + "  ".join(str(v) for v in values))
+
+
+def synthetic_app_names(count):
+    """Random multi-word app names, unique"""
+    rng = random.Random(SEED)
+    names = set()
+    while len(names) < count:
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        names.add(" ".join(w.capitalize() for w in words) + f" {rng.randint(1, 999)}")
+    return sorted(names)
+
+
+@contextmanager
+def temp_database(storage='default'):
+    """Point the database module at a fresh file using the given storage profile"""
+    import database
+    from config import STORAGE_PROFILES
+
+    saved = database.get_db_path, database.get_storage_profile
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        database.get_db_path = lambda: path
+        database.get_storage_profile = lambda: STORAGE_PROFILES[storage]
+        try:
+            database.init_db()
+            yield path
+        finally:
+            database.get_db_path, database.get_storage_profile = saved
+
+
+def populate_records(rows, apps=STORAGE_APPS, start_day='2020-01-01'):
+    """Bulk insert random records into the current database"""
+    import database
+    from utils import to_day
+
+    category_id = database.add_category("Bench")
+    app_ids = [database.add_app(f"App {i}", category_id) for i in range(apps)]
+    rng = random.Random(SEED)
+    start = to_day(start_day)
+    with database.get_connection() as conn:
+        conn.executemany(
+            'INSERT INTO screen_time_entries (app_id, time_spent, day) VALUES (?, ?, ?)',
+            ((app_ids[i % apps], rng.randint(1, 180), start + i // apps) for i in range(rows))
+        )
+    return app_ids
+
+
+def bench_storage():
+    """Insert throughput and read latency under each storage profile"""
+    import database
+    from config import STORAGE_PROFILES
+    from utils import to_day
+
+    rows = [("profile", "inserts/s", "bulk rows/s", "full read ms", "day read ms")]
+    for storage in STORAGE_PROFILES:
+        with temp_database(storage):
+            start = time.perf_counter()
+            app_ids = populate_records(STORAGE_BULK_ROWS)
+            bulk_rate = STORAGE_BULK_ROWS / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for i in range(STORAGE_SINGLE_INSERTS):
+                database.add_screen_time(app_ids[i % len(app_ids)], 30, '2030-01-01')
+            insert_rate = STORAGE_SINGLE_INSERTS / (time.perf_counter() - start)
+
+            full_ms = best_time(database.fetch_screen_time_data)
+
+            def read_day():
+                with database.get_connection() as conn:
+                    conn.execute('SELECT SUM(time_spent) FROM screen_time_entries WHERE day = ?',
+                                 (to_day('2021-06-01'),)).fetchone()
+            day_ms = best_time(read_day)
+
+            database.close_db()
+            rows.append((storage, f"{insert_rate:.0f}", f"{bulk_rate:.0f}",
+                         f"{full_ms:.1f}", f"{day_ms:.2f}"))
+
+    print_table(f"Storage profiles, {STORAGE_BULK_ROWS} rows", rows)
+
+
+def bench_search():
+    """Per-keystroke latency of the app search index vs the old linear scan"""
+    from app_search import AppSearchIndex
+
+    names = synthetic_app_names(SEARCH_APP_COUNT)
+    rng = random.Random(SEED)
+    favorites = rng.sample(names, 50)
+    last_used = {name: rng.randint(0, 400) for name in rng.sample(names, 2000)}
+
+    build_ms = best_time(lambda: AppSearchIndex(names, favorites, last_used), repeat=1)
+    index = AppSearchIndex(names, favorites, last_used)
+
+    def linear_scan(value):
+        # Previous filter_combobox behaviour
+        return [name for name in names if value.lower() in name.lower()]
+
+    rows = [("query", "linear ms", "index ms", "typed ms", "matches")]
+    for query in SEARCH_QUERIES:
+        linear_ms = best_time(lambda: linear_scan(query))
+
+        def cold():
+            index._last_query = None
+            index.search(query)
+
+        def typed():
+            # Type the query one character at a time, as the combobox does
+            for i in range(1, len(query) + 1):
+                index.search(query[:i])
+            index._last_query = None
+
+        rows.append((query, f"{linear_ms:.2f}", f"{best_time(cold):.2f}",
+                     f"{best_time(typed) / len(query):.2f}", len(index.search(query))))
+
+    print(f"Index build for {len(names)} names: {build_ms:.1f} ms")
+    print_table(f"Search latency, {len(names)} apps", rows)
+
+
+def synthetic_columns(rows, apps, categories, years, start_day='2018-01-01'):
+    """Random int32 record columns (app, category, minutes, day) spread over the years"""
+    import numpy as np
+    from utils import to_day
+
+    rng = np.random.default_rng(SEED)
+    app_codes = rng.integers(0, apps, rows, dtype=np.int32)
+    app_categories = rng.integers(0, categories, apps, dtype=np.int32)
+    minutes = rng.integers(1, 180, rows, dtype=np.int32)
+    days = (to_day(start_day) + rng.integers(0, years * 365, rows)).astype(np.int32)
+    return app_codes, app_categories[app_codes], minutes, days
+
+
+def bench_aggregate():
+    """Serial vs threaded vs process-pool aggregation over month partitions"""
+    import numpy as np
+    import pandas as pd
+    import parallel_aggregates
+    from parallel_aggregates import ParallelAggregator
+    from utils import to_day
+
+    columns = synthetic_columns(AGGREGATE_ROWS, AGGREGATE_APPS, AGGREGATE_CATEGORIES, AGGREGATE_YEARS)
+    start = time.perf_counter()
+    engine = ParallelAggregator(*columns, [f"App {i}" for i in range(AGGREGATE_APPS)],
+                                [f"Category {i}" for i in range(AGGREGATE_CATEGORIES)])
+    build_ms = (time.perf_counter() - start) * 1000
+
+    ranges = {"year": (to_day('2021-01-01'), to_day('2021-12-31')), "all time": (None, None)}
+    rows = [("range", "rows", "pandas ms", "serial ms", "threads ms", "processes ms")]
+    try:
+        for label, (first, last) in ranges.items():
+            expected = engine.aggregate(first, last, mode='serial')
+
+            days = engine.columns[3]
+            frame = pd.DataFrame({'app': engine.columns[0], 'minutes': engine.columns[2], 'day': days})
+
+            def pandas_groupby():
+                # Previous behaviour: mask the range and group in one thread
+                selected = frame[(days >= (first or days[0])) & (days <= (last or days[-1]))]
+                return selected.groupby('app')['minutes'].sum()
+
+            timings = [best_time(pandas_groupby, repeat=3)]
+            for mode in parallel_aggregates.MODES:
+                engine.aggregate(first, last, mode=mode)  # Start the pool outside the timing
+                assert all(np.array_equal(a, b) for a, b in zip(engine.aggregate(first, last, mode=mode)[:2], expected[:2]))
+                timings.append(best_time(lambda: engine.aggregate(first, last, mode=mode), repeat=3))
+            rows.append((label, expected[2]) + tuple(f"{ms:.1f}" for ms in timings))
+
+        # Break-even: rows where the process pool starts beating the serial path
+        crossover = [("rows", "serial ms", "processes ms")]
+        for count in (100_000, 1_000_000, 2_000_000, 5_000_000):
+            last_day = int(engine.columns[3][count - 1])
+            crossover.append((count, f"{best_time(lambda: engine.aggregate(None, last_day, mode='serial'), repeat=3):.1f}",
+                              f"{best_time(lambda: engine.aggregate(None, last_day, mode='processes'), repeat=3):.1f}"))
+    finally:
+        engine.close()
+
+    print(f"Engine build (sort + shared memory) for {AGGREGATE_ROWS} rows: {build_ms:.0f} ms, "
+          f"{engine.workers} workers, {len(engine.bounds) - 1} month partitions")
+    print_table(f"Aggregation, {AGGREGATE_ROWS} rows", rows)
+    print_table(f"Serial vs process pool (PARALLEL_MIN_ROWS = {parallel_aggregates.PARALLEL_MIN_ROWS})", crossover)
+
+
+def bench_trends():
+    """Single-pass rolling trends vs re-filtering the frame for every day"""
+    import numpy as np
+    import pandas as pd
+    import trends
+
+    app_codes, _, minutes, days = synthetic_columns(TRENDS_YEARS * 365 * TRENDS_APPS, TRENDS_APPS, 5, TRENDS_YEARS)
+    order = np.argsort(days, kind='stable')
+    records = list(zip(app_codes[order].tolist(), [0] * len(order),
+                       minutes[order].tolist(), days[order].tolist()))
+    frame = pd.DataFrame({'app': app_codes, 'minutes': minutes, 'day': days})
+
+    def refilter():
+        # Naive approach: filter the trailing windows again for every day
+        results = []
+        for day in range(int(days.min()), int(days.max()) + 1):
+            short = frame[(frame.day > day - trends.SHORT_WINDOW) & (frame.day <= day)]
+            long = frame[(frame.day > day - trends.LONG_WINDOW) & (frame.day <= day)]
+            results.append((short.minutes.sum() / trends.SHORT_WINDOW, long.minutes.sum() / trends.LONG_WINDOW))
+        return results
+
+    streaming_ms = best_time(lambda: trends.compute_trends(records), repeat=3)
+    refilter_ms = best_time(refilter, repeat=1)
+    result = trends.compute_trends(records)
+    print_table(f"Trends, {len(records)} records over {len(result.daily)} days", [
+        ("method", "ms"),
+        ("per-day re-filtering (means only)", f"{refilter_ms:.0f}"),
+        ("single pass (means, deltas, z-scores, streaks)", f"{streaming_ms:.0f}"),
+    ])
+
+
+def bench_pie_labels():
+    """Minutes/percent label toggle: full redraw vs blitting the cached labels"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import pandas as pd
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from visualizer import build_pie_data, draw_pie
+
+    rng = random.Random(SEED)
+    series = pd.Series([rng.randint(5, 300) for _ in range(PIE_WEDGES)],
+                       index=[f"App {i}" for i in range(PIE_WEDGES)])
+    fig = Figure(figsize=(15, 6))
+    canvas = FigureCanvasAgg(fig)
+    axs = fig.subplots(1, 2)
+    state = {'percent': False}
+
+    def old_toggle():
+        # Previous behaviour: clear, replot through pandas, full draw
+        state['percent'] = not state['percent']
+        for ax in axs:
+            ax.clear()
+            series.plot(kind='pie', ax=ax, ylabel='',
+                        autopct=lambda pct: f'{pct:.1f}%' if state['percent'] else f'{pct:.0f}')
+        canvas.draw()
+
+    old_ms = best_time(old_toggle)
+    build_ms = best_time(lambda: build_pie_data(series))
+    data = build_pie_data(series)
+    for ax in axs:
+        ax.clear()
+    labels = draw_pie(axs[0], data, 'Apps') + draw_pie(axs[1], data, 'Categories')
+    canvas.draw()
+    background = canvas.copy_from_bbox(fig.bbox)
+
+    def blit_toggle():
+        state['percent'] = not state['percent']
+        canvas.restore_region(background)
+        for text, minutes, percent in labels:
+            text.set_text(percent if state['percent'] else minutes)
+            fig.draw_artist(text)
+
+    print_table(f"Pie label toggle, {PIE_WEDGES} wedges x 2 pies", [
+        ("path", "ms"),
+        ("replot + full draw", f"{old_ms:.2f}"),
+        ("cached labels + blit", f"{best_time(blit_toggle):.2f}"),
+        ("build_pie_data", f"{build_ms:.3f}"),
+    ])
+
+
+def bench_fetch():
+    """Peak memory and time of reading records as tuples vs structured arrays"""
+    import tracemalloc
+    import database
+
+    def measure(func):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+        return elapsed * 1000, peak, retained
+
+    def fetchall_tuples():
+        # Previous behaviour: one tuple and one string per column per row
+        with database.get_connection() as conn:
+            return conn.execute('''
+                SELECT a.name, c.name, se.time_spent, se.day
+                FROM screen_time_entries se
+                JOIN apps a ON se.app_id = a.id
+                JOIN categories c ON a.category_id = c.id
+            ''').fetchall()
+
+    with temp_database():
+        populate_records(FETCH_ROWS, apps=FETCH_APPS)
+        scale = 1_000_000 / FETCH_ROWS / 2**20
+        rows = [("path", "ms", "peak MiB/M rows", "retained MiB/M rows")]
+        for label, func in [("fetchall tuples", fetchall_tuples),
+                            ("fetch_screen_time_days", database.fetch_screen_time_days),
+                            ("fetch_screen_time_columns", database.fetch_screen_time_columns)]:
+            elapsed, peak, retained = measure(func)
+            rows.append((label, f"{elapsed:.0f}", f"{peak * scale:.1f}", f"{retained * scale:.1f}"))
+        database.close_db()
+
+    print_table(f"Record fetch, {FETCH_ROWS} rows", rows)
+
+
+def bench_sessions():
+    """Interval lookups and hour/day splitting over years of sessions"""
+    import numpy as np
+    import database
+    import sessions
+    from utils import to_day
+
+    count = SESSION_YEARS * 365 * SESSIONS_PER_DAY
+    rng = np.random.default_rng(SEED)
+    first_day = to_day('2020-01-01')
+    starts = first_day * 1440 + np.sort(rng.integers(0, SESSION_YEARS * 365 * 1440, count))
+    ends = starts + rng.integers(1, 240, count)
+    with temp_database():
+        category_id = database.add_category("Bench")
+        app_ids = [database.add_app(f"App {i}", category_id) for i in range(STORAGE_APPS)]
+        with database.get_connection() as conn:
+            conn.executemany('INSERT INTO sessions (app_id, start_minute, end_minute) VALUES (?, ?, ?)',
+                             zip(rng.choice(app_ids, count).tolist(), starts.tolist(), ends.tolist()))
+        last_day = first_day + SESSION_YEARS * 365 - 1
+        month = (to_day('2022-06-01'), to_day('2022-06-30'))
+
+        def full_scan_month():
+            # Without the interval index: filter every session
+            with database.get_connection() as conn:
+                conn.execute('SELECT app_id, start_minute, end_minute FROM sessions WHERE start_minute < ? AND end_minute > ?',
+                             ((month[1] + 1) * 1440, month[0] * 1440)).fetchall()
+
+        rows = [("query", "ms")]
+        rows.append(("month lookup, full scan", f"{best_time(full_scan_month):.2f}"))
+        rows.append(("month lookup, interval index",
+                     f"{best_time(lambda: database.fetch_sessions(month[0] * 1440, (month[1] + 1) * 1440)):.2f}"))
+        rows.append(("hour profile, month", f"{best_time(lambda: sessions.hour_profile(*month)):.2f}"))
+        rows.append((f"hour profile, {SESSION_YEARS} years",
+                     f"{best_time(lambda: sessions.hour_profile(first_day, last_day)):.1f}"))
+        apps, starts, ends = sessions.fetch_session_arrays(first_day, last_day)
+        rows.append(("split into days, all sessions",
+                     f"{best_time(lambda: sessions.daily_totals(apps, starts, ends)):.1f}"))
+        start = time.perf_counter()
+        sessions.derive_daily_totals(first_day, last_day)
+        rows.append(("derive daily totals (first run)", f"{(time.perf_counter() - start) * 1000:.0f}"))
+        rows.append(("derive daily totals (unchanged)",
+                     f"{best_time(lambda: sessions.derive_daily_totals(first_day, last_day), repeat=1):.0f}"))
+        database.close_db()
+
+    print_table(f"Sessions, {count} over {SESSION_YEARS} years", rows)
+
+
+async def api_load(port, targets, headers, seconds, concurrency):
+    """Requests per second over keep-alive connections, cycling through targets"""
+    deadline = time.perf_counter() + seconds
+    done = [0]
+    statuses = set()
+
+    async def client(offset):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        i = offset
+        while time.perf_counter() < deadline:
+            target = targets[i % len(targets)]
+            i += 1
+            extra = ''.join(f'{name}: {value}\r\n' for name, value in headers(target).items())
+            writer.write(f'GET {target} HTTP/1.1\r\nHost: localhost\r\n{extra}\r\n'.encode())
+            await writer.drain()
+            statuses.add((await reader.readline()).split()[1].decode())
+            length = 0
+            while (line := await reader.readline()).strip():
+                name, _, value = line.decode().partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+            await reader.readexactly(length)
+            done[0] += 1
+        writer.close()
+
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    return done[0] / seconds, statuses
+
+
+def bench_api():
+    """Load test of the local HTTP API, served from a separate process"""
+    import socket
+    import database
+    from datetime import date, timedelta
+
+    with temp_database('wal') as path:
+        populate_records(API_ROWS, start_day='2020-01-01')
+        database.close_db()
+        server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api_server.py'),
+                                   '--db', path, '--port', str(API_BENCH_PORT)], stdout=subprocess.DEVNULL)
+        try:
+            while True:
+                try:
+                    socket.create_connection(('127.0.0.1', API_BENCH_PORT)).close()
+                    break
+                except ConnectionRefusedError:
+                    time.sleep(0.1)
+
+            weeks = [(date(2020, 1, 6) + timedelta(weeks=i)).isoformat() for i in range(52)]
+            summaries = [f'/summary?span=Week&date={day}' for day in weeks]
+            ranges = [f'/range?start={day}&end={day}' for day in weeks]
+            etags = {}
+
+            def plain(target):
+                return {}
+
+            def revalidate(target):
+                return {'If-None-Match': etags[target]}
+
+            # Warm the response cache and collect the ETags
+            import http.client
+            conn = http.client.HTTPConnection('127.0.0.1', API_BENCH_PORT)
+            start = time.perf_counter()
+            for target in summaries:
+                conn.request('GET', target)
+                response = conn.getresponse()
+                response.read()
+                etags[target] = response.getheader('ETag')
+            first_ms = (time.perf_counter() - start) * 1000 / len(summaries)
+            conn.close()
+
+            rows = [("scenario", "req/s", "statuses")]
+            for label, targets, headers in [("summary, cached", summaries, plain),
+                                            ("summary, If-None-Match", summaries, revalidate),
+                                            ("raw day range", ranges, plain)]:
+                rate, statuses = asyncio.run(api_load(API_BENCH_PORT, targets, headers, API_SECONDS, API_CONCURRENCY))
+                rows.append((label, f"{rate:.0f}", ",".join(sorted(statuses))))
+            rows.append(("first summary of a week (ms)", f"{first_ms:.1f}", ""))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print_table(f"HTTP API, {API_ROWS} rows, {API_CONCURRENCY} connections", rows)
+
+
+def bench_backup():
+    """Online backup throughput and the write latency seen meanwhile"""
+    import threading
+    import backup
+    import database
+
+    with temp_database('wal') as path:
+        app_ids = populate_records(BACKUP_ROWS)
+        rows = [("pages/step", "writer", "MiB", "s", "MiB/s", "restarts", "writes", "max write ms")]
+        for pages in BACKUP_STEPS:
+            for writing in (False, True):
+                latencies = []
+                stop = threading.Event()
+
+                def writer():
+                    # Stands in for the UI committing records during the backup
+                    while writing and not stop.is_set():
+                        start = time.perf_counter()
+                        database.add_screen_time(app_ids[0], 1, '2030-01-01')
+                        latencies.append(time.perf_counter() - start)
+                        time.sleep(0.005)
+
+                thread = threading.Thread(target=writer)
+                thread.start()
+                report = backup.backup(path, reason='bench', pages=pages)
+                stop.set()
+                thread.join()
+                mib = report.bytes / 2**20
+                rows.append((pages, "yes" if writing else "no", f"{mib:.1f}", f"{report.seconds:.2f}",
+                             f"{mib / report.seconds:.0f}", report.restarts, len(latencies),
+                             f"{max(latencies, default=0) * 1000:.1f}"))
+        database.close_db()
+
+    print_table(f"Online backup, {BACKUP_ROWS} rows", rows)
+
+
+def bench_categorize():
+    """Names per second through the combined rule matcher, against trying the rules one by one"""
+    import re
+    import database
+    from app_config import CATEGORY_RULES, DEFAULT_CATEGORY
+    from categorizer import Categorizer, config_categories, import_apps, rule_pattern
+
+    rng = random.Random(SEED)
+    names = synthetic_app_names(CATEGORIZE_NAMES // 2)
+    names += [f"com.{rng.choice(WORDS)}.{rng.choice(WORDS)}{i}" for i in range(CATEGORIZE_NAMES - len(names))]
+    known = config_categories()
+    exact = {name.casefold(): category for name, category in known.items()}
+    compiled = [(re.compile(rule_pattern(kind, pattern), re.IGNORECASE | re.DOTALL), category)
+                for kind, pattern, category in CATEGORY_RULES]
+
+    def rule_by_rule():
+        # One regex per rule, tried in order until one matches
+        for name in names:
+            category = exact.get(name.casefold())
+            if category is None:
+                category = next((category for pattern, category in compiled if pattern.match(name)),
+                                DEFAULT_CATEGORY)
+
+    def combined():
+        Categorizer(known=known).categorize_many(names)
+
+    categorizer = Categorizer(known=known)
+    categorizer.categorize_many(names)
+    rows = [("method", "ms", "names/s")]
+    for label, func in [("rule by rule", rule_by_rule), ("combined, cold", combined),
+                        ("combined, memoized", lambda: categorizer.categorize_many(names))]:
+        ms = best_time(func)
+        rows.append((label, f"{ms:.1f}", f"{len(names) / ms * 1000:,.0f}"))
+    print_table(f"Categorize {len(names)} app names, {len(CATEGORY_RULES)} rules", rows)
+
+    counts = {}
+    for category in categorizer.categorize_many(names):
+        counts[category] = counts.get(category, 0) + 1
+    print("Categories:", ", ".join(f"{category} {count}" for category, count in sorted(counts.items())))
+
+    with temp_database():
+        start = time.perf_counter()
+        added, _ = import_apps(names[:CATEGORIZE_IMPORT], Categorizer(known=known))
+        seconds = time.perf_counter() - start
+        database.close_db()
+    print(f"Imported {added} apps in {seconds:.2f} s ({added / seconds:,.0f} apps/s)")
+
+
+def bench_audit():
+    """Full audit against an incremental one after a week of new records"""
+    import audit
+    import database
+
+    with temp_database('wal') as path:
+        app_ids = populate_records(AUDIT_ROWS, apps=AUDIT_APPS, start_day='2005-01-01')
+        rows = [("audit", "entries", "seconds")]
+        report = audit.audit(path)
+        rows.append(("full, first run", report['entries_scanned'], report['seconds']))
+        report = audit.audit(path)
+        rows.append(("full", report['entries_scanned'], report['seconds']))
+        for day in range(AUDIT_CHANGED_DAYS):
+            database.add_screen_time(app_ids[0], 5, f'2030-01-0{day + 1}')
+        report = audit.audit(path, incremental=True)
+        rows.append((f"incremental, {report['changed_days']} days", report['entries_scanned'], report['seconds']))
+        database.close_db()
+
+    print_table(f"Audit, {AUDIT_ROWS} rows", rows)
+
+
+def bench_imputation():
+    """Vectorized imputation models and their backtest, against a per-cell window mean"""
+    import numpy as np
+    import pandas as pd
+    import imputation
+
+    rng = np.random.default_rng(SEED)
+    days = IMPUTATION_YEARS * 365
+    # Per app level, weekend lift and slow drift, plus noise and unrecorded days
+    level = rng.gamma(2.0, 15.0, IMPUTATION_APPS)
+    weekend = (np.arange(days) % 7 >= 5)[:, None] * rng.uniform(0, 1.5, IMPUTATION_APPS)
+    drift = 1 + 0.3 * np.sin(np.arange(days)[:, None] / 90 + rng.uniform(0, 6, IMPUTATION_APPS))
+    values = np.maximum(rng.normal(level * (1 + weekend) * drift, level * 0.3), 0).round()
+    known = rng.random(days) > 0.05
+    values[~known] = 0
+    matrix = imputation.UsageMatrix(0, np.arange(IMPUTATION_APPS), values, known)
+
+    frame = pd.DataFrame({'app_id': np.tile(np.arange(IMPUTATION_APPS), days),
+                          'day': np.repeat(np.arange(days), IMPUTATION_APPS), 'time_spent': values.ravel()})
+    frame = frame[np.repeat(known, IMPUTATION_APPS)]
+
+    def per_cell():
+        # Previous generator: one filtered mean per app of a day
+        for app_id in range(IMPUTATION_APPS):
+            mask = (frame['app_id'] == app_id) & (frame['day'] >= 1000 - 7) & (frame['day'] <= 1000 + 7)
+            frame.loc[mask, 'time_spent'].mean()
+
+    rows = [("method", "ms per day", "ms all days")]
+    cell_ms = best_time(per_cell, repeat=1)
+    rows.append(("per-cell window mean", f"{cell_ms:.1f}", f"{cell_ms * days:.0f}"))
+    for model in imputation.MODELS.values():
+        ms = best_time(lambda: imputation.estimate(model, values, known))
+        rows.append((f"{model.name} ({len(model.offsets)} offsets)", f"{ms / days:.4f}", f"{ms:.1f}"))
+    print_table(f"Estimate {days} days x {IMPUTATION_APPS} apps", rows)
+
+    start = time.perf_counter()
+    scores = imputation.backtest(matrix, rounds=IMPUTATION_ROUNDS)
+    seconds = time.perf_counter() - start
+    rows = [("model", "cell MAE", "day MAE", "day bias", "coverage")]
+    rows += [(s.model, f"{s.cell_mae:.2f}", f"{s.day_mae:.1f}", f"{s.day_bias:.1f}", f"{s.coverage:.1%}")
+             for s in scores]
+    print_table(f"Backtest, {scores[0].gaps} hidden days per model in {seconds:.2f} s", rows)
+
+
+def bench_profiles():
+    """Switching database profiles and reopening the charts, cold against warm"""
+    import config
+    import database
+    import metadata
+    import profiles
+
+    saved = config.get_profile_name()
+    with tempfile.TemporaryDirectory() as tmp:
+        names = ['bench_a', 'bench_b']
+        for name in names:
+            config.DB_CONFIG[name] = {'name': os.path.join(tmp, f'{name}.db'), 'sample_data': False, 'storage': 'wal'}
+            config.set_profile(name)
+            database.init_db()
+            populate_records(PROFILE_ROWS)
+        try:
+            manager = profiles.ProfileManager()
+
+            def open_profile(name):
+                # What the UI does: switch, then build what the main window and charts read
+                manager.switch(name)
+                metadata.get_registry()
+                manager.columns()
+
+            def restart(name):
+                # Previous behaviour: a fresh process on the other database
+                config.set_profile(name)
+                metadata.MetadataRegistry()
+                database.fetch_screen_time_columns()
+
+            rows = [("switch", "ms")]
+            rows.append(("restart-style reload", f"{best_time(lambda: restart(names[1])):.1f}"))
+            start = time.perf_counter()
+            open_profile(names[0])
+            open_profile(names[1])
+            rows.append(("first use of both profiles", f"{(time.perf_counter() - start) * 1000:.1f}"))
+            rows.append(("warm switch and back", f"{best_time(lambda: (open_profile(names[0]), open_profile(names[1]))):.3f}"))
+            manager.budget = 0
+            rows.append(("switch and back, parked profile evicted",
+                         f"{best_time(lambda: (open_profile(names[0]), open_profile(names[1]))):.1f}"))
+            manager.close()
+        finally:
+            for name in names:
+                del config.DB_CONFIG[name]
+            config.set_profile(saved)
+            metadata.set_registry(None)
+
+    print_table(f"Profile switching, {PROFILE_ROWS} rows per profile", rows)
+
+
+def bench_dialogs():
+    """Time to open the batch entry and settings dialogs: built fresh against shown again"""
+    import tkinter as tk
+    import database
+    import metadata
+    from batch_entry import BatchEntryDialog
+    from settings_dialog import SettingsDialog
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"The dialogs benchmark needs a display: {e}")
+        return
+    root.withdraw()
+
+    def open_ms(func):
+        # Until the dialog is drawn, not just constructed
+        start = time.perf_counter()
+        result = func()
+        root.update()
+        return result, (time.perf_counter() - start) * 1000
+
+    def fresh_ms(build, repeat=3):
+        best = float('inf')
+        for _ in range(repeat):
+            dialog, ms = open_ms(build)
+            dialog.dialog.destroy()
+            best = min(best, ms)
+        return best
+
+    def reopen_ms(dialog, show):
+        dialog.hide()
+        best = float('inf')
+        for _ in range(REPEAT):
+            root.update()
+            best = min(best, open_ms(show)[1])
+            dialog.hide()
+        return best
+
+    def build_all_tabs():
+        # Previous behaviour: every tab populated up front
+        dialog = SettingsDialog(root)
+        for tab in dialog.notebook.tabs():
+            dialog.notebook.select(tab)
+            dialog.build_current_tab()
+        return dialog
+
+    with temp_database('wal'):
+        metadata.set_registry(None)
+        database.add_category("Bench")
+        database.add_apps_by_category([(name, "Bench") for name in synthetic_app_names(DIALOG_APPS)])
+        registry = metadata.get_registry()
+        apps = registry.sorted_app_names()
+        rows = [("dialog", "built fresh ms", "shown again ms", "shown again, 1 new app ms")]
+
+        batch = BatchEntryDialog(root, apps, lambda *args: None)
+        unchanged = reopen_ms(batch, lambda: batch.show(apps))
+        database.add_app_by_category("Bench new app", "Bench")
+        apps = registry.sorted_app_names()
+        changed = reopen_ms(batch, lambda: batch.show(apps))
+        rows.append(("batch entry", f"{fresh_ms(lambda: BatchEntryDialog(root, apps, lambda *args: None)):.1f}",
+                     f"{unchanged:.1f}", f"{changed:.1f}"))
+
+        settings = SettingsDialog(root)
+        unchanged = reopen_ms(settings, settings.show)
+        database.add_app_by_category("Bench other app", "Bench")
+        changed = reopen_ms(settings, settings.show)
+        rows.append(("settings, all tabs", f"{fresh_ms(build_all_tabs):.1f}", "", ""))
+        rows.append(("settings, lazy tabs", f"{fresh_ms(lambda: SettingsDialog(root)):.1f}",
+                     f"{unchanged:.1f}", f"{changed:.1f}"))
+        metadata.set_registry(None)
+        database.close_db()
+    root.destroy()
+
+    print_table(f"Dialog time to open, {DIALOG_APPS} apps", rows)
+
+
+BENCHMARKS = {
+    'aggregate': bench_aggregate,
+    'api': bench_api,
+    'audit': bench_audit,
+    'backup': bench_backup,
+    'categorize': bench_categorize,
+    'dialogs': bench_dialogs,
+    'fetch': bench_fetch,
+    'imputation': bench_imputation,
+    'pie_labels': bench_pie_labels,
+    'profiles': bench_profiles,
+    'search': bench_search,
+    'sessions': bench_sessions,
+    'storage': bench_storage,
+    'trends': bench_trends,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Screen Time Tracker benchmarks")
+    parser.add_argument('names', nargs='*', choices=[[]] + list(BENCHMARKS),
+                        help="Benchmarks to run (default: all)")
+    args = parser.parse_args()
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name]()
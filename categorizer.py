@@ -0,0 +1,125 @@
+import argparse
+import re
+import time
+from functools import lru_cache
+from app_config import APP_CONFIG, CATEGORY_RULES, DEFAULT_CATEGORY
+from database import add_apps_by_category, add_category, init_db
+
+# --- CONFIGURATION ---
+MEMO_SIZE = 65536             # Names whose category is remembered
+RULE_KINDS = ('exact', 'prefix', 'regex', 'package')
+
+
+def rule_pattern(kind, pattern):
+    """Regex source of one rule, matched from the start of the name"""
+    if kind == 'exact':
+        return re.escape(pattern) + r'\Z'
+    if kind == 'prefix':
+        return re.escape(pattern)
+    if kind == 'regex':
+        return f'.*?(?:{pattern})'
+    if kind == 'package':
+        return re.escape(pattern).replace(r'\*', '.*').replace(r'\?', '.') + r'\Z'
+    raise ValueError(f"Unknown rule kind {kind!r}, expected one of {', '.join(RULE_KINDS)}")
+
+
+class Categorizer:
+    """
+    Picks a category for an app name. Exact names are a dict lookup; the
+    other rules are compiled into one regex of named alternatives, all
+    anchored at the start of the name, so a single match tries them in
+    order and the first that matches wins. Results are memoized.
+    """
+
+    def __init__(self, rules=CATEGORY_RULES, known=None, default=DEFAULT_CATEGORY):
+        self.default = default
+        self.exact = {name.casefold(): category for name, category in (known or {}).items()}
+        self.categories = []          # group index -> category
+        alternatives = []
+        for kind, pattern, category in rules:
+            source = rule_pattern(kind, pattern)
+            if kind == 'exact':
+                self.exact.setdefault(pattern.casefold(), category)
+                continue
+            re.compile(source)        # Report a bad pattern on its own, not inside the combined one
+            alternatives.append(f'(?P<r{len(self.categories)}>{source})')
+            self.categories.append(category)
+        self.matcher = re.compile('|'.join(alternatives), re.IGNORECASE | re.DOTALL) if alternatives else None
+        self.categorize = lru_cache(maxsize=MEMO_SIZE)(self.match)
+
+    def match(self, name):
+        """Category of one name, without the memo"""
+        name = name.strip()
+        category = self.exact.get(name.casefold())
+        if category is not None:
+            return category
+        found = self.matcher.match(name) if self.matcher is not None else None
+        if found is None:
+            return self.default
+        return self.categories[int(found.lastgroup[1:])]
+
+    def categorize_many(self, names):
+        return [self.categorize(name) for name in names]
+
+
+def config_categories():
+    """app name -> category of the apps listed in APP_CONFIG"""
+    return {app: category for category, apps in APP_CONFIG.items() for app in apps}
+
+
+_categorizer = None
+
+
+def get_categorizer():
+    """Shared categorizer over APP_CONFIG and CATEGORY_RULES"""
+    global _categorizer
+    if _categorizer is None:
+        _categorizer = Categorizer(known=config_categories())
+    return _categorizer
+
+
+def categorize(name):
+    return get_categorizer().categorize(name)
+
+
+def import_apps(names, categorizer=None):
+    """
+    Add app names with their automatic categories in one transaction,
+    creating any rule category missing from the database. Returns
+    (apps added, name -> category).
+    """
+    categorizer = categorizer or get_categorizer()
+    names = list(dict.fromkeys(name.strip() for name in names if name.strip()))
+    assigned = dict(zip(names, categorizer.categorize_many(names)))
+    for category in set(assigned.values()):
+        add_category(category)
+    return add_apps_by_category(list(assigned.items())), assigned
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Categorize app names and optionally add them to the database")
+    parser.add_argument('file', help="Text file with one app name per line")
+    parser.add_argument('--import', dest='do_import', action='store_true', help="Add the apps to the database")
+    args = parser.parse_args()
+
+    with open(args.file, encoding='utf-8') as f:
+        names = f.read().splitlines()
+    if args.do_import:
+        init_db()
+        start = time.perf_counter()
+        added, assigned = import_apps(names)
+        print(f"Added {added} of {len(assigned)} apps in {time.perf_counter() - start:.2f} s")
+    else:
+        categorizer = get_categorizer()
+        assigned = {name: categorizer.categorize(name) for name in names if name.strip()}
+        for name, category in assigned.items():
+            print(f"{name}\t{category}")
+    counts = {}
+    for category in assigned.values():
+        counts[category] = counts.get(category, 0) + 1
+    for category, count in sorted(counts.items(), key=lambda item: -item[1]):
+        print(f"{category}: {count}")
+
+
+if __name__ == "__main__":
+    main()
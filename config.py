@@ -1,17 +1,77 @@
+import os
+
 # Database configurations
 DEBUG_MODE = False  # Switch between debug and production
+PROFILE_ENV_VAR = 'SCREEN_TIME_PROFILE'  # Overrides the starting profile, e.g. SCREEN_TIME_PROFILE=2025
+PROFILE_CACHE_BUDGET_MB = 256  # Memory kept warm for profiles switched away from (see profiles.py)
+
+# SQLite settings applied to every connection, selected per environment
+STORAGE_PROFILES = {
+    'default': {},                  # SQLite defaults (rollback journal, synchronous=FULL)
+    'wal': {
+        'journal_mode': 'WAL',      # Readers don't block the writer
+        'synchronous': 'NORMAL',    # Safe with WAL, fsync only at checkpoints
+        'cache_size': -16000,       # Negative means KiB, so ~16 MB page cache
+        'mmap_size': 268435456,     # Memory-map up to 256 MB of the file
+        'temp_store': 'MEMORY',
+    },
+    'fast': {                       # Throwaway data only, a crash can corrupt the file
+        'journal_mode': 'MEMORY',
+        'synchronous': 'OFF',
+        'cache_size': -16000,
+        'temp_store': 'MEMORY',
+    },
+}
 
 DB_CONFIG = {
     'debug': {
         'name': 'screen_time_debug.db',
-        'sample_data': True     # Whether to load sample data
+        'sample_data': True,    # Whether to load sample data
+        'storage': 'fast'
     },
     'production': {
         'name': 'screen_time.db',
-        'sample_data': False
+        'sample_data': False,
+        'storage': 'wal'
+    },
+    '2025': {
+        'name': 'screen_time_2025.db',
+        'sample_data': False,
+        'storage': 'wal'
     }
 }
+_active_profile = None  # Set at runtime by set_profile()
+
+# Hot-path instrumentation (see instrumentation.py), SCREEN_TIME_TRACE=1 also enables it
+INSTRUMENTATION = False
+TRACE_FILE = 'screen_time.trace.json'  # *.trace.json is Chrome trace format, other names plain JSON
+
+# SQL statement log (see query_log.py), SCREEN_TIME_QUERY_LOG=1 also enables it
+QUERY_LOG = False
+SLOW_QUERY_MS = 20           # Statements slower than this get their query plan captured
+
+# Online backups (see backup.py)
+BACKUP_ON_CLOSE = True       # Snapshot the database when the main window closes
+BACKUP_EVERY_WRITES = 500    # Also snapshot after this many records, 0 disables
+
+def get_profile_name():
+    """Name of the current DB_CONFIG entry: set at runtime, else from the environment, else by mode"""
+    if _active_profile is not None:
+        return _active_profile
+    return os.environ.get(PROFILE_ENV_VAR) or ('debug' if DEBUG_MODE else 'production')
+
+def set_profile(name):
+    """Make a DB_CONFIG entry current, every later database call uses it"""
+    global _active_profile
+    if name not in DB_CONFIG:
+        raise ValueError(f"Unknown profile {name!r}, expected one of {', '.join(DB_CONFIG)}")
+    _active_profile = name
 
 def get_db_config():
-    """Get current database configuration based on mode"""
-    return DB_CONFIG['debug'] if DEBUG_MODE else DB_CONFIG['production'] 
\ No newline at end of file
+    """Get current database configuration based on the profile"""
+    return DB_CONFIG[get_profile_name()]
+
+def get_storage_profile():
+    """Get the pragmas for the current database, SCREEN_TIME_STORAGE overrides the profile name"""
+    name = os.environ.get('SCREEN_TIME_STORAGE') or get_db_config().get('storage', 'default')
+    return STORAGE_PROFILES[name]
@@ -1,12 +1,59 @@
+import argparse
+import os
 import sqlite3
-from config import get_db_config
+from collections import namedtuple
+from contextlib import closing
+import numpy as np
+from config import get_db_config, get_storage_profile
+from utils import to_day
+from instrumentation import traced
+import query_log
+import events
+
+SCHEMA_VERSION = 2  # Stored in PRAGMA user_version
+FETCH_BATCH = 50000  # Rows per fetchmany when filling arrays
+
+# One record per row; app and category index the name arrays of EntryColumns
+ENTRY_DTYPE = np.dtype([('app', np.int32), ('category', np.int32), ('minutes', np.int32), ('day', np.int32)])
+EntryColumns = namedtuple('EntryColumns', ['entries', 'app_names', 'category_names'])
+
+# SQL expressions converting between day numbers and YYYY-MM-DD text
+DAY_TO_TEXT = "date({} * 86400, 'unixepoch')"
+TEXT_TO_DAY = "CAST(julianday({}) - 2440587.5 AS INTEGER)"
 
 def get_db_path():
     """Get the current database path"""
     return get_db_config()['name']
 
-def init_db():
-    conn = sqlite3.connect(get_db_path())
+@traced(category='sql')
+def apply_storage_profile(conn, profile=None):
+    """Apply the storage profile pragmas to an open connection"""
+    profile = get_storage_profile() if profile is None else profile
+    for pragma, value in profile.items():
+        conn.execute(f'PRAGMA {pragma} = {value}')
+
+@traced(category='sql')
+def get_connection(db_path=None, profile=None):
+    """Open a connection to the database with the storage profile applied"""
+    factory = query_log.LoggedConnection if query_log.is_enabled() else sqlite3.Connection
+    # uri=True lets archives be attached read-only (file:...?mode=ro)
+    conn = sqlite3.connect(db_path or get_db_path(), factory=factory, uri=True)
+    apply_storage_profile(conn, profile)
+    return conn
+
+@traced(category='sql')
+def close_db():
+    """Checkpoint the WAL and refresh query planner statistics, call on shutdown"""
+    with closing(get_connection()) as conn:
+        conn.execute('PRAGMA optimize')
+        journal_mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+        if journal_mode.lower() == 'wal':
+            # Fold the WAL back into the main file and truncate it
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+@traced(category='sql')
+def init_db(db_path=None):
+    conn = get_connection(db_path)
     cursor = conn.cursor()
     
     # Categories table with color column
@@ -29,42 +76,242 @@ def init_db():
         )
     ''')
     
-    # Screen time records table with foreign key to apps
+    # Screen time entries with the date stored as a day number
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS screen_time_records (
+        CREATE TABLE IF NOT EXISTS screen_time_entries (
             id INTEGER PRIMARY KEY,
             app_id INTEGER NOT NULL,
             time_spent INTEGER NOT NULL,
-            date TEXT NOT NULL,
+            day INTEGER NOT NULL,
             FOREIGN KEY (app_id) REFERENCES apps (id)
         )
     ''')
-    
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_entries_day ON screen_time_entries (day)')
+
+    # Daily or weekly limits on an app or a category, referenced by name
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS limits (
+            id INTEGER PRIMARY KEY,
+            target_type TEXT NOT NULL CHECK (target_type IN ('app', 'category')),
+            target_name TEXT NOT NULL,
+            period TEXT NOT NULL CHECK (period IN ('day', 'week')),
+            minutes INTEGER NOT NULL,
+            UNIQUE (target_type, target_name, period)
+        )
+    ''')
+
+    # Closed years moved to read-only archive files (see archive.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS archives (
+            year INTEGER PRIMARY KEY,
+            path TEXT NOT NULL,           -- Relative to the live database
+            first_day INTEGER NOT NULL,
+            last_day INTEGER NOT NULL,
+            rows INTEGER NOT NULL,
+            minutes INTEGER NOT NULL
+        )
+    ''')
+
+    # Optional timed sessions, in minutes since 1970-01-01 00:00; their per
+    # day totals are derived into screen_time_entries (see sessions.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY,
+            app_id INTEGER NOT NULL,
+            start_minute INTEGER NOT NULL,
+            end_minute INTEGER NOT NULL CHECK (end_minute > start_minute),
+            FOREIGN KEY (app_id) REFERENCES apps (id)
+        )
+    ''')
+    # The entry holding each derived (app, day) total
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS session_entries (
+            app_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            entry_id INTEGER NOT NULL,
+            PRIMARY KEY (app_id, day)
+        ) WITHOUT ROWID
+    ''')
+    create_session_index(cursor)
+
+    migrate_db(conn)
+
     conn.commit()
     conn.close()
 
+@traced(category='sql')
+def create_session_index(cursor):
+    """
+    Interval index over the sessions: an R*Tree kept in step by triggers,
+    or a plain index on the start when SQLite is built without R*Tree.
+    """
+    try:
+        cursor.execute('CREATE VIRTUAL TABLE IF NOT EXISTS sessions_index USING rtree_i32(id, start_minute, end_minute)')
+    except sqlite3.OperationalError:
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_start ON sessions (start_minute)')
+        return
+    cursor.executescript('''
+        CREATE TRIGGER IF NOT EXISTS sessions_index_insert AFTER INSERT ON sessions
+        BEGIN
+            INSERT INTO sessions_index VALUES (NEW.id, NEW.start_minute, NEW.end_minute);
+        END;
+        CREATE TRIGGER IF NOT EXISTS sessions_index_update AFTER UPDATE ON sessions
+        BEGIN
+            UPDATE sessions_index SET start_minute = NEW.start_minute, end_minute = NEW.end_minute
+            WHERE id = NEW.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS sessions_index_delete AFTER DELETE ON sessions
+        BEGIN
+            DELETE FROM sessions_index WHERE id = OLD.id;
+        END;
+    ''')
+
+def archive_file_path(path, db_path=None):
+    """Resolve an archive path stored in the archives table"""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path or get_db_path())), path)
+
+@traced(category='sql')
+def attach_archives(conn, start_day=None, end_day=None):
+    """
+    Attach, read-only, the archives overlapping a day range and return the
+    name of a table or temp view holding every entry of the range. Without
+    overlapping archives this is just screen_time_entries.
+    """
+    archives = conn.execute('SELECT year, path FROM main.archives WHERE last_day >= ? AND first_day <= ?', (
+        start_day if start_day is not None else -2**62,
+        end_day if end_day is not None else 2**62
+    )).fetchall()
+    if not archives:
+        return 'screen_time_entries'
+    files = {name: file for _, name, file in conn.execute('PRAGMA database_list')}
+    selects = ['SELECT id, app_id, time_spent, day FROM main.screen_time_entries']
+    for year, path in archives:
+        schema = f'archive_{year}'
+        if schema not in files:
+            # Archive paths are relative to the live file this connection reads
+            path = archive_file_path(path, files['main'] or None)
+            conn.execute(f'ATTACH DATABASE ? AS {schema}', (f'file:{path}?mode=ro',))
+        selects.append(f'SELECT id, app_id, time_spent, day FROM {schema}.screen_time_entries')
+    view = 'entries_' + '_'.join(str(year) for year, _ in archives)
+    conn.execute(f'CREATE TEMP VIEW IF NOT EXISTS {view} AS ' + ' UNION ALL '.join(selects))
+    return view
+
+@traced(category='sql')
+def migrate_db(conn):
+    """Move old text-date records into screen_time_entries and expose them through a view"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT type FROM sqlite_master WHERE name = 'screen_time_records'")
+    result = cursor.fetchone()
+
+    if result and result[0] == 'table':
+        # Version 0: records stored with TEXT dates
+        cursor.execute(f'''
+            INSERT INTO screen_time_entries (id, app_id, time_spent, day)
+            SELECT id, app_id, time_spent, {TEXT_TO_DAY.format('date')}
+            FROM screen_time_records
+        ''')
+        cursor.execute('DROP TABLE screen_time_records')
+        result = None
+    elif result and conn.execute('PRAGMA user_version').fetchone()[0] < 2:
+        # Version 1: the view also had a day column, so SELECT * changed shape
+        cursor.execute('DROP VIEW screen_time_records')  # Drops its triggers too
+        result = None
+
+    if not result:
+        # Backward-compatible view with the old text date column,
+        # writable through INSTEAD OF triggers so older scripts keep working
+        cursor.execute(f'''
+            CREATE VIEW screen_time_records AS
+            SELECT id, app_id, time_spent, {DAY_TO_TEXT.format('day')} AS date
+            FROM screen_time_entries
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER screen_time_records_insert
+            INSTEAD OF INSERT ON screen_time_records
+            BEGIN
+                INSERT INTO screen_time_entries (id, app_id, time_spent, day)
+                VALUES (NEW.id, NEW.app_id, NEW.time_spent, {TEXT_TO_DAY.format('NEW.date')});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER screen_time_records_update
+            INSTEAD OF UPDATE ON screen_time_records
+            BEGIN
+                UPDATE screen_time_entries
+                SET app_id = NEW.app_id,
+                    time_spent = NEW.time_spent,
+                    day = {TEXT_TO_DAY.format('NEW.date')}
+                WHERE id = OLD.id;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER screen_time_records_delete
+            INSTEAD OF DELETE ON screen_time_records
+            BEGIN
+                DELETE FROM screen_time_entries WHERE id = OLD.id;
+            END
+        ''')
+
+    cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+@traced(category='sql')
+def schema_version(db_path=None):
+    """PRAGMA user_version of a database, read without writing to it"""
+    db_path = db_path or get_db_path()
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"Database {db_path} does not exist")
+    with closing(sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)) as conn:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def require_schema(db_path=None):
+    """
+    For scripts that only read: fail instead of migrating an older file.
+    The migration is run on purpose with `python database.py --migrate`.
+    """
+    db_path = db_path or get_db_path()
+    version = schema_version(db_path)
+    if version != SCHEMA_VERSION:
+        raise RuntimeError(f"{db_path} has schema version {version}, expected {SCHEMA_VERSION}. "
+                           f"Migrate it first: python database.py --migrate --db {db_path}")
+
+@traced(category='sql')
+def get_read_connection(db_path=None):
+    """
+    Read-only connection for scripts that only read, after require_schema.
+    No storage profile is applied, so the file keeps its journal mode.
+    """
+    db_path = db_path or get_db_path()
+    require_schema(db_path)
+    factory = query_log.LoggedConnection if query_log.is_enabled() else sqlite3.Connection
+    return sqlite3.connect(f'file:{db_path}?mode=ro', factory=factory, uri=True)
+
+@traced(category='sql')
 def add_category(name, color='#808080'):
     try:
-        with sqlite3.connect(get_db_path()) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('INSERT INTO categories (name, color) VALUES (?, ?)', (name, color))
             category_id = cursor.lastrowid
             conn.commit()
-            return category_id
+        events.publish('category_added', category_id=category_id, name=name, color=color)
+        return category_id
     except sqlite3.IntegrityError:
         # If category already exists, fetch its id
         return get_category_id(name)
 
+@traced(category='sql')
 def update_category_color(name, color):
     """Update category color"""
-    with sqlite3.connect(get_db_path()) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('UPDATE categories SET color = ? WHERE name = ?', (color, name))
         conn.commit()
+    events.publish('category_color_changed', name=name, color=color)
 
+@traced(category='sql')
 def add_app(name, category_id):
     try:
-        with sqlite3.connect(get_db_path()) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO apps (name, category_id, is_favorite) 
@@ -72,42 +319,220 @@ def add_app(name, category_id):
             ''', (name, category_id))
             app_id = cursor.lastrowid
             conn.commit()
-            return app_id
+        events.publish('app_added', app_id=app_id, name=name, category_id=category_id)
+        return app_id
+    except sqlite3.IntegrityError:
+        # If app already exists, fetch its id
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id FROM apps WHERE name = ?', (name,))
+            result = cursor.fetchone()
+            return result[0] if result else None
+
+@traced(category='sql')
+def add_app_by_category(name, category_name):
+    """Add an app to a category by name in a single statement.
+    Returns the app id, or None if the category does not exist."""
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO apps (name, category_id, is_favorite)
+                SELECT ?, id, 0 FROM categories WHERE name = ? LIMIT 1
+                RETURNING id, category_id
+            ''', (name, category_name))
+            result = cursor.fetchone()
+            conn.commit()
+            if result is None:
+                return None
+            app_id, category_id = result
+        events.publish('app_added', app_id=app_id, name=name, category_id=category_id)
+        return app_id
     except sqlite3.IntegrityError:
         # If app already exists, fetch its id
-        with sqlite3.connect(get_db_path()) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT id FROM apps WHERE name = ?', (name,))
             result = cursor.fetchone()
             return result[0] if result else None
 
+@traced(category='sql')
+def add_apps_by_category(rows):
+    """Add many (app name, category name) pairs in one transaction.
+    Apps that already exist or whose category does not are skipped.
+    Returns the number of apps added."""
+    with get_connection() as conn:
+        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM apps').fetchone()[0]
+        conn.executemany('''
+            INSERT OR IGNORE INTO apps (name, category_id, is_favorite)
+            SELECT ?, id, 0 FROM categories WHERE name = ? LIMIT 1
+        ''', rows)
+        conn.commit()
+        added = conn.execute('SELECT id, name, category_id FROM apps WHERE id > ? ORDER BY id',
+                             (last_id,)).fetchall()
+    for app_id, name, category_id in added:
+        events.publish('app_added', app_id=app_id, name=name, category_id=category_id)
+    return len(added)
+
+@traced(category='sql')
 def add_screen_time(app_id, time_spent, date):
-    with sqlite3.connect(get_db_path()) as conn:
+    """Add a record, date is a YYYY-MM-DD string, a date or a day number"""
+    day = date if isinstance(date, int) else to_day(date)
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('''
-            INSERT INTO screen_time_records (app_id, time_spent, date)
+            INSERT INTO screen_time_entries (app_id, time_spent, day)
             VALUES (?, ?, ?)
-        ''', (app_id, time_spent, date))
+        ''', (app_id, time_spent, day))
         conn.commit()
+    events.publish('record_added', app_id=app_id, time_spent=time_spent, day=day)
 
+@traced(category='sql')
 def fetch_screen_time_data():
-    with sqlite3.connect(get_db_path()) as conn:
+    """Fetch (app, category, minutes, YYYY-MM-DD) rows"""
+    columns = fetch_screen_time_columns()
+    dates = np.datetime_as_string(columns.entries['day'].astype('datetime64[D]'))
+    return entry_rows(columns, dates)
+
+@traced(category='sql')
+def fetch_screen_time_days(start_day=None, end_day=None, ordered=False):
+    """Fetch (app, category, minutes, day number) rows, optionally within a day range"""
+    return entry_rows(fetch_screen_time_columns(start_day, end_day, ordered))
+
+@traced(category='sql')
+def fetch_screen_time_columns(start_day=None, end_day=None, ordered=False, conn=None):
+    """
+    Fetch entries into an EntryColumns: a structured ENTRY_DTYPE array
+    filled from fetchmany batches, with apps and categories as integer codes
+    into arrays holding each name once. Categories are coded by name, as
+    older databases repeat names under several ids. conn reads through an
+    already open (e.g. read-only) connection.
+    """
+    if conn is None:
+        with get_connection() as conn:
+            return _fetch_columns(conn, start_day, end_day, ordered)
+    return _fetch_columns(conn, start_day, end_day, ordered)
+
+def _fetch_columns(conn, start_day, end_day, ordered):
+    query = '''
+        SELECT se.app_id, a.category_id, se.time_spent, se.day
+        FROM {} se
+        JOIN apps a ON se.app_id = a.id
+        JOIN categories c ON a.category_id = c.id
+        WHERE se.day BETWEEN ? AND ?
+    '''
+    if ordered:
+        query += ' ORDER BY se.day'  # Walks idx_entries_day, no sort step
+    bounds = (start_day if start_day is not None else -2**62,
+              end_day if end_day is not None else 2**62)
+    source = attach_archives(conn, start_day, end_day)
+    conn.execute('BEGIN')  # Count and rows from the same snapshot
+    try:
+        apps = conn.execute('SELECT id, name FROM apps ORDER BY name').fetchall()
+        categories = conn.execute('SELECT id, name FROM categories').fetchall()
+        # Upper bound, entries of deleted apps or categories are dropped by the joins
+        count = conn.execute(f'SELECT COUNT(*) FROM {source} WHERE day BETWEEN ? AND ?', bounds).fetchone()[0]
+        entries = np.empty(count, dtype=ENTRY_DTYPE)
+        cursor = conn.execute(query.format(source), bounds)
+        filled = 0
+        while True:
+            rows = cursor.fetchmany(FETCH_BATCH)
+            if not rows:
+                break
+            entries[filled:filled + len(rows)] = rows
+            filled += len(rows)
+    finally:
+        conn.rollback()
+    entries = entries[:filled]
+
+    # Database ids -> codes, through lookup arrays indexed by id
+    app_names = np.array([name for _, name in apps], dtype=object)
+    app_codes = np.zeros(max((app_id for app_id, _ in apps), default=0) + 1, dtype=np.int32)
+    app_codes[[app_id for app_id, _ in apps]] = np.arange(len(apps), dtype=np.int32)
+    category_names, name_codes = np.unique(np.array([name for _, name in categories], dtype=object), return_inverse=True)
+    category_codes = np.zeros(max((category_id for category_id, _ in categories), default=0) + 1, dtype=np.int32)
+    category_codes[[category_id for category_id, _ in categories]] = name_codes
+    entries['app'] = app_codes[entries['app']]
+    entries['category'] = category_codes[entries['category']]
+    return EntryColumns(entries, app_names, category_names)
+
+@traced(category='numpy')
+def entry_rows(columns, days=None):
+    """(app, category, minutes, day) tuples of an EntryColumns, days replaces the day numbers"""
+    entries, app_names, category_names = columns
+    return list(zip(app_names[entries['app']].tolist(),
+                    category_names[entries['category']].tolist(),
+                    entries['minutes'].tolist(),
+                    (entries['day'] if days is None else days).tolist()))
+
+@traced(category='sql')
+def add_session(app_id, start_minute, end_minute):
+    with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT 
-                a.name as app_name,
-                c.name as category_name,
-                sr.time_spent,
-                sr.date
-            FROM screen_time_records sr
-            JOIN apps a ON sr.app_id = a.id
-            JOIN categories c ON a.category_id = c.id
-        ''')
-        return cursor.fetchall()
+        cursor.execute('INSERT INTO sessions (app_id, start_minute, end_minute) VALUES (?, ?, ?)',
+                       (app_id, start_minute, end_minute))
+        conn.commit()
+        return cursor.lastrowid
+
+@traced(category='sql')
+def fetch_sessions(start_minute, end_minute):
+    """Fetch (app id, start, end) of the sessions overlapping [start_minute, end_minute)"""
+    with get_connection() as conn:
+        indexed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sessions_index'").fetchone()
+        if indexed:
+            query = '''
+                SELECT s.app_id, s.start_minute, s.end_minute
+                FROM sessions_index i
+                JOIN sessions s ON s.id = i.id
+                WHERE i.start_minute < ? AND i.end_minute > ?
+            '''
+        else:
+            query = '''
+                SELECT app_id, start_minute, end_minute FROM sessions
+                WHERE start_minute < ? AND end_minute > ?
+            '''
+        return conn.execute(query, (end_minute, start_minute)).fetchall()
+
+@traced(category='sql')
+def write_session_totals(start_day, end_day, totals):
+    """
+    Make the derived entries of a day range match totals, a list of
+    (app id, day, minutes). Entries not derived from sessions are left
+    alone. Returns the (app id, change in minutes, day) of every change.
+    """
+    changes = []
+    with get_connection() as conn:
+        existing = {(app_id, day): (entry_id, minutes) for app_id, day, entry_id, minutes in conn.execute('''
+            SELECT m.app_id, m.day, m.entry_id, se.time_spent
+            FROM session_entries m
+            JOIN screen_time_entries se ON se.id = m.entry_id
+            WHERE m.day BETWEEN ? AND ?
+        ''', (start_day, end_day))}
+        for app_id, day, minutes in totals:
+            entry = existing.pop((app_id, day), None)
+            if entry is None:
+                cursor = conn.execute('INSERT INTO screen_time_entries (app_id, time_spent, day) VALUES (?, ?, ?)',
+                                      (app_id, minutes, day))
+                conn.execute('INSERT INTO session_entries (app_id, day, entry_id) VALUES (?, ?, ?)',
+                             (app_id, day, cursor.lastrowid))
+                changes.append((app_id, minutes, day))
+            elif entry[1] != minutes:
+                conn.execute('UPDATE screen_time_entries SET time_spent = ? WHERE id = ?', (minutes, entry[0]))
+                changes.append((app_id, minutes - entry[1], day))
+        # Sessions gone since the last derivation
+        for (app_id, day), (entry_id, minutes) in existing.items():
+            conn.execute('DELETE FROM screen_time_entries WHERE id = ?', (entry_id,))
+            conn.execute('DELETE FROM session_entries WHERE app_id = ? AND day = ?', (app_id, day))
+            changes.append((app_id, -minutes, day))
+        conn.commit()
+    for app_id, minutes, day in changes:
+        events.publish('record_added', app_id=app_id, time_spent=minutes, day=day)
+    return changes
 
+@traced(category='sql')
 def fetch_apps():
     """Fetch apps ordered by favorite status and then name"""
-    with sqlite3.connect(get_db_path()) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             SELECT name, is_favorite 
@@ -116,35 +541,66 @@ def fetch_apps():
         ''')
         return cursor.fetchall()
 
+@traced(category='sql')
 def fetch_app_names():
     """Fetch just app names"""
-    with sqlite3.connect(get_db_path()) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('SELECT name FROM apps ORDER BY name')
         return [row[0] for row in cursor.fetchall()]
 
+@traced(category='sql')
+def fetch_app_last_used():
+    """Fetch the most recent usage date of every app that has records"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT a.name, MAX(se.day)
+            FROM screen_time_entries se
+            JOIN apps a ON se.app_id = a.id
+            GROUP BY a.id
+        ''')
+        return cursor.fetchall()
+
+@traced(category='sql')
 def get_category_id(name):
-    with sqlite3.connect(get_db_path()) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('SELECT id FROM categories WHERE name = ?', (name,))
         result = cursor.fetchone()
         return result[0] if result else None
 
+@traced(category='sql')
+def get_app_category(app_id):
+    """Category name of an app"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT c.name FROM apps a
+            JOIN categories c ON a.category_id = c.id
+            WHERE a.id = ?
+        ''', (app_id,))
+        result = cursor.fetchone()
+        return result[0] if result else None
+
+@traced(category='sql')
 def clear_screen_time_data():
     """Remove all screen time records"""
-    with sqlite3.connect(get_db_path()) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('DELETE FROM screen_time_records')
+        cursor.execute('DELETE FROM screen_time_entries')
         conn.commit()
 
+@traced(category='sql')
 def insert_sample_data():
     """Insert sample screen time data for the entire year 2024"""
-    from datetime import datetime, timedelta
+    from datetime import date
+    from utils import day_weekday
     import random
 
-    # Generate dates for all of 2024
-    start_date = datetime(2024, 1, 1)
-    dates = [(start_date + timedelta(days=x)).strftime('%Y-%m-%d') for x in range(366)]  # 2024 is leap year
+    # Generate day numbers for all of 2024
+    start_day = to_day(date(2024, 1, 1))
+    days = range(start_day, start_day + 366)  # 2024 is leap year
 
     # Define apps and their typical usage patterns (minutes)
     app_patterns = {
@@ -174,9 +630,8 @@ def insert_sample_data():
     sample_data = {}
     for app_name, patterns in app_patterns.items():
         sample_data[app_name] = []
-        for date_str in dates:
-            date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-            is_weekend = date_obj.weekday() >= 5
+        for day in days:
+            is_weekend = day_weekday(day) >= 5
             
             # Select appropriate pattern
             pattern = patterns["weekend"] if is_weekend else patterns["weekday"]
@@ -190,29 +645,24 @@ def insert_sample_data():
             elif random.random() < 0.1:  # 10% chance of unusually low usage
                 time_spent = int(time_spent * 0.5)
                 
-            sample_data[app_name].append((time_spent, date_str))
+            sample_data[app_name].append((time_spent, day))
     
-    with sqlite3.connect(get_db_path()) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         
         for app_name, time_records in sample_data.items():
-            # Get app_id
-            cursor.execute('SELECT id FROM apps WHERE name = ?', (app_name,))
-            result = cursor.fetchone()
-            if result:
-                app_id = result[0]
-                # Insert time records for this app
-                for time_spent, date in time_records:
-                    cursor.execute('''
-                        INSERT INTO screen_time_records (app_id, time_spent, date)
-                        VALUES (?, ?, ?)
-                    ''', (app_id, time_spent, date))
+            # Insert time records for this app, skipped if the app doesn't exist
+            cursor.executemany('''
+                INSERT INTO screen_time_entries (app_id, time_spent, day)
+                SELECT id, ?, ? FROM apps WHERE name = ?
+            ''', [(time_spent, day, app_name) for time_spent, day in time_records])
         
         conn.commit()
 
+@traced(category='sql')
 def fetch_categories():
     """Fetch all categories with their colors"""
-    with sqlite3.connect(get_db_path()) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             SELECT name, color 
@@ -222,9 +672,10 @@ def fetch_categories():
         ''')
         return cursor.fetchall()
 
+@traced(category='sql')
 def toggle_app_favorite(app_name):
     """Toggle favorite status for an app"""
-    with sqlite3.connect(get_db_path()) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             UPDATE apps 
@@ -232,10 +683,12 @@ def toggle_app_favorite(app_name):
             WHERE name = ?
         ''', (app_name,))
         conn.commit()
+    events.publish('app_favorite_toggled', name=app_name)
 
+@traced(category='sql')
 def fetch_apps_with_categories():
     """Fetch apps with categories, ordered by favorite status and then name"""
-    with sqlite3.connect(get_db_path()) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             SELECT a.name, a.is_favorite, c.name as category_name
@@ -244,3 +697,91 @@ def fetch_apps_with_categories():
             ORDER BY a.is_favorite DESC, a.name
         ''')
         return cursor.fetchall()
+
+@traced(category='sql')
+def fetch_limits():
+    """Fetch (id, target type, target name, period, minutes) of every limit"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, target_type, target_name, period, minutes
+            FROM limits
+            ORDER BY target_type, target_name, period
+        ''')
+        return cursor.fetchall()
+
+@traced(category='sql')
+def set_limit(target_type, target_name, period, minutes):
+    """Add a limit or change its minutes, returns the limit id"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO limits (target_type, target_name, period, minutes)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (target_type, target_name, period) DO UPDATE SET minutes = excluded.minutes
+        ''', (target_type, target_name, period, minutes))
+        cursor.execute('SELECT id FROM limits WHERE target_type = ? AND target_name = ? AND period = ?',
+                       (target_type, target_name, period))
+        limit_id = cursor.fetchone()[0]
+        conn.commit()
+        return limit_id
+
+@traced(category='sql')
+def delete_limit(limit_id):
+    with get_connection() as conn:
+        conn.execute('DELETE FROM limits WHERE id = ?', (limit_id,))
+        conn.commit()
+
+@traced(category='sql')
+def fetch_app_directory():
+    """Fetch (id, app name, category id, is favorite) of every app"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, name, category_id, is_favorite FROM apps')
+        return cursor.fetchall()
+
+@traced(category='sql')
+def fetch_category_directory():
+    """Fetch (id, name, color) of every category"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, name, color FROM categories ORDER BY id')
+        return cursor.fetchall()
+
+@traced(category='sql')
+def sum_screen_time(start_day, end_day, app_name=None, category_name=None):
+    """Total minutes within a day range, optionally for one app or one category"""
+    query = '''
+        SELECT COALESCE(SUM(se.time_spent), 0)
+        FROM {} se
+        JOIN apps a ON se.app_id = a.id
+        JOIN categories c ON a.category_id = c.id
+        WHERE se.day BETWEEN ? AND ?
+    '''
+    params = [start_day, end_day]
+    if app_name is not None:
+        query += ' AND a.name = ?'
+        params.append(app_name)
+    if category_name is not None:
+        query += ' AND c.name = ?'
+        params.append(category_name)
+    with get_connection() as conn:
+        query = query.format(attach_archives(conn, start_day, end_day))
+        return conn.execute(query, params).fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create or migrate the screen time database")
+    parser.add_argument('--migrate', action='store_true', help="Create missing tables and migrate an older file")
+    parser.add_argument('--db', help="Database (default: current profile)")
+    args = parser.parse_args()
+    db_path = args.db or get_db_path()
+    if not args.migrate:
+        print(f"{db_path}: schema version {schema_version(db_path)} (current {SCHEMA_VERSION})")
+        return
+    init_db(db_path)
+    print(f"{db_path}: schema version {SCHEMA_VERSION}")
+
+
+if __name__ == "__main__":
+    main()
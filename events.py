@@ -0,0 +1,27 @@
+from collections import defaultdict
+
+# In-process publish/subscribe, used to keep in-memory views in step with writes.
+# Events:
+#   'record_added'            app_id, time_spent, day (negative when a derived total shrinks)
+#   'category_added'          category_id, name, color
+#   'category_color_changed'  name, color
+#   'app_added'               app_id, name, category_id
+#   'app_favorite_toggled'    name
+
+_subscribers = defaultdict(list)
+
+
+def subscribe(event, callback):
+    """Call callback(**data) every time event is published"""
+    _subscribers[event].append(callback)
+
+
+def unsubscribe(event, callback):
+    if callback in _subscribers.get(event, ()):
+        _subscribers[event].remove(callback)
+
+
+def publish(event, **data):
+    # Copy so callbacks can unsubscribe themselves
+    for callback in list(_subscribers.get(event, ())):
+        callback(**data)
@@ -1,48 +1,56 @@
-import sqlite3
+import numpy as np
 import pandas as pd
+from database import attach_archives, get_read_connection
+from utils import to_day, days_to_datetime64
 
 # --- CONFIGURATION ---
 DB_PATH = 'screen_time.db'  # <--- Update this to your filename
 TARGET_YEAR = 2025            # The year you want to check
-TABLE_NAME = 'screen_time_records'
+SNAPSHOT_DIR = None           # Set to e.g. 'snapshots' to read an exported snapshot instead of the database
+
+def load_existing_days(first_day, last_day):
+    """Distinct day numbers with records, from the snapshot or the database"""
+    if SNAPSHOT_DIR:
+        from snapshot import load_snapshot, snapshot_days
+        days = snapshot_days(load_snapshot(SNAPSHOT_DIR, years=[TARGET_YEAR]))
+        return np.unique(days[(days >= first_day) & (days <= last_day)])
+
+    conn = get_read_connection(DB_PATH)  # Older files are migrated with python database.py --migrate
+    try:
+        # We only need the distinct days, not the whole table (integer range, uses the day index).
+        # Archived years are read from their archive files.
+        entries = attach_archives(conn, first_day, last_day)
+        query = f"SELECT DISTINCT day FROM {entries} WHERE day BETWEEN ? AND ?"
+        return np.array([row[0] for row in conn.execute(query, (first_day, last_day))],
+                        dtype='int64')
+    finally:
+        conn.close()
 
 def get_missing_dates():
     # 1. Connect and Fetch Existing Dates
-    conn = sqlite3.connect(DB_PATH)
+    first_day = to_day(f'{TARGET_YEAR}-01-01')
+    last_day = to_day(f'{TARGET_YEAR}-12-31')
     try:
-        # We only need the distinct dates, not the whole table
-        query = f"SELECT DISTINCT date FROM {TABLE_NAME} WHERE date LIKE '{TARGET_YEAR}%'"
-        existing_dates_df = pd.read_sql(query, conn)
+        existing_days = load_existing_days(first_day, last_day)
     except Exception as e:
         print(f"Error reading database: {e}")
         return
-    finally:
-        conn.close()
-
-    # 2. Process Dates
-    # Convert string dates (YYYY-MM-DD) to datetime objects for comparison
-    existing_dates_df['date'] = pd.to_datetime(existing_dates_df['date'])
-    existing_dates_set = set(existing_dates_df['date'])
 
-    # 3. Generate the "Perfect" Year
-    full_year_range = pd.date_range(
-        start=f'{TARGET_YEAR}-01-01', 
-        end=f'{TARGET_YEAR}-12-31', 
-        freq='D'
-    )
+    # 2. Generate the "Perfect" Year as day numbers
+    full_year_range = np.arange(first_day, last_day + 1)
 
-    # 4. Find the Difference
+    # 3. Find the Difference
     # (All Days in Year) - (Days Present in DB)
-    missing_dates = [d for d in full_year_range if d not in existing_dates_set]
+    missing_dates = pd.DatetimeIndex(days_to_datetime64(np.setdiff1d(full_year_range, existing_days)))
 
-    # 5. Print Results
+    # 4. Print Results
     print(f"--- Analysis for {TARGET_YEAR} ---")
     print(f"Total days in year: {len(full_year_range)}")
-    print(f"Days with data:     {len(existing_dates_set)}")
+    print(f"Days with data:     {len(existing_days)}")
     print(f"MISSING DAYS:       {len(missing_dates)}")
     print("-" * 30)
 
-    if not missing_dates:
+    if len(missing_dates) == 0:
         print("Great! No missing dates found.")
     else:
         print("Dates with NO records:")
@@ -0,0 +1,104 @@
+from datetime import date
+import numpy as np
+from utils import to_day, from_day, day_weekday
+
+# --- CONFIGURATION ---
+GROWTH_DAYS = 366            # Extra days allocated when a write falls outside the array
+WEEKS = 54                   # Columns of a year grid (a year can touch 54 weeks)
+
+
+class DayTotals:
+    """
+    Dense per-day totals, overall and per category, indexed by
+    day - first_day. Writes outside the covered range grow the array by at
+    least GROWTH_DAYS so adding a record stays O(1) amortized.
+    """
+
+    def __init__(self, first_day, days=0, categories=()):
+        self.first_day = first_day
+        self.categories = {name: column for column, name in enumerate(categories)}
+        self.totals = np.zeros(days, dtype=np.int64)
+        self.by_category = np.zeros((days, len(self.categories)), dtype=np.int64)
+
+    @classmethod
+    def from_columns(cls, categories, minutes, days):
+        """Build from category names, minutes and day numbers (any order)"""
+        days = np.asarray(days, dtype=np.int64)
+        if len(days) == 0:
+            return cls(to_day(date.today()))
+        names, codes = np.unique(np.asarray(categories), return_inverse=True)
+        first_day = int(days.min())
+        count = int(days.max()) - first_day + 1
+        index = days - first_day
+        totals = cls(first_day, count, names.tolist())
+        totals.totals[:] = np.bincount(index, weights=minutes, minlength=count)
+        totals.by_category[:] = np.bincount(
+            index * len(names) + codes, weights=minutes, minlength=count * len(names)
+        ).reshape(count, len(names))
+        return totals
+
+    @property
+    def last_day(self):
+        return self.first_day + len(self.totals) - 1
+
+    def _cover(self, day):
+        """Grow the arrays so day has a row"""
+        if day < self.first_day:
+            extra = max(self.first_day - day, GROWTH_DAYS)
+            self.totals = np.concatenate([np.zeros(extra, dtype=np.int64), self.totals])
+            self.by_category = np.vstack([np.zeros((extra, self.by_category.shape[1]), dtype=np.int64),
+                                          self.by_category])
+            self.first_day -= extra
+        elif day > self.last_day:
+            extra = max(day - self.last_day, GROWTH_DAYS)
+            self.totals = np.concatenate([self.totals, np.zeros(extra, dtype=np.int64)])
+            self.by_category = np.vstack([self.by_category,
+                                          np.zeros((extra, self.by_category.shape[1]), dtype=np.int64)])
+
+    def add(self, day, category, minutes):
+        """Account for one new record"""
+        self._cover(day)
+        if category not in self.categories:
+            self.categories[category] = len(self.categories)
+            self.by_category = np.hstack([self.by_category,
+                                          np.zeros((len(self.totals), 1), dtype=np.int64)])
+        row = day - self.first_day
+        self.totals[row] += minutes
+        self.by_category[row, self.categories[category]] += minutes
+
+    def values(self, first_day, last_day, category=None):
+        """Totals for every day of a range, zero where nothing is stored"""
+        result = np.zeros(last_day - first_day + 1, dtype=np.int64)
+        start = max(first_day, self.first_day)
+        end = min(last_day, self.last_day)
+        if start <= end:
+            if category is None:
+                source = self.totals
+            elif category in self.categories:
+                source = self.by_category[:, self.categories[category]]
+            else:
+                return result
+            result[start - first_day:end - first_day + 1] = source[start - self.first_day:end - self.first_day + 1]
+        return result
+
+    def year_grid(self, year, category=None):
+        """7 x WEEKS grid (weekday x week) of a year, NaN outside the year"""
+        first, last = to_day(date(year, 1, 1)), to_day(date(year, 12, 31))
+        days = np.arange(first, last + 1)
+        grid = np.full((7, WEEKS), np.nan)
+        offset = day_weekday(first)
+        grid[day_weekday(days), (days - first + offset) // 7] = self.values(first, last, category)
+        return grid
+
+    def day_at(self, year, row, column):
+        """Day number of a year grid cell, None for cells outside the year"""
+        first = to_day(date(year, 1, 1))
+        day = first + column * 7 + row - day_weekday(first)
+        return day if first <= day <= to_day(date(year, 12, 31)) else None
+
+    def years(self):
+        """Years that have at least one minute recorded"""
+        used = np.flatnonzero(self.totals)
+        if len(used) == 0:
+            return []
+        return list(range(from_day(self.first_day + used[0]).year, from_day(self.first_day + used[-1]).year + 1))
@@ -0,0 +1,153 @@
+import argparse
+import math
+import time
+from collections import namedtuple
+from contextlib import closing
+import numpy as np
+from database import attach_archives, get_read_connection
+
+# --- CONFIGURATION ---
+WINDOW_DAYS = 7               # Flat model: days on each side
+WEEKS = 2                     # Same-weekday model: weeks on each side
+HALFLIFE_DAYS = 7             # Exponential model: distance at which a day weighs half
+EWMA_CUTOFF = 0.01            # Exponential model: weights below this are dropped
+GAP_FRACTION = 0.1            # Backtest: share of known days hidden per round
+ROUNDS = 20                   # Backtest: rounds, each hiding different days
+SEED = 42
+
+# An estimate is the weighted mean of the known days at offsets around a day
+Model = namedtuple('Model', ['name', 'offsets', 'weights'])
+
+# Minutes per (day, app), rows from first_day; known marks days with records
+UsageMatrix = namedtuple('UsageMatrix', ['first_day', 'app_ids', 'values', 'known'])
+
+Score = namedtuple('Score', ['model', 'gaps', 'cell_mae', 'day_mae', 'day_bias', 'coverage'])
+
+
+def flat_model(days=WINDOW_DAYS):
+    offsets = [o for o in range(-days, days + 1) if o]
+    return Model('flat', offsets, [1.0] * len(offsets))
+
+
+def weekday_model(weeks=WEEKS):
+    offsets = [7 * w for w in range(-weeks, weeks + 1) if w]
+    return Model('weekday', offsets, [1.0] * len(offsets))
+
+
+def ewma_model(halflife=HALFLIFE_DAYS, cutoff=EWMA_CUTOFF):
+    decay = 0.5 ** (1 / halflife)
+    reach = math.ceil(math.log(cutoff) / math.log(decay))
+    offsets = [o for o in range(-reach, reach + 1) if o]
+    return Model('ewma', offsets, [decay ** abs(o) for o in offsets])
+
+
+MODELS = {model.name: model for model in (flat_model(), weekday_model(), ewma_model())}
+
+
+def usage_matrix(app_ids, days, minutes, first_day=None, last_day=None):
+    """Sum records into a (days, apps) matrix; a day is known when it has any record"""
+    app_ids, days = np.asarray(app_ids), np.asarray(days, dtype=np.int64)
+    if not len(days) and (first_day is None or last_day is None):
+        # Nothing recorded and no range asked for: no days, no apps
+        return UsageMatrix(first_day or 0, app_ids[:0], np.zeros((0, 0)), np.zeros(0, dtype=bool))
+    first_day = int(days.min()) if first_day is None else first_day
+    last_day = int(days.max()) if last_day is None else last_day
+    inside = (days >= first_day) & (days <= last_day)
+    apps, columns = np.unique(app_ids[inside], return_inverse=True)
+    rows = days[inside] - first_day
+    size = (last_day - first_day + 1, len(apps))
+    values = np.bincount(rows * size[1] + columns, weights=np.asarray(minutes)[inside],
+                         minlength=size[0] * size[1]).reshape(size)
+    known = np.bincount(rows, minlength=size[0]) > 0
+    return UsageMatrix(first_day, apps, values, known)
+
+
+def estimate(model, values, known):
+    """
+    Estimate every (day, app) from the known days around it, never from
+    the day itself. Each offset adds one shifted copy of the matrix, so
+    the work is len(offsets) whole-matrix operations. Cells without any
+    known neighbour are NaN.
+    """
+    reach = max(abs(o) for o in model.offsets)
+    count = len(known)
+    weights = known.astype(np.float64)
+    padded_values = np.zeros((count + 2 * reach, values.shape[1]))
+    padded_values[reach:reach + count] = values * weights[:, None]
+    padded_weights = np.zeros(count + 2 * reach)
+    padded_weights[reach:reach + count] = weights
+    total = np.zeros(values.shape)
+    support = np.zeros(count)
+    for offset, weight in zip(model.offsets, model.weights):
+        total += weight * padded_values[reach + offset:reach + offset + count]
+        support += weight * padded_weights[reach + offset:reach + offset + count]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return total / support[:, None]
+
+
+def backtest(matrix, models=None, gap_fraction=GAP_FRACTION, rounds=ROUNDS, seed=SEED):
+    """
+    Hide random known days and score each model on them. Every round hides
+    a different gap_fraction of the known days at once and estimates them
+    in one pass per model. Scores are mean absolute errors in minutes, per
+    (day, app) and per day total, and the mean signed error of day totals.
+    """
+    models = list((models or MODELS).values())
+    rng = np.random.default_rng(seed)
+    known_days = np.flatnonzero(matrix.known)
+    if not len(known_days):
+        raise ValueError("No recorded days to backtest")
+    per_round = max(1, int(len(known_days) * gap_fraction))
+    errors = {model.name: [] for model in models}
+    for _ in range(rounds):
+        hidden = rng.choice(known_days, per_round, replace=False)
+        known = matrix.known.copy()
+        known[hidden] = False
+        actual = matrix.values[hidden]
+        for model in models:
+            errors[model.name].append(estimate(model, matrix.values, known)[hidden] - actual)
+    scores = []
+    for model in models:
+        error = np.concatenate(errors[model.name])
+        covered = ~np.isnan(error).any(axis=1)
+        day_error = error[covered].sum(axis=1)
+        scores.append(Score(model.name, len(error), float(np.abs(error[covered]).mean()),
+                            float(np.abs(day_error).mean()), float(day_error.mean()), float(covered.mean())))
+    return sorted(scores, key=lambda score: score.day_mae)
+
+
+def best_model(matrix, models=None):
+    """The model with the lowest day total error in a backtest"""
+    models = models or MODELS
+    return models[backtest(matrix, models)[0].model]
+
+
+def load_matrix(db_path=None):
+    with closing(get_read_connection(db_path)) as conn:
+        rows = np.array(conn.execute(f'SELECT app_id, day, time_spent FROM {attach_archives(conn)}').fetchall(),
+                        dtype=np.int64).reshape(-1, 3)
+    return usage_matrix(rows[:, 0], rows[:, 1], rows[:, 2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the gap imputation models on the recorded history")
+    parser.add_argument('--db', help="Database (default: current profile)")
+    parser.add_argument('--rounds', type=int, default=ROUNDS)
+    parser.add_argument('--gap-fraction', type=float, default=GAP_FRACTION)
+    args = parser.parse_args()
+
+    matrix = load_matrix(args.db)
+    print(f"{matrix.known.sum()} known days of {len(matrix.known)}, {len(matrix.app_ids)} apps")
+    if not matrix.known.any():
+        print("Nothing recorded yet, no backtest to run")
+        return
+    start = time.perf_counter()
+    scores = backtest(matrix, rounds=args.rounds, gap_fraction=args.gap_fraction)
+    print(f"Backtest of {scores[0].gaps} gaps per model in {time.perf_counter() - start:.2f} s")
+    print(f"{'model':<8} {'cell MAE':>9} {'day MAE':>9} {'day bias':>9} {'coverage':>9}")
+    for score in scores:
+        print(f"{score.model:<8} {score.cell_mae:>9.2f} {score.day_mae:>9.1f} {score.day_bias:>9.1f} {score.coverage:>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
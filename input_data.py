@@ -2,22 +2,16 @@ import tkinter as tk
 from tkinter import ttk
 from datetime import datetime
 from utils import format_date_for_display
+from app_search import AppSearchIndex
 
 def set_date_to_today(date_entry):
     today = format_date_for_display(datetime.today().strftime('%Y-%m-%d'))
     date_entry.delete(0, tk.END)
     date_entry.insert(0, today)
 
-def filter_combobox(event, combobox, apps):
-    value = event.widget.get()
-    if value == '':
-        combobox['values'] = [app['name'] for app in apps]
-    else:
-        data = []
-        for app in apps:
-            if value.lower() in app['name'].lower():
-                data.append(app['name'])
-        combobox['values'] = data
+def filter_combobox(event, combobox, index):
+    """Narrow the combobox values using the shared app search index"""
+    combobox['values'] = index.search(event.widget.get())
 
 def create_input_frame(root, submit_data, visualize_data, apps):
     main_frame = ttk.Frame(root, padding="10")
@@ -25,9 +19,11 @@ def create_input_frame(root, submit_data, visualize_data, apps):
 
     ttk.Label(main_frame, text="App Name:").grid(row=0, column=0, pady=5, sticky=tk.W)
     app_name_var = tk.StringVar()
-    app_name_combobox = ttk.Combobox(main_frame, textvariable=app_name_var, values=[app['name'] for app in apps], state="normal", width=30)
+    app_index = AppSearchIndex([app['name'] for app in apps],
+                               favorites=[app['name'] for app in apps if app.get('is_favorite')])
+    app_name_combobox = ttk.Combobox(main_frame, textvariable=app_name_var, values=app_index.ranked_names(), state="normal", width=30)
     app_name_combobox.grid(row=0, column=1, pady=5)
-    app_name_combobox.bind('<KeyRelease>', lambda event: filter_combobox(event, app_name_combobox, apps))
+    app_name_combobox.bind('<KeyRelease>', lambda event: filter_combobox(event, app_name_combobox, app_index))
 
     ttk.Label(main_frame, text="Time Spent (minutes):").grid(row=1, column=0, pady=5, sticky=tk.W)
     time_spent_entry = ttk.Entry(main_frame, width=30)
@@ -0,0 +1,168 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import config
+
+# --- CONFIGURATION ---
+BUFFER_SIZE = 20000          # Most recent events kept in the ring buffer
+ENV_VAR = 'SCREEN_TIME_TRACE'  # "1" enables tracing, any other value is used as the output file
+
+_env = os.environ.get(ENV_VAR, '')
+_enabled = bool(_env) or config.INSTRUMENTATION
+_events = deque(maxlen=BUFFER_SIZE)
+_stats = {}                  # name -> [calls, total ms, max ms, rows]
+_lock = threading.Lock()
+_origin = time.perf_counter()
+
+
+def enable(flag=True):
+    global _enabled
+    _enabled = flag
+
+
+def is_enabled():
+    return _enabled
+
+
+def trace_file():
+    """Where the trace is dumped on exit"""
+    return _env if _env not in ('', '1') else config.TRACE_FILE
+
+
+def clear():
+    with _lock:
+        _events.clear()
+        _stats.clear()
+
+
+def record(name, category, start, end, rows=None):
+    """Store one finished call, times are perf_counter() values"""
+    elapsed_ms = (end - start) * 1000
+    with _lock:
+        _events.append((name, category, start, end, rows, threading.get_ident()))
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = [0, 0.0, 0.0, 0]
+        stats[0] += 1
+        stats[1] += elapsed_ms
+        stats[2] = max(stats[2], elapsed_ms)
+        if rows is not None:
+            stats[3] += rows
+
+
+def _count_rows(result):
+    """Rows in a returned collection; a tuple is one record, not rows"""
+    entries = getattr(result, 'entries', None)  # EntryColumns: the rows are its entries array
+    if entries is not None:
+        return len(entries)
+    if isinstance(result, (list, dict, set)):
+        return len(result)
+    return None
+
+
+def traced(name=None, category='app'):
+    """
+    Decorator recording call count, latency and row count (length of a
+    returned list, or the entries of an EntryColumns). Usable as @traced or @traced('name', 'category').
+    When tracing is disabled the only cost is one flag check.
+    """
+    def decorator(func):
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                record(label, category, start, time.perf_counter(), _count_rows(result))
+        return wrapper
+
+    if callable(name):
+        func, name = name, None
+        return decorator(func)
+    return decorator
+
+
+class _Span(dict):
+    """Mutable details of an open span, set span['rows'] to record a row count"""
+
+
+_DISABLED_SPAN = _Span()
+
+
+@contextmanager
+def span(name, category='app'):
+    """Time a block of code: with span('pandas.aggregate', 'pandas') as s: ..."""
+    if not _enabled:
+        yield _DISABLED_SPAN
+        return
+    details = _Span()
+    start = time.perf_counter()
+    try:
+        yield details
+    finally:
+        record(name, category, start, time.perf_counter(), details.get('rows'))
+
+
+def summary():
+    """Per-name statistics sorted by total time"""
+    with _lock:
+        items = list(_stats.items())
+    rows = [{'name': name, 'calls': calls, 'total_ms': round(total, 3),
+             'mean_ms': round(total / calls, 3), 'max_ms': round(longest, 3), 'rows': rows}
+            for name, (calls, total, longest, rows) in items]
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+
+def print_summary():
+    print(f"{'name':<50} {'calls':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'rows':>9}")
+    for row in summary():
+        print(f"{row['name']:<50} {row['calls']:>7} {row['total_ms']:>10.2f} "
+              f"{row['mean_ms']:>9.3f} {row['max_ms']:>9.2f} {row['rows']:>9}")
+
+
+def dump_json(path):
+    """Write the summary and the raw events as plain JSON"""
+    with _lock:
+        events = list(_events)
+    with open(path, 'w') as f:
+        json.dump({
+            'summary': summary(),
+            'events': [{'name': name, 'category': category,
+                        'start_ms': round((start - _origin) * 1000, 3),
+                        'duration_ms': round((end - start) * 1000, 3),
+                        'rows': rows, 'thread': thread}
+                       for name, category, start, end, rows, thread in events]
+        }, f, indent=1)
+
+
+def dump_chrome_trace(path):
+    """Write the events in Chrome trace format (open in chrome://tracing or Perfetto)"""
+    with _lock:
+        events = list(_events)
+    pid = os.getpid()
+    trace = [{'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': thread,
+              'ts': round((start - _origin) * 1e6, 1), 'dur': round((end - start) * 1e6, 1),
+              'args': {} if rows is None else {'rows': rows}}
+             for name, category, start, end, rows, thread in events]
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+
+
+def dump(path=None):
+    """Dump to path (or the configured trace file), format chosen by the file name"""
+    path = path or trace_file()
+    if path.endswith('.trace.json'):
+        dump_chrome_trace(path)
+    else:
+        dump_json(path)
+    return path
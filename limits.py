@@ -0,0 +1,107 @@
+from collections import defaultdict, namedtuple
+from database import fetch_limits, sum_screen_time
+from metadata import get_registry
+from utils import day_weekday, from_day
+import events
+
+# --- CONFIGURATION ---
+TARGET_TYPES = ('app', 'category')
+PERIODS = ('day', 'week')          # Weeks start on Monday
+
+Limit = namedtuple('Limit', ['id', 'target_type', 'target_name', 'period', 'minutes'])
+Exceeded = namedtuple('Exceeded', ['limit', 'total', 'period_start'])
+
+
+def period_bounds(period, day):
+    """First and last day of the day's period"""
+    if period == 'day':
+        return day, day
+    start = day - day_weekday(day)
+    return start, start + 6
+
+
+class LimitTracker:
+    """
+    Checks limits as records are written. Each (target, period) total is
+    summed from the database once, the first time a write touches it, and
+    is then kept up to date by adding each new record, so a write costs
+    O(1) per limit on its app and category.
+    """
+
+    def __init__(self):
+        self.reload()
+
+    def reload(self):
+        """Re-read the limits, call after they are changed"""
+        self.limits = defaultdict(list)   # (target type, name) -> [Limit]
+        for row in fetch_limits():
+            limit = Limit(*row)
+            self.limits[(limit.target_type, limit.target_name)].append(limit)
+        self.totals = {}                  # (target type, name, period, period start) -> minutes
+        self.exceeded = {}                # (limit id, period start) -> Exceeded, until taken
+
+    def period_total(self, target_type, name, period, day, minutes):
+        """Running total of the period containing day, after adding minutes"""
+        start, end = period_bounds(period, day)
+        key = (target_type, name, period, start)
+        if key in self.totals:
+            self.totals[key] += minutes
+        else:
+            # First write in this period: the stored sum already includes it
+            self.totals[key] = sum_screen_time(start, end, **{f'{target_type}_name': name})
+        return self.totals[key], start
+
+    def record(self, app_id, time_spent, day):
+        """Account for a written record, returns the limits it leaves exceeded"""
+        targets = get_registry().app_targets(app_id)
+        if targets is None or not self.limits:
+            return []
+        exceeded = []
+        for target_type, name in zip(TARGET_TYPES, targets):
+            for limit in self.limits.get((target_type, name), ()):
+                total, start = self.period_total(target_type, name, limit.period, day, time_spent)
+                if total > limit.minutes:
+                    result = Exceeded(limit, total, start)
+                    self.exceeded[(limit.id, start)] = result
+                    exceeded.append(result)
+        return exceeded
+
+    def on_record_added(self, app_id, time_spent, day):
+        self.record(app_id, time_spent, day)
+
+    def take_exceeded(self):
+        """Limits exceeded since the last call"""
+        exceeded = list(self.exceeded.values())
+        self.exceeded.clear()
+        return exceeded
+
+
+_tracker = None
+
+
+def set_tracker(tracker):
+    """Make tracker the shared one (None rebuilds it on next use), returns the previous one"""
+    global _tracker
+    previous, _tracker = _tracker, tracker
+    if previous is not None:
+        events.unsubscribe('record_added', previous.on_record_added)
+    if tracker is not None:
+        events.subscribe('record_added', tracker.on_record_added)
+    return previous
+
+
+def get_tracker():
+    """Shared tracker, subscribed to record writes on first use"""
+    if _tracker is None:
+        set_tracker(LimitTracker())
+    return _tracker
+
+
+def describe(exceeded):
+    """One line per exceeded limit"""
+    lines = []
+    for limit, total, start in exceeded:
+        when = from_day(start).strftime('%d/%m/%Y')
+        period = f"on {when}" if limit.period == 'day' else f"in the week of {when}"
+        lines.append(f"{limit.target_name}: {total} min of {limit.minutes} min {period}")
+    return "\n".join(lines)
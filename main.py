@@ -1,81 +1,101 @@
+import argparse
 import tkinter as tk
 from tkinter import messagebox
 from tkinter import ttk
 from database import (
-    init_db, 
     add_category, 
-    add_app, 
     add_screen_time, 
-    fetch_screen_time_data,
-    fetch_app_names,
     insert_sample_data,
-    clear_screen_time_data,
     get_db_config,
-    get_db_path,
-    fetch_apps_with_categories
+    get_connection
 )
 from visualizer import display_visualization
-import sqlite3
 from utils import format_date_for_db
 from batch_entry import BatchEntryDialog
 from settings_dialog import SettingsDialog
+from limits import get_tracker, describe
+from metadata import get_registry
 from app_config import APP_CONFIG
-
-# Initialize Database
-init_db()
+from categorizer import import_apps
+from config import BACKUP_ON_CLOSE, BACKUP_EVERY_WRITES, DB_CONFIG, get_profile_name, set_profile
+from profiles import get_profile_manager
+import backup
+import instrumentation
+from instrumentation import traced
+import query_log
 
 # GUI Setup
 class ScreenTimeTracker:
     def __init__(self, root):
         self.root = root
-        
+        # Initialize Database
+        self.profiles = get_profile_manager()
+        self.default_bg = self.root.cget('bg')
+        style = ttk.Style()
+        style.configure('Debug.TFrame', background='red')
+        style.configure('Debug.TLabel', background='red')
+        self.batch_dialog = None  # Dialogs are built on first use, then hidden and reused
+        self.settings = None
+
+        # Create main frames
+        self.create_input_frame()
+        self.activate_profile(first_use=True)
+
+    def activate_profile(self, first_use):
+        """Title, data and write listeners of the current profile"""
         # Add debug indicator to title
         title = "Screen Time Tracker"
-        if get_db_config()['sample_data']:
+        debug = get_db_config()['sample_data']
+        if debug:
             title += " [DEBUG MODE]"
-            # Make debug mode more noticeable
-            self.root.configure(bg='red')  # Brighter red background
-            style = ttk.Style()
-            style.configure('Debug.TFrame', background='red')
-            style.configure('Debug.TLabel', background='red')
-            
+        elif get_profile_name() != 'production':
+            title += f" [{get_profile_name()}]"
+        # Make debug mode more noticeable
+        self.root.configure(bg='red' if debug else self.default_bg)  # Brighter red background
+        self.main_frame.configure(style='Debug.TFrame' if debug else 'TFrame')
+        self.button_frame.configure(style='Debug.TFrame' if debug else 'TFrame')
         self.root.title(title)
+
+        if first_use:
+            # Initialize categories and apps
+            self.setup_initial_data()
+            
+            # Insert sample data only in debug mode
+            if debug:
+                insert_sample_data()
         
-        # Initialize categories and apps
-        self.setup_initial_data()
-        
-        # Insert sample data only in debug mode
-        if get_db_config()['sample_data']:
-            insert_sample_data()
-        
-        # Create main frames
-        self.create_input_frame()
+        # Check limits on every write from now on
+        get_tracker()
+        if BACKUP_EVERY_WRITES:
+            backup.get_backup_manager()  # Counts writes towards the next backup
+
+    @traced('main.switch_profile', 'dialog')
+    def switch_profile(self, event=None):
+        first_use = self.profiles.switch(self.profile_var.get())
+        self.activate_profile(first_use)
+        if self.batch_dialog is not None:
+            self.batch_dialog.index_stale = True  # Last used days are per database
         
     def setup_initial_data(self):
         self.categories = {}
         
         # Initialize categories and apps from config
-        for category_name, apps in APP_CONFIG.items():
+        for category_name in APP_CONFIG:
             category_id = add_category(category_name)
             if category_id:
                 self.categories[category_name] = category_id
-                # Add apps for this category
-                for app_name in apps:
-                    add_app(app_name, category_id)
+        # Config apps match their own category exactly, added in one transaction
+        import_apps(app_name for apps in APP_CONFIG.values() for app_name in apps)
 
     def refresh_app_list(self):
-        apps = [app[0] for app in fetch_apps_with_categories()]  # Get just the app names
+        apps = [app[0] for app in get_registry().apps_with_categories()]  # Get just the app names
         if hasattr(self, 'app_combobox'):  # Check if combobox exists
             self.app_combobox['values'] = apps
 
     def create_input_frame(self):
-        # Main frame
-        if get_db_config()['sample_data']:
-            main_frame = ttk.Frame(self.root, padding="10", style='Debug.TFrame')
-            button_frame = ttk.Frame(main_frame, style='Debug.TFrame')
-        else:
-            main_frame = ttk.Frame(self.root, padding="10")
-            button_frame = ttk.Frame(main_frame)
+        # Main frame, styled for debug mode by activate_profile
+        main_frame = self.main_frame = ttk.Frame(self.root, padding="10")
+        button_frame = self.button_frame = ttk.Frame(main_frame)
             
         main_frame.grid(row=0, column=0, sticky="nsew")
 
@@ -89,12 +109,23 @@ class ScreenTimeTracker:
         ttk.Button(button_frame, text="Visualize", 
                   command=self.visualize_data).pack(side='left', padx=5)
 
+        # Database profile, switched without restarting
+        self.profile_var = tk.StringVar(value=get_profile_name())
+        profile_combo = ttk.Combobox(button_frame, textvariable=self.profile_var,
+                                     values=list(DB_CONFIG), state='readonly', width=10)
+        profile_combo.pack(side='right', padx=5)
+        profile_combo.bind('<<ComboboxSelected>>', self.switch_profile)
+
     def open_batch_entry(self):
-        app_names = fetch_app_names()  # Use new function that returns just names
-        BatchEntryDialog(self.root, app_names, self.submit_single_entry)
+        app_names = get_registry().sorted_app_names()
+        if self.batch_dialog is None:
+            self.batch_dialog = BatchEntryDialog(self.root, app_names, self.submit_single_entry)
+        else:
+            self.batch_dialog.show(app_names)
 
+    @traced('main.submit_single_entry', 'dialog')
     def submit_single_entry(self, app_name, time_spent, date):
-        conn = sqlite3.connect(get_db_path())
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute('SELECT id FROM apps WHERE name = ?', (app_name,))
         result = cursor.fetchone()
@@ -105,18 +136,22 @@ class ScreenTimeTracker:
             add_screen_time(app_id, time_spent, date)
 
     def visualize_data(self):
-        data = fetch_screen_time_data()
-        if data:
+        data = self.profiles.columns()  # Kept per profile until the next write
+        if len(data.entries):
             display_visualization(data)
         else:
             messagebox.showinfo("Info", "No data to visualize!")
 
     def open_settings(self):
-        settings = SettingsDialog(self.root)
-        settings.dialog.wait_window()  # Wait for the settings dialog to close
+        if self.settings is None:
+            self.settings = SettingsDialog(self.root)
+        else:
+            self.settings.show()
+        self.root.wait_variable(self.settings.closed)  # Wait for the settings dialog to close
         if hasattr(self, 'app_combobox'):  # Only refresh if combobox exists
             self.refresh_app_list()
 
+    @traced('main.submit_data', 'dialog')
     def submit_data(self):
         app_name = self.app_combobox.get()
         time_spent = self.time_entry.get()
@@ -131,6 +166,9 @@ class ScreenTimeTracker:
             db_date = format_date_for_db(date)
             self.submit_single_entry(app_name, time_spent, db_date)
             messagebox.showinfo("Success", "Data added successfully!")
+            exceeded = get_tracker().take_exceeded()
+            if exceeded:
+                messagebox.showwarning("Limits Exceeded", describe(exceeded))
             
             # Clear inputs
             self.app_combobox.set('')
@@ -141,14 +179,33 @@ class ScreenTimeTracker:
             messagebox.showerror("Error", "Time spent must be a number!")
 
 def main():
+    parser = argparse.ArgumentParser(description="Screen Time Tracker")
+    parser.add_argument('--profile', choices=list(DB_CONFIG), help="Database profile to start on")
+    args = parser.parse_args()
+    if args.profile:
+        set_profile(args.profile)
+
     root = tk.Tk()
     app = ScreenTimeTracker(root)
     
     def on_closing():
-        if get_db_config()['sample_data']:  # Only clear data in debug mode
-            clear_screen_time_data()
+        app.profiles.close()  # Clears sample data in debug mode, checkpoints every database used
+        if BACKUP_ON_CLOSE:
+            backup.get_backup_manager().request('close')
+        if instrumentation.is_enabled():
+            print(f"Trace written to {instrumentation.dump()}")
+            instrumentation.print_summary()
+        if query_log.is_enabled():
+            query_log.query_log.print_report()
         root.destroy()
         root.quit()
+        # The window is gone, finish the copy before the process exits
+        manager = backup.get_backup_manager()
+        manager.wait()
+        for report in manager.reports:
+            print(backup.describe(report))
+        for error in manager.errors:
+            print(f"Backup failed: {error}")
 
     root.protocol("WM_DELETE_WINDOW", on_closing)
     root.mainloop()
@@ -0,0 +1,98 @@
+from database import fetch_app_directory, fetch_category_directory
+import events
+
+
+class MetadataRegistry:
+    """
+    Category colors and app categories/favorites, loaded from the database
+    once and then kept current from the write events published by the
+    database module, so dialogs and charts never query them again.
+    """
+
+    def __init__(self):
+        self.load()
+
+    def load(self):
+        self.category_colors = {}     # name -> color
+        self.category_names = {}      # id -> name
+        for category_id, name, color in fetch_category_directory():
+            # Names repeat in older databases, the first row wins like GROUP BY name
+            self.category_colors.setdefault(name, color)
+            self.category_names[category_id] = name
+        self.apps = {}                # name -> [id, category name, is favorite]
+        self.app_names = {}           # id -> name
+        for app_id, name, category_id, is_favorite in fetch_app_directory():
+            self.apps[name] = [app_id, self.category_names.get(category_id), bool(is_favorite)]
+            self.app_names[app_id] = name
+
+    # Reads, in the shapes of the database fetch functions they replace
+
+    def categories(self):
+        """(name, color) sorted by name, like fetch_categories()"""
+        return sorted(self.category_colors.items())
+
+    def apps_with_favorites(self):
+        """(name, is favorite), favorites first then by name, as database.fetch_apps() returns them"""
+        return [(name, favorite) for name, favorite, _ in self.apps_with_categories()]
+
+    def apps_with_categories(self):
+        """(name, is favorite, category), like fetch_apps_with_categories()"""
+        rows = [(name, favorite, category) for name, (_, category, favorite) in self.apps.items()]
+        rows.sort(key=lambda row: (not row[1], row[0]))
+        return rows
+
+    def sorted_app_names(self):
+        return sorted(self.apps)
+
+    def app_targets(self, app_id):
+        """(app name, category name) of an app id, None if unknown"""
+        name = self.app_names.get(app_id)
+        return (name, self.apps[name][1]) if name is not None else None
+
+    # Event handlers
+
+    def on_category_added(self, category_id, name, color):
+        self.category_colors[name] = color
+        self.category_names[category_id] = name
+
+    def on_category_color_changed(self, name, color):
+        self.category_colors[name] = color
+
+    def on_app_added(self, app_id, name, category_id):
+        self.apps[name] = [app_id, self.category_names.get(category_id), False]
+        self.app_names[app_id] = name
+
+    def on_app_favorite_toggled(self, name):
+        if name in self.apps:
+            self.apps[name][2] = not self.apps[name][2]
+
+
+_registry = None
+HANDLERS = {
+    'category_added': 'on_category_added',
+    'category_color_changed': 'on_category_color_changed',
+    'app_added': 'on_app_added',
+    'app_favorite_toggled': 'on_app_favorite_toggled',
+}
+
+
+def set_registry(registry):
+    """
+    Make registry the shared one (None rebuilds it on next use), moving
+    the event subscriptions over. Returns the previous registry.
+    """
+    global _registry
+    previous, _registry = _registry, registry
+    for event, handler in HANDLERS.items():
+        if previous is not None:
+            events.unsubscribe(event, getattr(previous, handler))
+        if registry is not None:
+            events.subscribe(event, getattr(registry, handler))
+    return previous
+
+
+def get_registry():
+    """Shared registry, subscribed to metadata writes on first use"""
+    if _registry is None:
+        set_registry(MetadataRegistry())
+    return _registry
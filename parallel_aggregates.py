@@ -0,0 +1,168 @@
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+import pandas as pd
+
+# --- CONFIGURATION ---
+# Below this many rows in the requested range the pool overhead outweighs the
+# gain and the serial path is used (see: python benchmarks.py aggregate)
+PARALLEL_MIN_ROWS = 2_000_000
+PARTITION = 'month'          # 'month' or 'year', the unit of work sent to a worker
+MAX_WORKERS = os.cpu_count() or 1
+MODES = ('serial', 'threads', 'processes')
+
+# Rows of the shared block: one int32 column each, sorted by day
+APP, CATEGORY, MINUTES, DAY = range(4)
+
+
+def _sums(columns, lo, hi, n_apps, n_categories, start_day, end_day, category):
+    """App and category totals of rows lo..hi within the day range"""
+    days = columns[DAY, lo:hi]
+    # Rows are sorted by day, so the range is a slice rather than a mask
+    first = lo + np.searchsorted(days, start_day, 'left')
+    last = lo + np.searchsorted(days, end_day, 'right')
+    apps = columns[APP, first:last]
+    categories = columns[CATEGORY, first:last]
+    minutes = columns[MINUTES, first:last]
+
+    category_totals = np.bincount(categories, weights=minutes, minlength=n_categories)
+    if category is not None:
+        selected = categories == category
+        apps, minutes = apps[selected], minutes[selected]
+    app_totals = np.bincount(apps, weights=minutes, minlength=n_apps)
+    return app_totals, category_totals, len(apps)
+
+
+def _shared_sums(name, length, *args):
+    """Worker entry point: attach to the shared block and sum a partition"""
+    shm = SharedMemory(name=name)
+    columns = None
+    try:
+        columns = np.ndarray((4, length), dtype=np.int32, buffer=shm.buf)
+        return _sums(columns, *args)
+    finally:
+        del columns
+        shm.close()
+
+
+def _release(shm, pools):
+    for pool in pools.values():
+        pool.shutdown(cancel_futures=True)
+    try:
+        shm.close()
+    except BufferError:
+        pass  # A view is still alive at interpreter exit, unlinking is enough
+    shm.unlink()
+
+
+class ParallelAggregator:
+    """
+    App/category totals over int32 columns kept in shared memory.
+    Rows are sorted by day and split at month (or year) boundaries; a query
+    only sends the partitions overlapping its day range to the workers and
+    merges their partial sums.
+    """
+
+    def __init__(self, apps, categories, minutes, days, app_names, category_names,
+                 partition=PARTITION, workers=MAX_WORKERS):
+        order = np.argsort(days, kind='stable')
+        self.length = len(order)
+        self.app_names = app_names
+        self.category_names = category_names
+        self.workers = workers
+
+        self.shm = SharedMemory(create=True, size=max(4 * self.length * 4, 1))
+        self.columns = np.ndarray((4, self.length), dtype=np.int32, buffer=self.shm.buf)
+        for row, values in ((APP, apps), (CATEGORY, categories), (MINUTES, minutes), (DAY, days)):
+            self.columns[row] = np.asarray(values)[order]
+
+        # Partition boundaries: first row of every month/year plus the end
+        sorted_days = self.columns[DAY]
+        units = sorted_days.astype('datetime64[D]').astype(f"datetime64[{'M' if partition == 'month' else 'Y'}]")
+        starts = np.flatnonzero(np.r_[True, units[1:] != units[:-1]]) if self.length else np.array([], dtype=int)
+        self.bounds = np.r_[starts, self.length]
+        self.first_days = sorted_days[starts]
+        self.last_days = sorted_days[self.bounds[1:] - 1]
+
+        self.pools = {}
+        self._finalizer = weakref.finalize(self, _release, self.shm, self.pools)
+
+    @classmethod
+    def from_frame(cls, df, **kwargs):
+        """Build from a visualizer DataFrame (datetime64 "Date" column)"""
+        apps, app_names = pd.factorize(df["App Name"], sort=True)
+        categories, category_names = pd.factorize(df["Category Name"], sort=True)
+        days = df["Date"].to_numpy().astype('datetime64[D]').astype(np.int64)
+        return cls(apps, categories, df["Time Spent"].to_numpy(), days,
+                   list(app_names), list(category_names), **kwargs)
+
+    def _pool(self, mode):
+        pool = self.pools.get(mode)
+        if pool is None:
+            if mode == 'threads':
+                pool = ThreadPoolExecutor(self.workers)
+            else:
+                # Spawned workers never inherit the Tk state of the parent
+                pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            self.pools[mode] = pool
+        return pool
+
+    def partitions(self, start_day, end_day):
+        """(first row, end row) of the partitions overlapping the day range"""
+        selected = np.flatnonzero((self.last_days >= start_day) & (self.first_days <= end_day))
+        return [(int(self.bounds[i]), int(self.bounds[i + 1])) for i in selected]
+
+    def rows_in_range(self, start_day, end_day):
+        days = self.columns[DAY]
+        return int(np.searchsorted(days, end_day, 'right') - np.searchsorted(days, start_day, 'left'))
+
+    def choose_mode(self, start_day, end_day):
+        if self.workers > 1 and self.rows_in_range(start_day, end_day) >= PARALLEL_MIN_ROWS:
+            return 'processes'
+        return 'serial'
+
+    def aggregate(self, start_day=None, end_day=None, category=None, mode='auto'):
+        """
+        Totals for a day range, optionally restricted to one category code.
+        Returns (app totals, category totals, rows) with the totals indexed by code.
+        """
+        # int32 bounds keep searchsorted from casting the whole day column
+        start_day = np.int32(-2**31 if start_day is None else start_day)
+        end_day = np.int32(2**31 - 1 if end_day is None else end_day)
+        if mode == 'auto':
+            mode = self.choose_mode(start_day, end_day)
+        args = (len(self.app_names), len(self.category_names), start_day, end_day, category)
+
+        if mode == 'serial':
+            # Partition by partition as well, the chunks stay in cache
+            parts = [_sums(self.columns, lo, hi, *args) for lo, hi in self.partitions(start_day, end_day)]
+        else:
+            pool = self._pool(mode)
+            if mode == 'threads':
+                futures = [pool.submit(_sums, self.columns, lo, hi, *args)
+                           for lo, hi in self.partitions(start_day, end_day)]
+            else:
+                futures = [pool.submit(_shared_sums, self.shm.name, self.length, lo, hi, *args)
+                           for lo, hi in self.partitions(start_day, end_day)]
+            parts = [future.result() for future in futures]
+
+        app_totals = np.zeros(len(self.app_names), dtype=np.int64)
+        category_totals = np.zeros(len(self.category_names), dtype=np.int64)
+        rows = 0
+        for apps, categories, count in parts:
+            app_totals += apps.astype(np.int64)
+            category_totals += categories.astype(np.int64)
+            rows += count
+        return app_totals, category_totals, rows
+
+    def ranked(self, totals, names):
+        """Non-zero totals as a Series sorted descending, ties by name"""
+        summary = pd.Series(totals, index=names)
+        return summary[summary > 0].sort_values(ascending=False, kind='stable')
+
+    def close(self):
+        self.columns = None
+        self._finalizer()
@@ -0,0 +1,152 @@
+import os
+import time
+from config import DB_CONFIG, PROFILE_CACHE_BUDGET_MB, get_profile_name, set_profile
+from database import clear_screen_time_data, close_db, fetch_screen_time_columns, get_connection, init_db
+import backup
+import events
+import limits
+import metadata
+
+# --- CONFIGURATION ---
+NAME_BYTES = 80               # Rough size of one cached name (str object plus array slot)
+METADATA_ROW_BYTES = 400      # Rough size of one app or category in the registry
+
+
+class ProfileState:
+    """
+    What is kept for one profile while another is active: its connection,
+    whose page cache stays warm, the shared registry, limit tracker and
+    backup manager, and the entry columns last fetched for charts.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.db_path = DB_CONFIG[name]['name']
+        self.conn = None
+        self.registry = None
+        self.tracker = None
+        self.backups = None
+        self.columns = None
+        self.last_used = time.monotonic()
+
+    def connection(self):
+        """The profile's long-lived connection, opened while the profile is current"""
+        if self.conn is None:
+            self.conn = get_connection()
+        return self.conn
+
+    def nbytes(self):
+        """Rough memory held by the evictable caches"""
+        size = 0
+        if self.columns is not None:
+            size += self.columns.entries.nbytes
+            size += (len(self.columns.app_names) + len(self.columns.category_names)) * NAME_BYTES
+        if self.registry is not None:
+            size += (len(self.registry.apps) + len(self.registry.category_colors)) * METADATA_ROW_BYTES
+        if self.conn is not None:
+            # The page cache fills up to cache_size (negative means KiB), at most the file
+            cache_size = self.conn.execute('PRAGMA cache_size').fetchone()[0]
+            page_size = self.conn.execute('PRAGMA page_size').fetchone()[0]
+            cache = -cache_size * 1024 if cache_size < 0 else cache_size * page_size
+            size += min(cache, os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0)
+        return size
+
+    def release(self):
+        """Drop the caches, they are rebuilt when the profile is used again"""
+        self.columns = self.registry = self.tracker = None
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+class ProfileManager:
+    """
+    Switches the current database (a DB_CONFIG entry) at runtime. The
+    state of the profile being left is parked rather than dropped, so
+    switching back is instant; parked profiles are released least
+    recently used first while they hold more than the memory budget.
+    """
+
+    def __init__(self, budget_mb=PROFILE_CACHE_BUDGET_MB):
+        self.budget = budget_mb * 2**20
+        self.states = {}              # name -> ProfileState, in order of first use
+        self.active = None
+        for event in ('record_added', 'app_added', 'category_added'):
+            events.subscribe(event, self.on_change)
+
+    def switch(self, name):
+        """Make a profile current, returns whether it was used for the first time"""
+        set_profile(name)  # Validates the name before anything is parked
+        if name == self.active:
+            return False
+        if self.active is not None:
+            parked = self.states[self.active]
+            parked.registry = metadata.set_registry(None)
+            parked.tracker = limits.set_tracker(None)
+            parked.backups = backup.set_backup_manager(None)
+            parked.last_used = time.monotonic()
+        first_use = name not in self.states
+        if first_use:
+            init_db()
+            self.states[name] = ProfileState(name)
+        state = self.states[name]
+        metadata.set_registry(state.registry)
+        limits.set_tracker(state.tracker)
+        backup.set_backup_manager(state.backups)
+        self.active = name
+        self.evict()
+        return first_use
+
+    def evict(self):
+        """Release parked profiles, least recently used first, until they fit the budget"""
+        parked = sorted((state for name, state in self.states.items() if name != self.active),
+                        key=lambda state: state.last_used)
+        sizes = {state.name: state.nbytes() for state in parked}
+        total = sum(sizes.values())
+        released = []
+        for state in parked:
+            if total <= self.budget:
+                break
+            total -= sizes[state.name]
+            state.release()
+            released.append(state.name)
+        return released
+
+    def columns(self):
+        """Entry columns of the current profile, fetched through its connection once per change"""
+        state = self.states[self.active]
+        if state.columns is None:
+            state.columns = fetch_screen_time_columns(conn=state.connection())
+        return state.columns
+
+    def on_change(self, **data):
+        if self.active is not None:
+            self.states[self.active].columns = None
+
+    def close(self):
+        """
+        Close every profile used: sample data is cleared where the profile
+        asks for it and each database is checkpointed. The current profile
+        is left current.
+        """
+        current = self.active
+        for name, state in self.states.items():
+            state.release()
+            set_profile(name)
+            if DB_CONFIG[name]['sample_data']:
+                clear_screen_time_data()
+            close_db()
+        if current is not None:
+            set_profile(current)
+
+
+_manager = None
+
+
+def get_profile_manager():
+    """Shared manager, starting on the configured profile"""
+    global _manager
+    if _manager is None:
+        _manager = ProfileManager()
+        _manager.switch(get_profile_name())
+    return _manager
@@ -0,0 +1,210 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+import config
+
+# --- CONFIGURATION ---
+LOG_SIZE = 5000              # Most recent statements kept
+PROGRESS_STEPS = 1000        # VM instructions between progress callbacks
+
+_COMMENT = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.I)
+_SPACE = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """Statement text with literals replaced, for grouping similar statements"""
+    sql = _COMMENT.sub(' ', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (?)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+class QueryRecord:
+    """One executed statement; fetches add their rows and time to it"""
+    __slots__ = ('sql', 'params', 'rows', 'elapsed_ms', 'statements', 'vm_steps', 'slow', 'plan')
+
+    def __init__(self, sql, params):
+        self.sql = sql
+        self.params = params
+        self.rows = 0
+        self.elapsed_ms = 0.0
+        self.statements = 0       # From the trace callback (executemany runs one per row)
+        self.vm_steps = 0         # From the progress handler, high counts hint at scans
+        self.slow = False
+        self.plan = None
+
+
+class QueryLog:
+    """Statement log shared by all logged connections"""
+
+    def __init__(self, size=LOG_SIZE):
+        self.records = deque(maxlen=size)
+        self.plans = {}           # Normalized text -> EXPLAIN QUERY PLAN rows
+        self.lock = threading.Lock()
+
+    def add(self, record):
+        with self.lock:
+            self.records.append(record)
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+            self.plans.clear()
+
+    def slow_queries(self):
+        with self.lock:
+            return [record for record in self.records if record.slow]
+
+    def report(self):
+        """Statements grouped by normalized text, slowest total first"""
+        groups = {}
+        with self.lock:
+            records = list(self.records)
+        for record in records:
+            key = normalize(record.sql)
+            group = groups.setdefault(key, {
+                'sql': key, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+                'params': record.params, 'statements': 0, 'vm_steps': 0, 'slow': 0, 'plan': self.plans.get(key)
+            })
+            group['calls'] += 1
+            group['total_ms'] += record.elapsed_ms
+            group['max_ms'] = max(group['max_ms'], record.elapsed_ms)
+            group['rows'] += record.rows
+            group['statements'] += record.statements
+            group['vm_steps'] += record.vm_steps
+            group['slow'] += record.slow
+        return sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)
+
+    def print_report(self, limit=20):
+        print(f"{'calls':>6} {'total ms':>9} {'max ms':>8} {'rows':>8} {'vm steps':>9} {'slow':>5}  statement")
+        for group in self.report()[:limit]:
+            print(f"{group['calls']:>6} {group['total_ms']:>9.2f} {group['max_ms']:>8.2f} "
+                  f"{group['rows']:>8} {group['vm_steps']:>9} {group['slow']:>5}  {group['sql'][:100]}")
+            for row in group['plan'] or []:
+                print(f"{'':>51}plan: {row[-1]}")
+
+
+query_log = QueryLog()
+
+
+class LoggedCursor(sqlite3.Cursor):
+    """Cursor timing each statement and counting the rows fetched from it"""
+
+    _record = None
+
+    def _start(self, sql, params, many=False):
+        record = QueryRecord(sql, len(params[0]) if many and params else len(params))
+        self._record = record
+        self.connection._current = record
+        query_log.add(record)
+        return record
+
+    def _timed(self, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            record = self._record
+            if record is not None:
+                record.elapsed_ms += (time.perf_counter() - start) * 1000
+                self.connection._check_slow(record)
+
+    def execute(self, sql, parameters=()):
+        self._start(sql, parameters)
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        self._start(sql, seq_of_parameters, many=True)
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def _count(self, rows):
+        if self._record is not None:
+            self._record.rows += rows
+        return rows
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is not None:
+            self._count(1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, size if size is not None else self.arraysize)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._count(len(rows))
+        return rows
+
+    def __next__(self):
+        row = self._timed(super().__next__)
+        self._count(1)
+        return row
+
+
+class LoggedConnection(sqlite3.Connection):
+    """
+    Connection logging every statement through LoggedCursor. The trace
+    callback counts the statements actually run (including executemany
+    rows) and the progress handler counts VM steps. Statements slower than
+    config.SLOW_QUERY_MS get their EXPLAIN QUERY PLAN captured once.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._current = None
+        self._explaining = False
+        self.set_trace_callback(self._on_trace)
+        self.set_progress_handler(self._on_progress, PROGRESS_STEPS)
+
+    def _on_trace(self, statement):
+        if self._current is not None and not self._explaining:
+            self._current.statements += 1
+
+    def _on_progress(self):
+        if self._current is not None and not self._explaining:
+            self._current.vm_steps += PROGRESS_STEPS
+        return 0  # Never abort
+
+    def _check_slow(self, record):
+        if record.slow or record.elapsed_ms < config.SLOW_QUERY_MS:
+            return
+        record.slow = True
+        key = normalize(record.sql)
+        if key not in query_log.plans:
+            query_log.plans[key] = self.explain(record.sql, record.params)
+        record.plan = query_log.plans[key]
+
+    def explain(self, sql, param_count=0):
+        """EXPLAIN QUERY PLAN rows for a statement, parameters bound to NULL"""
+        self._explaining = True
+        try:
+            cursor = sqlite3.Cursor(self)
+            return cursor.execute(f'EXPLAIN QUERY PLAN {sql}', (None,) * param_count).fetchall()
+        except sqlite3.Error as e:
+            return [(0, 0, 0, f"EXPLAIN failed: {e}")]
+        finally:
+            self._explaining = False
+
+    def cursor(self, factory=LoggedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def is_enabled():
+    return config.QUERY_LOG or bool(os.environ.get('SCREEN_TIME_QUERY_LOG'))
@@ -0,0 +1,113 @@
+import argparse
+import numpy as np
+from database import add_session, fetch_app_directory, fetch_sessions, init_db, write_session_totals
+from utils import from_day, to_minute
+
+# --- CONFIGURATION ---
+MINUTES_PER_DAY = 1440
+MINUTES_PER_HOUR = 60
+
+
+def split_intervals(starts, ends, size):
+    """
+    Cut [start, end) intervals at every multiple of size, in one vectorized
+    pass. Returns (source interval index, bucket number, minutes) per piece;
+    bucket b covers [b * size, (b + 1) * size).
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    first = starts // size
+    counts = (ends - 1) // size - first + 1
+    source = np.repeat(np.arange(len(starts)), counts)
+    # Position of each piece within its interval
+    offsets = np.arange(len(source)) - np.repeat(np.cumsum(counts) - counts, counts)
+    buckets = first[source] + offsets
+    pieces = (np.minimum(ends[source], (buckets + 1) * size)
+              - np.maximum(starts[source], buckets * size))
+    return source, buckets, pieces
+
+
+def fetch_session_arrays(start_day, end_day, app_ids=None):
+    """(app ids, starts, ends) of the sessions within a day range, clipped to it"""
+    first, last = start_day * MINUTES_PER_DAY, (end_day + 1) * MINUTES_PER_DAY
+    rows = np.array(fetch_sessions(first, last), dtype=np.int64).reshape(-1, 3)
+    if app_ids is not None:
+        rows = rows[np.isin(rows[:, 0], list(app_ids))]
+    return rows[:, 0], np.maximum(rows[:, 1], first), np.minimum(rows[:, 2], last)
+
+
+def daily_totals(apps, starts, ends):
+    """(app ids, days, minutes) summed per app and day, sessions crossing midnight are split"""
+    source, days, pieces = split_intervals(starts, ends, MINUTES_PER_DAY)
+    # One integer key per (app, day), sorted by app then day
+    first_day = days.min() if len(days) else 0
+    span = days.max() - first_day + 1 if len(days) else 1
+    keys, inverse = np.unique(apps[source] * span + (days - first_day), return_inverse=True)
+    minutes = np.bincount(inverse, weights=pieces, minlength=len(keys)).astype(np.int64)
+    return keys // span, keys % span + first_day, minutes
+
+
+def hour_profile(start_day, end_day, app_ids=None):
+    """Minutes per hour of the day (24 values) over a day range, optionally for some apps"""
+    _, starts, ends = fetch_session_arrays(start_day, end_day, app_ids)
+    _, hours, pieces = split_intervals(starts, ends, MINUTES_PER_HOUR)
+    return np.bincount(hours % 24, weights=pieces, minlength=24).astype(np.int64)
+
+
+def hour_matrix(start_day, end_day, app_ids=None):
+    """Minutes per day and hour, a (days, 24) array starting at start_day"""
+    _, starts, ends = fetch_session_arrays(start_day, end_day, app_ids)
+    _, hours, pieces = split_intervals(starts, ends, MINUTES_PER_HOUR)
+    slots = hours - start_day * 24
+    grid = np.bincount(slots, weights=pieces, minlength=(end_day - start_day + 1) * 24)
+    return grid.astype(np.int64).reshape(-1, 24)
+
+
+def derive_daily_totals(start_day, end_day):
+    """Rewrite the session-derived entries of a day range, returns the changes"""
+    apps, days, minutes = daily_totals(*fetch_session_arrays(start_day, end_day))
+    return write_session_totals(start_day, end_day,
+                                list(zip(apps.tolist(), days.tolist(), minutes.tolist())))
+
+
+def record_session(app_id, start, end):
+    """Store a session (datetimes or YYYY-MM-DD HH:MM) and update the days it touches"""
+    start_minute, end_minute = to_minute(start), to_minute(end)
+    if end_minute <= start_minute:
+        raise ValueError("A session must end after it starts")
+    add_session(app_id, start_minute, end_minute)
+    return derive_daily_totals(start_minute // MINUTES_PER_DAY, (end_minute - 1) // MINUTES_PER_DAY)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record timed sessions and derive daily totals from them")
+    parser.add_argument('command', choices=['record', 'derive', 'hours'])
+    parser.add_argument('--app', help="App name (required by record, optional for hours)")
+    parser.add_argument('--start', required=True, help="YYYY-MM-DD HH:MM for record, YYYY-MM-DD otherwise")
+    parser.add_argument('--end', required=True, help="YYYY-MM-DD HH:MM for record (exclusive), YYYY-MM-DD otherwise")
+    args = parser.parse_args()
+    init_db()
+
+    app_ids = {name: app_id for app_id, name, _, _ in fetch_app_directory()}
+    if args.app is not None and args.app not in app_ids:
+        parser.error(f"Unknown app {args.app!r}")
+    if args.command == 'record':
+        if args.app is None:
+            parser.error("record needs --app")
+        changes = record_session(app_ids[args.app], args.start, args.end)
+        for _, minutes, day in changes:
+            print(f"{from_day(day)}: {minutes:+d} min")
+        print(f"Session recorded, {len(changes)} daily totals updated")
+        return
+
+    start_day, end_day = to_minute(args.start) // MINUTES_PER_DAY, to_minute(args.end) // MINUTES_PER_DAY
+    if args.command == 'derive':
+        print(f"{len(derive_daily_totals(start_day, end_day))} daily totals updated")
+    else:
+        profile = hour_profile(start_day, end_day, None if args.app is None else [app_ids[args.app]])
+        for hour, minutes in enumerate(profile.tolist()):
+            print(f"{hour:02d}:00  {minutes} min")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,83 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, colorchooser
-from database import add_category, add_app, get_category_id, fetch_apps_with_categories, fetch_categories, toggle_app_favorite, update_category_color
+from database import (add_category, add_app_by_category, toggle_app_favorite, update_category_color,
+                      fetch_limits, set_limit, delete_limit)
+from metadata import get_registry
+from app_search import AppSearchIndex
+from tree_sync import TreeviewSync
+from instrumentation import traced
+from limits import get_tracker
+from categorizer import categorize
+
+LIMIT_TYPES = {'App': 'app', 'Category': 'category'}
+LIMIT_PERIODS = {'Daily': 'day', 'Weekly': 'week'}
 
 class SettingsDialog:
+    """
+    Built once, then hidden on close and shown again. Each tab is populated
+    the first time it is viewed; showing the dialog again only syncs the
+    rows that changed in the tabs already built.
+    """
+
     def __init__(self, parent):
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Settings")
         self.dialog.geometry("500x600")
         self.dialog.minsize(450, 500)
         self.dialog.transient(parent)
-        self.dialog.grab_set()
+        self.dialog.protocol("WM_DELETE_WINDOW", self.hide)
+        self.closed = tk.BooleanVar(value=True)  # Written on every show and hide, for wait_variable
 
         # Create notebook for tabs
-        notebook = ttk.Notebook(self.dialog)
-        notebook.pack(fill='both', expand=True, padx=5, pady=5)
+        self.notebook = ttk.Notebook(self.dialog)
+        self.notebook.pack(fill='both', expand=True, padx=5, pady=5)
 
-        # Apps tab (first)
-        apps_frame = ttk.Frame(notebook)
-        notebook.add(apps_frame, text='Apps')
-        self.setup_apps_tab(apps_frame)
+        # Apps, Categories and Limits tabs, empty until first viewed
+        self.pending_tabs = {}   # tab frame -> (setup, refresh) until built
+        self.built_tabs = []     # refresh of each built tab
+        for text, setup, refresh in (('Apps', self.setup_apps_tab, self.refresh_apps_tab),
+                                     ('Categories', self.setup_categories_tab, self.refresh_categories_tab),
+                                     ('Limits', self.setup_limits_tab, self.refresh_limits_tab)):
+            frame = ttk.Frame(self.notebook)
+            self.notebook.add(frame, text=text)
+            self.pending_tabs[str(frame)] = (frame, setup, refresh)
+        self.notebook.bind('<<NotebookTabChanged>>', lambda e: self.build_current_tab())
+        self.show()
+
+    def build_current_tab(self):
+        """Populate the selected tab on its first view"""
+        pending = self.pending_tabs.pop(self.notebook.select(), None)
+        if pending is not None:
+            frame, setup, refresh = pending
+            setup(frame)
+            self.built_tabs.append(refresh)
+
+    @traced('settings.show', 'dialog')
+    def show(self):
+        """Show the dialog with the built tabs brought up to date"""
+        for refresh in self.built_tabs:
+            refresh()
+        self.build_current_tab()
+        self.dialog.deiconify()
+        self.dialog.lift()
+        self.dialog.grab_set()
+        self.closed.set(False)
 
-        # Categories tab (second)
-        categories_frame = ttk.Frame(notebook)
-        notebook.add(categories_frame, text='Categories')
-        self.setup_categories_tab(categories_frame)
+    def hide(self):
+        self.dialog.grab_release()
+        self.dialog.withdraw()
+        self.closed.set(True)
 
     def setup_apps_tab(self, parent):
+        # Search box filtering the app list
+        search_frame = ttk.Frame(parent)
+        search_frame.pack(fill='x', padx=5, pady=(5, 0))
+        ttk.Label(search_frame, text="Search:").pack(side='left')
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
+        search_entry.pack(side='left', fill='x', expand=True, padx=5)
+        search_entry.bind('<KeyRelease>', lambda e: self.filter_apps())
+
         # App list with favorite column
         list_frame = ttk.Frame(parent)
         list_frame.pack(fill='both', expand=True, pady=5)
@@ -43,6 +95,10 @@ class SettingsDialog:
         self.apps_tree.column('favorite', width=30, anchor='center', minwidth=30)
         self.apps_tree.column('name', width=150, minwidth=100)
         self.apps_tree.column('category', width=100, minwidth=80)
+
+        # Rows keyed by app name, favorites first then by name
+        self.apps_sync = TreeviewSync(self.apps_tree,
+                                      sort_key=lambda name, values: (values[0] != '⭐', name))
         
         # Bind double-click to toggle favorite
         self.apps_tree.bind('<Double-1>', self.toggle_favorite)
@@ -65,6 +121,7 @@ class SettingsDialog:
         ttk.Label(name_frame, text="Name:").pack(side='left')
         self.app_entry = ttk.Entry(name_frame, width=20)
         self.app_entry.pack(side='left', padx=5, fill='x', expand=True)
+        self.app_entry.bind('<KeyRelease>', lambda e: self.suggest_category())
         
         # Right side: Category selection and Add button
         category_frame = ttk.Frame(input_container)
@@ -76,11 +133,24 @@ class SettingsDialog:
                                          state='readonly',
                                          width=15)
         self.category_combo.pack(side='left', padx=5)
+        # A category picked by hand is kept, otherwise it follows the typed name
+        self.category_picked = False
+        self.category_combo.bind('<<ComboboxSelected>>', lambda e: setattr(self, 'category_picked', True))
         
         # Add button
         ttk.Button(category_frame, text="Add", 
                   command=self.add_new_app).pack(side='left', padx=5)
         
+        self.indexed = None  # (names, favorites) the search index was built from
+        self.refresh_category_combo()
+        self.refresh_apps()
+
+    def refresh_apps_tab(self):
+        """Clear the inputs and sync the lists, as when the tab was first built"""
+        self.search_var.set('')
+        self.app_entry.delete(0, tk.END)
+        self.category_var.set('')
+        self.category_picked = False
         self.refresh_category_combo()
         self.refresh_apps()
 
@@ -102,6 +172,10 @@ class SettingsDialog:
         self.categories_tree.column('name', width=200)
         self.categories_tree.column('color', width=0, minwidth=0, stretch=False)  # Hide the column by setting width to 0
         self.categories_tree.column('preview', width=50, anchor='center')
+
+        # Rows keyed by category name, one shared tag per color
+        self.categories_sync = TreeviewSync(self.categories_tree)
+        self.color_tags = set()
         
         # Bind double-click to color picker
         self.categories_tree.bind('<Double-1>', self.pick_color)
@@ -127,74 +201,186 @@ class SettingsDialog:
 
         self.refresh_categories()
 
+    def setup_limits_tab(self, parent):
+        # Limit list
+        list_frame = ttk.Frame(parent)
+        list_frame.pack(fill='both', expand=True, pady=5)
+
+        self.limits_tree = ttk.Treeview(list_frame, columns=('name', 'type', 'period', 'minutes'), show='headings')
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.limits_tree.yview)
+        self.limits_tree.configure(yscrollcommand=scrollbar.set)
+
+        self.limits_tree.heading('name', text='App / Category')
+        self.limits_tree.heading('type', text='Type')
+        self.limits_tree.heading('period', text='Period')
+        self.limits_tree.heading('minutes', text='Minutes')
+
+        self.limits_tree.column('name', width=150, minwidth=100)
+        self.limits_tree.column('type', width=70, minwidth=60)
+        self.limits_tree.column('period', width=70, minwidth=60)
+        self.limits_tree.column('minutes', width=60, anchor='e', minwidth=50)
+
+        # Rows keyed by limit id, sorted by name
+        self.limits_sync = TreeviewSync(self.limits_tree, sort_key=lambda limit_id, values: values)
+
+        self.limits_tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+
+        # Set limit frame
+        add_frame = ttk.LabelFrame(parent, text="Set Limit", padding=10)
+        add_frame.pack(fill='x', padx=5, pady=5)
+
+        self.limit_type_combo = ttk.Combobox(add_frame, values=list(LIMIT_TYPES), state='readonly', width=9)
+        self.limit_type_combo.set('App')
+        self.limit_type_combo.pack(side='left', padx=2)
+        self.limit_type_combo.bind('<<ComboboxSelected>>', lambda e: self.refresh_limit_targets())
+
+        self.limit_target_combo = ttk.Combobox(add_frame, state='readonly', width=16)
+        self.limit_target_combo.pack(side='left', padx=2)
+
+        self.limit_period_combo = ttk.Combobox(add_frame, values=list(LIMIT_PERIODS), state='readonly', width=8)
+        self.limit_period_combo.set('Daily')
+        self.limit_period_combo.pack(side='left', padx=2)
+
+        self.limit_minutes_entry = ttk.Entry(add_frame, width=6)
+        self.limit_minutes_entry.pack(side='left', padx=2)
+        ttk.Label(add_frame, text="min").pack(side='left')
+
+        ttk.Button(add_frame, text="Set", command=self.set_new_limit).pack(side='left', padx=5)
+
+        ttk.Button(parent, text="Remove Selected", command=self.remove_limit).pack(pady=5)
+
+        self.refresh_limit_targets()
+        self.refresh_limits()
+
+    def refresh_categories_tab(self):
+        self.category_entry.delete(0, tk.END)
+        self.refresh_categories()
+
+    def refresh_limits_tab(self):
+        self.limit_minutes_entry.delete(0, tk.END)
+        self.refresh_limit_targets()
+        self.refresh_limits()
+
+    def limit_row(self, limit_id, target_type, target_name, period, minutes):
+        type_label = next(label for label, value in LIMIT_TYPES.items() if value == target_type)
+        period_label = next(label for label, value in LIMIT_PERIODS.items() if value == period)
+        return limit_id, (target_name, type_label, period_label, minutes), ()
+
+    def refresh_limits(self):
+        self.limits_sync.sync([self.limit_row(*limit) for limit in fetch_limits()])
+
+    def refresh_limit_targets(self):
+        if LIMIT_TYPES[self.limit_type_combo.get()] == 'app':
+            self.limit_target_combo['values'] = get_registry().sorted_app_names()
+        else:
+            self.limit_target_combo['values'] = [name for name, _ in get_registry().categories()]
+        self.limit_target_combo.set('')
+
+    @traced('settings.set_new_limit', 'dialog')
+    def set_new_limit(self):
+        target = self.limit_target_combo.get()
+        minutes = self.limit_minutes_entry.get().strip()
+        if not target or not minutes.isdigit():
+            messagebox.showwarning("Warning", "Please select an app or category and enter the minutes",
+                                   parent=self.dialog)
+            return
+        target_type = LIMIT_TYPES[self.limit_type_combo.get()]
+        period = LIMIT_PERIODS[self.limit_period_combo.get()]
+        limit_id = set_limit(target_type, target, period, int(minutes))
+        row = self.limit_row(limit_id, target_type, target, period, int(minutes))
+        if limit_id in self.limits_sync:
+            self.limits_sync.update(*row)
+        else:
+            self.limits_sync.insert(*row)
+        self.limit_minutes_entry.delete(0, tk.END)
+        get_tracker().reload()
+
+    def remove_limit(self):
+        for item in self.limits_tree.selection():
+            limit_id = self.limits_sync.key_for(item)
+            delete_limit(limit_id)
+            self.limits_sync.delete(limit_id)
+        get_tracker().reload()
+
     def create_color_preview(self, color):
         """Create a colored rectangle for preview"""
         canvas = tk.Canvas(self.categories_tree, width=20, height=20, bg=color)
         return canvas
 
+    def color_tag(self, color):
+        """Tag coloring the preview symbol, configured once per color"""
+        tag = f'color_{color}'
+        if tag not in self.color_tags:
+            self.categories_tree.tag_configure(tag, foreground=color)
+            self.color_tags.add(tag)
+        return tag
+
+    def category_row(self, name, color):
+        return name, (name, color, '■'), (self.color_tag(color),)
+
     def refresh_categories(self):
-        # Clear existing items and tags
-        for item in self.categories_tree.get_children():
-            self.categories_tree.delete(item)
-        
-        categories = fetch_categories()
-        seen_categories = set()  # Track categories we've already added
-        
-        for name, color in categories:
-            if name in seen_categories:
-                continue
-                
-            seen_categories.add(name)
-            item = self.categories_tree.insert('', 'end', values=(
-                name, 
-                color,
-                '■'
-            ))
-            
-            # Apply color to preview symbol only
-            preview_tag = f'preview_{name}'
-            self.categories_tree.tag_configure(preview_tag, foreground=color)
-            self.categories_tree.set(item, 'preview', '■')
-            self.categories_tree.item(item, tags=(preview_tag,))
+        # The registry holds one color per name
+        self.categories_sync.sync([self.category_row(name, color)
+                                   for name, color in get_registry().categories()])
+
+    def app_row(self, app_name, is_favorite, category):
+        return app_name, ('⭐' if is_favorite else '☆', app_name, category), ()
 
     def refresh_apps(self):
-        # Clear existing items
-        for item in self.apps_tree.get_children():
-            self.apps_tree.delete(item)
-        
-        # Fetch and insert apps
-        apps = fetch_apps_with_categories()
-        for app_name, is_favorite, category in apps:
-            self.apps_tree.insert('', 'end', values=(
-                '⭐' if is_favorite else '☆',
-                app_name,
-                category
-            ))
+        apps = get_registry().apps_with_categories()
+        self.apps_sync.sync([self.app_row(*app) for app in apps])
+
+        # Rebuilt only when the apps changed since it was built
+        indexed = ([name for name, _, _ in apps], [name for name, fav, _ in apps if fav])
+        if indexed != self.indexed:
+            self.app_index = AppSearchIndex(indexed[0], favorites=indexed[1])
+            self.indexed = indexed
+        self.filter_apps()
+
+    def filter_apps(self):
+        """Detach apps not matching the search text, keeping list order"""
+        query = self.search_var.get()
+        self.apps_sync.filter(self.app_index.matches(query) if query.strip() else None)
 
     def refresh_category_combo(self):
-        categories = fetch_categories()
+        categories = get_registry().categories()
         self.category_combo['values'] = [name for name, _ in categories]  # Only use category names
 
+    def suggest_category(self):
+        """Prefill the category chosen by the categorization rules"""
+        if self.category_picked:
+            return
+        app_name = self.app_entry.get().strip()
+        category = categorize(app_name) if app_name else ''
+        self.category_var.set(category if category in self.category_combo['values'] else '')
+
+    @traced('settings.add_new_category', 'dialog')
     def add_new_category(self):
         category_name = self.category_entry.get().strip()
         if category_name:
             add_category(category_name)
             self.category_entry.delete(0, tk.END)
-            self.refresh_categories()
-            self.refresh_category_combo()
+            if category_name not in self.categories_sync:
+                self.categories_sync.insert(*self.category_row(category_name, '#808080'))
+                self.category_combo['values'] = self.categories_sync.keys()
         else:
             messagebox.showwarning("Warning", "Please enter a category name")
 
+    @traced('settings.add_new_app', 'dialog')
     def add_new_app(self):
         app_name = self.app_entry.get().strip()
-        category = self.category_var.get()
+        category = self.category_var.get() or (categorize(app_name) if app_name else '')
         
         if app_name and category:
-            category_id = get_category_id(category)
-            if category_id:
-                add_app(app_name, category_id)
+            if add_app_by_category(app_name, category):
                 self.app_entry.delete(0, tk.END)
-                self.refresh_apps()
+                self.category_var.set('')
+                self.category_picked = False
+                if app_name not in self.apps_sync:
+                    self.apps_sync.insert(*self.app_row(app_name, False, category))
+                    self.app_index.add(app_name)
+                    self.filter_apps()
             else:
                 messagebox.showerror("Error", "Category not found")
         else:
@@ -202,19 +388,17 @@ class SettingsDialog:
 
     def toggle_favorite(self, event):
         """Toggle favorite status when double-clicking a row"""
-        item = self.apps_tree.selection()[0]
-        values = self.apps_tree.item(item)['values']
-        if values:  # Make sure we have values
-            app_name = values[1]  # App name is in second column
+        app_name = self.apps_sync.key_for(self.apps_tree.selection()[0])
+        if app_name:
             toggle_app_favorite(app_name)
             # Update the star in the tree
-            new_star = '☆' if values[0] == '⭐' else '⭐'
-            self.apps_tree.set(item, 'favorite', new_star) 
+            star = self.apps_sync.values(app_name)[0]
+            self.apps_sync.set(app_name, 'favorite', '☆' if star == '⭐' else '⭐')
 
+    @traced('settings.pick_color', 'dialog')
     def pick_color(self, event):
-        item = self.categories_tree.selection()[0]
-        category = self.categories_tree.item(item)['values'][0]
-        current_color = self.categories_tree.item(item)['values'][1]
+        category = self.categories_sync.key_for(self.categories_tree.selection()[0])
+        current_color = self.categories_sync.values(category)[1]
         
         color = colorchooser.askcolor(
             color=current_color,
@@ -224,5 +408,4 @@ class SettingsDialog:
         
         if color[1]:  # If color was selected
             update_category_color(category, color[1])
-            self.refresh_categories()
-            self.refresh_category_combo()  # Refresh combo box in apps tab 
\ No newline at end of file
+            self.categories_sync.update(*self.category_row(category, color[1]))
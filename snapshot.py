@@ -0,0 +1,202 @@
+import argparse
+import json
+import os
+import numpy as np
+from database import attach_archives, get_db_path, get_read_connection
+from utils import to_day, from_day
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:  # Snapshots are optional, the app runs without pyarrow
+    pa = None
+
+# --- CONFIGURATION ---
+SNAPSHOT_DIR = 'snapshots'   # One file per year is written here
+FORMAT = 'arrow'             # 'arrow' (IPC, memory-mapped zero-copy) or 'parquet' (smaller)
+EXTENSIONS = {'arrow': '.arrow', 'parquet': '.parquet'}
+
+# Column names used by the visualizer
+FRAME_COLUMNS = {'app': "App Name", 'category': "Category Name",
+                 'minutes': "Time Spent", 'date': "Date"}
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Snapshots need pyarrow: pip install pyarrow")
+
+
+def snapshot_schema():
+    # date32 counts days since 1970-01-01, exactly the day numbers stored in SQLite
+    return pa.schema([
+        ('app', pa.dictionary(pa.int32(), pa.string())),
+        ('category', pa.dictionary(pa.int32(), pa.string())),
+        ('minutes', pa.int32()),
+        ('date', pa.date32()),
+    ])
+
+
+def build_year_table(conn, year, category_colors):
+    """Build the denormalized table for one year from integer columns, archived or live"""
+    first_day, last_day = to_day(f'{year}-01-01'), to_day(f'{year}-12-31')
+    cursor = conn.execute(f'''
+        SELECT se.app_id, a.category_id, se.time_spent, se.day
+        FROM {attach_archives(conn, first_day, last_day)} se
+        JOIN apps a ON se.app_id = a.id
+        WHERE se.day BETWEEN ? AND ?
+        ORDER BY se.day
+    ''', (first_day, last_day))
+    records = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 4)
+
+    app_names = dict(conn.execute('SELECT id, name FROM apps'))
+    category_names = dict(conn.execute('SELECT id, name FROM categories'))
+
+    def encode(ids, names):
+        # Dictionary-encode ids; categories may repeat a name, so encode by name
+        dictionary = sorted({names[i] for i in np.unique(ids)})
+        codes = {name: code for code, name in enumerate(dictionary)}
+        unique_ids, inverse = np.unique(ids, return_inverse=True)
+        lookup = np.array([codes[names[i]] for i in unique_ids], dtype=np.int32)
+        return pa.DictionaryArray.from_arrays(
+            pa.array(lookup[inverse], type=pa.int32()), pa.array(dictionary, type=pa.string()))
+
+    table = pa.Table.from_arrays([
+        encode(records[:, 0], app_names),
+        encode(records[:, 1], category_names),
+        pa.array(records[:, 2].astype(np.int32)),
+        pa.array(records[:, 3].astype(np.int32)).cast(pa.date32()),
+    ], schema=snapshot_schema())
+    metadata = {b'year': str(year).encode(),
+                b'category_colors': json.dumps(category_colors).encode()}
+    return table.replace_schema_metadata(metadata)
+
+
+def snapshot_path(directory, year, fmt=FORMAT):
+    return os.path.join(directory, f"{year}{EXTENSIONS[fmt]}")
+
+
+def export_snapshot(db_path=None, directory=SNAPSHOT_DIR, fmt=FORMAT, years=None):
+    """Write one snapshot file per year, returns {year: rows}"""
+    require_pyarrow()
+    db_path = db_path or get_db_path()
+    conn = get_read_connection(db_path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        first, last = conn.execute(f'SELECT MIN(day), MAX(day) FROM {attach_archives(conn)}').fetchone()
+        if first is None:
+            return {}
+        category_colors = dict(conn.execute('SELECT name, color FROM categories'))
+        years = years or range(from_day(first).year, from_day(last).year + 1)
+
+        written = {}
+        for year in years:
+            table = build_year_table(conn, year, category_colors)
+            path = snapshot_path(directory, year, fmt)
+            tmp_path = path + '.tmp'
+            # Write to a temporary file first so readers never see a partial file
+            if fmt == 'arrow':
+                with pa.OSFile(tmp_path, 'wb') as sink:
+                    with ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+            else:
+                pq.write_table(table, tmp_path, compression='zstd')
+            os.replace(tmp_path, path)
+            written[year] = table.num_rows
+        return written
+    finally:
+        conn.close()
+
+
+def snapshot_years(directory=SNAPSHOT_DIR):
+    """Years available in a snapshot directory, with their file paths"""
+    years = {}
+    if not os.path.isdir(directory):
+        return years
+    for filename in os.listdir(directory):
+        name, ext = os.path.splitext(filename)
+        if name.isdigit() and ext in EXTENSIONS.values():
+            years[int(name)] = os.path.join(directory, filename)
+    return dict(sorted(years.items()))
+
+
+def read_snapshot_file(path):
+    if path.endswith(EXTENSIONS['arrow']):
+        # Buffers point into the memory map, nothing is copied
+        return ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return pq.read_table(path, memory_map=True)
+
+
+def load_snapshot(directory=SNAPSHOT_DIR, years=None):
+    """Load the snapshot as a single Arrow table covering the requested years"""
+    require_pyarrow()
+    available = snapshot_years(directory)
+    tables = [read_snapshot_file(path) for year, path in available.items()
+              if years is None or year in years]
+    if not tables:
+        return snapshot_schema().empty_table()
+    if len(tables) == 1:
+        return tables[0]
+    # One chunk per year; only the dictionary indices are remapped so all
+    # chunks share one dictionary, the value buffers stay memory-mapped
+    table = pa.concat_tables([t.replace_schema_metadata(None) for t in tables])
+    table = table.unify_dictionaries()
+    colors = {}
+    for t in tables:
+        colors.update(json.loads((t.schema.metadata or {}).get(b'category_colors', b'{}')))
+    return table.replace_schema_metadata({b'category_colors': json.dumps(colors).encode()})
+
+
+def snapshot_category_colors(table):
+    return json.loads((table.schema.metadata or {}).get(b'category_colors', b'{}'))
+
+
+def snapshot_days(table):
+    """Day numbers of a snapshot table as a NumPy array"""
+    column = table.column('date').cast(pa.int32())
+    if column.num_chunks == 1:
+        return column.chunk(0).to_numpy()  # A view of the mapped file, no copy
+    return column.to_numpy()
+
+
+def load_snapshot_frame(directory=SNAPSHOT_DIR, years=None):
+    """Load the snapshot as a DataFrame in the visualizer's column layout.
+    App and category become pandas categoricals (dictionary-encoded)."""
+    table = load_snapshot(directory, years)
+    df = table.to_pandas(date_as_object=False).rename(columns=FRAME_COLUMNS)
+    return df, snapshot_category_colors(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or view yearly snapshots")
+    parser.add_argument('command', choices=['export', 'info', 'view'])
+    parser.add_argument('--db', help="Database file (default: current profile)")
+    parser.add_argument('--dir', default=SNAPSHOT_DIR)
+    parser.add_argument('--format', choices=list(EXTENSIONS), default=FORMAT)
+    parser.add_argument('--years', type=int, nargs='*')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        for year, rows in export_snapshot(args.db, args.dir, args.format, args.years).items():
+            print(f"{year}: {rows} rows -> {snapshot_path(args.dir, year, args.format)}")
+    elif args.command == 'info':
+        table = load_snapshot(args.dir, args.years)
+        print(f"{table.num_rows} rows, {table.nbytes / 1024:.0f} KiB, "
+              f"years {list(snapshot_years(args.dir))}")
+    else:
+        import tkinter as tk
+        from visualizer import display_visualization
+
+        df, colors = load_snapshot_frame(args.dir, args.years)
+        if df.empty:
+            print("Snapshot is empty")
+            return
+        root = tk.Tk()
+        root.withdraw()
+        window = display_visualization(df, category_colors=colors)
+        window.protocol("WM_DELETE_WINDOW", root.destroy)
+        root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
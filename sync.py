@@ -0,0 +1,328 @@
+import argparse
+import json
+import socket
+import socketserver
+import struct
+import uuid
+import zlib
+from contextlib import closing
+from database import get_connection, init_db
+import events
+
+# --- CONFIGURATION ---
+SYNC_HOST = '127.0.0.1'      # Peers talk over the loopback interface only
+SYNC_PORT = 8765
+COMPRESSION = 6               # zlib level of the payloads
+NOW_MS = "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+
+# Logs the current total of one (app, day) as a change of this device.
+# The clock never goes backwards, so a local edit made after receiving a
+# change always wins over it.
+LOG_CHANGE = '''
+    UPDATE sync_meta SET value = MAX(value + 1, {now}) WHERE key = 'clock';
+    INSERT INTO change_log (device_id, seq, app_name, category_name, day, minutes, changed_at)
+    SELECT d.value,
+           (SELECT COALESCE(MAX(seq), 0) + 1 FROM change_log WHERE device_id = d.value),
+           a.name, c.name, {day},
+           (SELECT COALESCE(SUM(time_spent), 0) FROM screen_time_entries WHERE app_id = {app} AND day = {day}),
+           (SELECT value FROM sync_meta WHERE key = 'clock')
+    FROM sync_meta d, apps a JOIN categories c ON c.id = a.category_id
+    WHERE d.key = 'device' AND a.id = {app}{condition};
+'''
+NOT_PAUSED = "NOT EXISTS (SELECT 1 FROM sync_meta WHERE key = 'paused')"
+
+
+def ensure_schema(conn):
+    """
+    Create the change log and its triggers once, give the database a
+    device id and log the existing totals as its first changes.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'change_log'").fetchone():
+        return
+    with conn:
+        conn.executescript(f'''
+            CREATE TABLE sync_meta (key TEXT PRIMARY KEY, value);
+            -- Append-only: every (app, day) total written here or received
+            CREATE TABLE change_log (
+                device_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                app_name TEXT NOT NULL,
+                category_name TEXT NOT NULL,
+                day INTEGER NOT NULL,
+                minutes INTEGER NOT NULL,
+                changed_at INTEGER NOT NULL,  -- ms since 1970, never decreasing per database
+                PRIMARY KEY (device_id, seq)
+            ) WITHOUT ROWID;
+            CREATE INDEX idx_change_log_key ON change_log (app_name, day);
+            -- What each peer had, per origin device, when it last sent us a payload
+            CREATE TABLE sync_peers (
+                peer_id TEXT NOT NULL,
+                device_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                PRIMARY KEY (peer_id, device_id)
+            ) WITHOUT ROWID;
+
+            CREATE TRIGGER sync_log_insert AFTER INSERT ON screen_time_entries
+            WHEN {NOT_PAUSED}
+            BEGIN
+                {LOG_CHANGE.format(now=NOW_MS, app='NEW.app_id', day='NEW.day', condition='')}
+            END;
+            CREATE TRIGGER sync_log_update AFTER UPDATE ON screen_time_entries
+            WHEN {NOT_PAUSED}
+            BEGIN
+                {LOG_CHANGE.format(now=NOW_MS, app='NEW.app_id', day='NEW.day', condition='')}
+                {LOG_CHANGE.format(now=NOW_MS, app='OLD.app_id', day='OLD.day',
+                                   condition=' AND (OLD.app_id <> NEW.app_id OR OLD.day <> NEW.day)')}
+            END;
+            CREATE TRIGGER sync_log_delete AFTER DELETE ON screen_time_entries
+            WHEN {NOT_PAUSED}
+            BEGIN
+                {LOG_CHANGE.format(now=NOW_MS, app='OLD.app_id', day='OLD.day', condition='')}
+            END;
+        ''')
+        device = uuid.uuid4().hex[:12]
+        clock = conn.execute(f'SELECT {NOW_MS}').fetchone()[0]
+        conn.executemany('INSERT INTO sync_meta (key, value) VALUES (?, ?)', [('device', device), ('clock', clock)])
+        conn.execute('''
+            INSERT INTO change_log (device_id, seq, app_name, category_name, day, minutes, changed_at)
+            SELECT ?, ROW_NUMBER() OVER (ORDER BY se.day, a.name), a.name, c.name, se.day, SUM(se.time_spent), ?
+            FROM screen_time_entries se
+            JOIN apps a ON a.id = se.app_id
+            JOIN categories c ON c.id = a.category_id
+            GROUP BY se.app_id, se.day
+        ''', (device, clock))
+
+
+def pause(conn):
+    """Keep the writes of conn's transaction out of the change log (e.g. archiving)"""
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sync_meta'").fetchone():
+        conn.execute("INSERT OR REPLACE INTO sync_meta (key, value) VALUES ('paused', 1)")
+
+
+def resume(conn):
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sync_meta'").fetchone():
+        conn.execute("DELETE FROM sync_meta WHERE key = 'paused'")
+
+
+def device_id(conn):
+    return conn.execute("SELECT value FROM sync_meta WHERE key = 'device'").fetchone()[0]
+
+
+def local_vector(conn):
+    """Highest sequence number held per origin device"""
+    return dict(conn.execute('SELECT device_id, MAX(seq) FROM change_log GROUP BY device_id'))
+
+
+def changes_since(conn, vector):
+    """
+    Changes missing from a peer that holds vector. Only the latest change
+    of each origin device per (app, day) is kept, the others can never win.
+    """
+    latest = {}
+    for device, seq in local_vector(conn).items():
+        if seq <= vector.get(device, 0):
+            continue
+        for change in conn.execute('''
+            SELECT device_id, seq, app_name, category_name, day, minutes, changed_at
+            FROM change_log WHERE device_id = ? AND seq > ?
+        ''', (device, vector.get(device, 0))):
+            key = (change[0], change[2], change[4])
+            if key not in latest or (change[6], change[1]) > (latest[key][6], latest[key][1]):
+                latest[key] = change
+    return sorted(latest.values(), key=lambda change: (change[0], change[1]))
+
+
+def encode(message):
+    return zlib.compress(json.dumps(message, separators=(',', ':')).encode(), COMPRESSION)
+
+
+def decode(data):
+    return json.loads(zlib.decompress(data))
+
+
+def build_payload(peer_vector=None, db_path=None):
+    """Compressed payload with the changes a peer holding peer_vector lacks (all of them by default)"""
+    with closing(get_connection(db_path)) as conn:
+        ensure_schema(conn)
+        return encode({
+            'device': device_id(conn),
+            'vector': local_vector(conn),
+            'changes': changes_since(conn, peer_vector or {}),
+        })
+
+
+def apply_payload(data, db_path=None):
+    """
+    Merge a peer's payload. For every (app, day) it touches, the change with
+    the greatest (changed_at, device, seq) wins on every peer, and the local
+    entries of that day are replaced by its total. Days inside a locally
+    archived year are only logged: the archive stays as it was and the live
+    table gets no entries for them. Returns (changes received, (app, day)
+    totals rewritten).
+    """
+    message = decode(data)
+    updated = []        # (app id, change in minutes, day)
+    new_apps = []       # (app id, name, category id)
+    new_categories = [] # (category id, name)
+    with closing(get_connection(db_path)) as conn:
+        ensure_schema(conn)
+        local = device_id(conn)
+        changes = [tuple(change) for change in message['changes'] if change[0] != local]
+        with conn:
+            pause(conn)
+            conn.executemany('''
+                INSERT OR IGNORE INTO change_log (device_id, seq, app_name, category_name, day, minutes, changed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', changes)
+            if changes:
+                conn.execute("UPDATE sync_meta SET value = MAX(value, ?) WHERE key = 'clock'",
+                             (max(change[6] for change in changes),))
+
+            archived = conn.execute('SELECT first_day, last_day FROM archives').fetchall()
+            for app_name, day in sorted({(change[2], change[4]) for change in changes}):
+                if any(first_day <= day <= last_day for first_day, last_day in archived):
+                    continue
+                category_name, minutes = conn.execute('''
+                    SELECT category_name, minutes FROM change_log WHERE app_name = ? AND day = ?
+                    ORDER BY changed_at DESC, device_id DESC, seq DESC LIMIT 1
+                ''', (app_name, day)).fetchone()
+                row = conn.execute('SELECT id FROM apps WHERE name = ?', (app_name,)).fetchone()
+                if row is None:
+                    category = conn.execute('SELECT id FROM categories WHERE name = ? LIMIT 1', (category_name,)).fetchone()
+                    if category is None:
+                        category = (conn.execute('INSERT INTO categories (name) VALUES (?)', (category_name,)).lastrowid,)
+                        new_categories.append((category[0], category_name))
+                    row = (conn.execute('INSERT INTO apps (name, category_id) VALUES (?, ?)',
+                                        (app_name, category[0])).lastrowid,)
+                    new_apps.append((row[0], app_name, category[0]))
+                app_id = row[0]
+                current = conn.execute('SELECT COALESCE(SUM(time_spent), 0) FROM screen_time_entries WHERE app_id = ? AND day = ?',
+                                       (app_id, day)).fetchone()[0]
+                if current == minutes:
+                    continue
+                conn.execute('DELETE FROM screen_time_entries WHERE app_id = ? AND day = ?', (app_id, day))
+                conn.execute('DELETE FROM session_entries WHERE app_id = ? AND day = ?', (app_id, day))
+                if minutes:
+                    conn.execute('INSERT INTO screen_time_entries (app_id, time_spent, day) VALUES (?, ?, ?)',
+                                 (app_id, minutes, day))
+                updated.append((app_id, minutes - current, day))
+
+            conn.executemany('INSERT OR REPLACE INTO sync_peers (peer_id, device_id, seq) VALUES (?, ?, ?)',
+                             [(message['device'], device, seq) for device, seq in message['vector'].items()])
+            resume(conn)
+
+    if db_path is None:
+        # In-memory views only follow the database of this process
+        for category_id, name in new_categories:
+            events.publish('category_added', category_id=category_id, name=name, color='#808080')
+        for app_id, name, category_id in new_apps:
+            events.publish('app_added', app_id=app_id, name=name, category_id=category_id)
+        for app_id, minutes, day in updated:
+            events.publish('record_added', app_id=app_id, time_spent=minutes, day=day)
+    return len(changes), len(updated)
+
+
+def peer_vector(peer_id, db_path=None):
+    """What a peer held when it last sent us a payload, empty if never"""
+    with closing(get_connection(db_path)) as conn:
+        ensure_schema(conn)
+        return dict(conn.execute('SELECT device_id, seq FROM sync_peers WHERE peer_id = ?', (peer_id,)))
+
+
+# Socket exchange: length-prefixed compressed JSON frames
+
+def send_frame(sock, data):
+    sock.sendall(struct.pack('>I', len(data)) + data)
+
+
+def recv_frame(sock):
+    header = _recv_exact(sock, 4)
+    return _recv_exact(sock, struct.unpack('>I', header)[0])
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            raise ConnectionError("Peer closed the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _hello(db_path):
+    with closing(get_connection(db_path)) as conn:
+        ensure_schema(conn)
+        return encode({'device': device_id(conn), 'vector': local_vector(conn)})
+
+
+def sync_with(host=SYNC_HOST, port=SYNC_PORT, db_path=None):
+    """
+    Two-way sync with a peer running serve(). Each side sends its version
+    vector first, so only the missing changes cross. Returns (bytes sent,
+    bytes received, changes received, totals rewritten).
+    """
+    with socket.create_connection((host, port)) as sock:
+        hello = _hello(db_path)
+        send_frame(sock, hello)
+        theirs = recv_frame(sock)
+        received, updated = apply_payload(theirs, db_path)
+        ours = build_payload(decode(theirs)['vector'], db_path)
+        send_frame(sock, ours)
+        return len(hello) + len(ours), len(theirs), received, updated
+
+
+def serve(host=SYNC_HOST, port=SYNC_PORT, db_path=None, once=False):
+    """Answer sync_with() calls, one peer at a time"""
+
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            hello = decode(recv_frame(self.request))
+            send_frame(self.request, build_payload(hello['vector'], db_path))
+            received, updated = apply_payload(recv_frame(self.request), db_path)
+            print(f"{hello['device']}: {received} changes received, {updated} totals updated")
+
+    socketserver.TCPServer.allow_reuse_address = True
+    with socketserver.TCPServer((host, port), Handler) as server:
+        if once:
+            server.handle_request()
+        else:
+            server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exchange changes with other screen time databases")
+    parser.add_argument('command', choices=['status', 'export', 'import', 'serve', 'connect'])
+    parser.add_argument('file', nargs='?', help="Payload file for export/import")
+    parser.add_argument('--db', help="Database (default: current profile)")
+    parser.add_argument('--peer', help="Export only what this peer device lacks")
+    parser.add_argument('--host', default=SYNC_HOST)
+    parser.add_argument('--port', type=int, default=SYNC_PORT)
+    args = parser.parse_args()
+    init_db(args.db)
+
+    if args.command == 'status':
+        with closing(get_connection(args.db)) as conn:
+            ensure_schema(conn)
+            print(f"device {device_id(conn)}")
+            for device, seq in local_vector(conn).items():
+                print(f"  {device}: {seq}")
+    elif args.command == 'export':
+        data = build_payload(peer_vector(args.peer, args.db) if args.peer else None, args.db)
+        with open(args.file, 'wb') as f:
+            f.write(data)
+        print(f"{len(data)} bytes written to {args.file}")
+    elif args.command == 'import':
+        with open(args.file, 'rb') as f:
+            received, updated = apply_payload(f.read(), args.db)
+        print(f"{received} changes received, {updated} totals updated")
+    elif args.command == 'serve':
+        serve(args.host, args.port, args.db)
+    else:
+        sent, got, received, updated = sync_with(args.host, args.port, args.db)
+        print(f"{sent} bytes sent, {got} bytes received, {received} changes, {updated} totals updated")
+
+
+if __name__ == "__main__":
+    main()
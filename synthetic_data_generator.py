@@ -1,23 +1,43 @@
-import sqlite3
 import pandas as pd
 import numpy as np
-from datetime import timedelta
+from database import attach_archives, get_connection as open_database, get_read_connection
+from imputation import usage_matrix, estimate, best_model, flat_model, weekday_model, ewma_model
+from utils import to_day, days_to_datetime64
 
 # --- CONFIGURATION ---
 DB_PATH = 'screen_time.db'    # <--- Make sure this matches your file
-WINDOW_DAYS = 7              # Look 1 week back and 1 week forward
+MODEL = 'auto'                # 'flat', 'weekday', 'ewma' or 'auto' (best in a backtest, see imputation.py)
+WINDOW_DAYS = 7              # Flat model: look 1 week back and 1 week forward
 NOISE_SCALE = 0.1             # 10% variance (+/- 10% of the average)
 MIN_USAGE_THRESHOLD = 10       # Apps with avg usage < 5 mins are ignored
+SNAPSHOT_DIR = None           # Set to e.g. 'snapshots' to read history from an exported snapshot
 
 def get_connection():
-    return sqlite3.connect(DB_PATH)
+    return open_database(DB_PATH)
+
+def load_snapshot_data():
+    """Loads history from a snapshot, mapping app names back to database ids."""
+    from snapshot import load_snapshot, snapshot_days
+    table = load_snapshot(SNAPSHOT_DIR)
+    app_ids = {name: app_id for app_id, name in load_app_mapping().items()}
+    apps = table.column('app').to_pandas()
+    df = pd.DataFrame({
+        'app_id': apps.map(app_ids).astype('Int64'),
+        'time_spent': table.column('minutes').to_numpy(),
+        'date': days_to_datetime64(snapshot_days(table)),
+    })
+    return df.dropna(subset=['app_id'])
 
 def load_data():
     """Loads existing data to know what to skip."""
-    conn = get_connection()
+    if SNAPSHOT_DIR:
+        return load_snapshot_data()
+    conn = get_read_connection(DB_PATH)  # Older files are migrated with python database.py --migrate
     try:
-        df = pd.read_sql("SELECT * FROM screen_time_records", conn)
-        df['date'] = pd.to_datetime(df['date'])
+        # Archived years count as recorded, so no synthetic rows are made for them
+        df = pd.read_sql(f"SELECT id, app_id, time_spent, day FROM {attach_archives(conn)}", conn)
+        # Day numbers map straight onto datetime64, no string parsing
+        df['date'] = days_to_datetime64(df.pop('day').to_numpy())
         return df
     finally:
         conn.close()
@@ -34,38 +54,23 @@ def load_app_mapping():
     finally:
         conn.close()
 
-def get_neighbor_dates(target_date, weeks=2):
-    """Calculates specific dates to look at (e.g., previous 2 Tuesdays)."""
-    neighbors = []
-    for i in range(1, weeks + 1):
-        neighbors.append(target_date - timedelta(weeks=i))
-        neighbors.append(target_date + timedelta(weeks=i))
-    return neighbors
-
-def generate_value_for_app(df, app_id, target_date):
+def estimate_usage(df, start_date, end_date):
     """
-    Calculates synthetic value using a continuous rolling window 
-    (e.g., all days from -14 to +14 days).
+    Model estimates per (day, app) over the scanned range, computed once
+    from the recorded history. Returns (matrix, estimates).
     """
-    # Define the date range
-    start_window = target_date - timedelta(days=WINDOW_DAYS)
-    end_window = target_date + timedelta(days=WINDOW_DAYS)
-    
-    # Filter: Match App ID AND fall within the date range
-    mask = (
-        (df['app_id'] == app_id) & 
-        (df['date'] >= start_window) & 
-        (df['date'] <= end_window)
-    )
-    neighbor_data = df.loc[mask, 'time_spent']
+    days = df['date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+    matrix = usage_matrix(df['app_id'].to_numpy(dtype=np.int64), days, df['time_spent'].to_numpy(),
+                          min(int(days.min()), to_day(start_date)), max(int(days.max()), to_day(end_date)))
+    models = {model.name: model for model in (flat_model(WINDOW_DAYS), weekday_model(), ewma_model())}
+    model = best_model(matrix, models) if MODEL == 'auto' else models[MODEL]
+    print(f"Imputation model: {model.name}")
+    return matrix, estimate(model, matrix.values, matrix.known)
 
-    # If no data in this window, return None
-    if neighbor_data.empty: return None
-    
-    avg_val = neighbor_data.mean()
-
-    # If the app is barely used in this period, skip it
-    if avg_val < MIN_USAGE_THRESHOLD: return None
+def generate_value(avg_val):
+    """Adds noise to a model estimate, None when the app is barely used"""
+    # No recorded days nearby, or the app is barely used in this period
+    if np.isnan(avg_val) or avg_val < MIN_USAGE_THRESHOLD: return None
 
     # Add Noise
     noise_magnitude = max(1, avg_val * NOISE_SCALE) 
@@ -76,15 +81,22 @@ def generate_value_for_app(df, app_id, target_date):
 
 def main():
     print(f"--- Processing {DB_PATH} ---")
-    df = load_data()
+    try:
+        df = load_data()
+    except (RuntimeError, FileNotFoundError) as e:
+        print(e)
+        return
     app_map = load_app_mapping()
     
     # Define the full year range to check
     start_date = pd.Timestamp("2025-01-01")
     end_date = pd.Timestamp("2025-12-31")
     all_days = pd.date_range(start_date, end_date)
+    if df.empty:
+        print("No recorded history to estimate from.")
+        return
+    matrix, estimates = estimate_usage(df, start_date, end_date)
     
-    unique_apps = df['app_id'].unique()
     conn = get_connection()
     cursor = conn.cursor()
 
@@ -105,11 +117,12 @@ def main():
             proposed_entries = []
             display_lines = []
 
-            for app_id in unique_apps:
-                val = generate_value_for_app(df, app_id, current_day)
+            row = estimates[to_day(current_day) - matrix.first_day]
+            for app_id, avg_val in zip(matrix.app_ids, row):
+                val = generate_value(avg_val)
                 
                 if val is not None and val > 0:
-                    proposed_entries.append((int(app_id), val, day_str))
+                    proposed_entries.append((int(app_id), val, to_day(current_day)))
                     app_name = app_map.get(app_id, f"App {app_id}")
                     display_lines.append(f"   - {app_name}: {val} m")
 
@@ -128,17 +141,12 @@ def main():
                 
                 if user_input == 'y':
                     cursor.executemany(
-                        "INSERT INTO screen_time_records (app_id, time_spent, date) VALUES (?, ?, ?)",
+                        "INSERT INTO screen_time_entries (app_id, time_spent, day) VALUES (?, ?, ?)",
                         proposed_entries
                     )
                     conn.commit()
                     print("   [SAVED]")
                     
-                    # Update memory so next days can use this new data
-                    new_rows = pd.DataFrame(proposed_entries, columns=['app_id', 'time_spent', 'date'])
-                    new_rows['date'] = pd.to_datetime(new_rows['date'])
-                    df = pd.concat([df, new_rows], ignore_index=True)
-                    
                 elif user_input == 'q':
                     break
                 else:
@@ -0,0 +1,66 @@
+import sqlite3
+from contextlib import closing
+import numpy as np
+import pytest
+import database
+import sessions
+from utils import to_day, to_minute
+
+
+def test_split_at_midnight():
+    start, end = to_minute('2025-03-01 23:30'), to_minute('2025-03-02 01:15')
+    source, days, minutes = sessions.split_intervals([start], [end], sessions.MINUTES_PER_DAY)
+    assert source.tolist() == [0, 0]
+    assert days.tolist() == [to_day('2025-03-01'), to_day('2025-03-02')]
+    assert minutes.tolist() == [30, 75]
+
+
+def test_split_over_several_hours():
+    start, end = to_minute('2025-03-01 10:20'), to_minute('2025-03-01 13:05')
+    _, hours, minutes = sessions.split_intervals([start], [end], sessions.MINUTES_PER_HOUR)
+    assert (hours % 24).tolist() == [10, 11, 12, 13]
+    assert minutes.tolist() == [40, 60, 60, 5]
+
+
+def test_split_many_intervals_at_once():
+    source, buckets, minutes = sessions.split_intervals([0, 50, 130], [60, 70, 180], 60)
+    assert list(zip(source.tolist(), buckets.tolist(), minutes.tolist())) == [
+        (0, 0, 60), (1, 0, 10), (1, 1, 10), (2, 2, 50)]
+
+
+def test_daily_totals_sum_per_app_and_day():
+    day = to_day('2025-03-01') * sessions.MINUTES_PER_DAY
+    apps = np.array([1, 1, 2])
+    starts = np.array([day + 600, day + 1400, day + 60])
+    ends = np.array([day + 660, day + 1500, day + 90])
+    app_ids, days, minutes = sessions.daily_totals(apps, starts, ends)
+    first = to_day('2025-03-01')
+    assert list(zip(app_ids.tolist(), (days - first).tolist(), minutes.tolist())) == [
+        (1, 0, 100), (1, 1, 60), (2, 0, 30)]
+
+
+@pytest.fixture
+def live_db(tmp_path, monkeypatch):
+    """The database module pointed at a fresh file, with one app"""
+    path = str(tmp_path / 'live.db')
+    monkeypatch.setattr(database, 'get_db_path', lambda: path)
+    database.init_db()
+    category_id = database.add_category('Work')
+    return path, database.add_app('Editor', category_id)
+
+
+def entry_totals(path):
+    with closing(sqlite3.connect(path)) as conn:
+        return dict(conn.execute('SELECT day, SUM(time_spent) FROM screen_time_entries GROUP BY day'))
+
+
+def test_record_session_derives_daily_totals(live_db):
+    path, app_id = live_db
+    sessions.record_session(app_id, '2025-03-01 23:30', '2025-03-02 01:15')
+    first = to_day('2025-03-01')
+    assert entry_totals(path) == {first: 30, first + 1: 75}
+
+    # A second session on the same day updates the derived entry in place
+    changes = sessions.record_session(app_id, '2025-03-02 09:00', '2025-03-02 10:00')
+    assert changes == [(app_id, 60, first + 1)]
+    assert entry_totals(path) == {first: 30, first + 1: 135}
@@ -0,0 +1,153 @@
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import closing
+import pytest
+import archive
+import database
+import sync
+from utils import to_day
+
+DAY = to_day('2025-03-01')
+FUTURE = 10**13                # A change clock value (ms) later than any real edit
+
+
+def make_db(path, entries=()):
+    """A database with one category, synced, holding (app, day, minutes) entries"""
+    path = str(path)
+    database.init_db(path)
+    with closing(database.get_connection(path)) as conn:
+        sync.ensure_schema(conn)
+    for app, day, minutes in entries:
+        add_entry(path, app, day, minutes)
+    return path
+
+
+def add_entry(path, app, day, minutes):
+    with closing(sqlite3.connect(path)) as conn, conn:
+        conn.execute("INSERT OR IGNORE INTO categories (name) VALUES ('Work')")
+        conn.execute("INSERT OR IGNORE INTO apps (name, category_id) SELECT ?, id FROM categories WHERE name = 'Work'",
+                     (app,))
+        conn.execute('INSERT INTO screen_time_entries (app_id, time_spent, day) SELECT id, ?, ? FROM apps WHERE name = ?',
+                     (minutes, day, app))
+
+
+def set_total(path, app, day, minutes):
+    with closing(sqlite3.connect(path)) as conn, conn:
+        conn.execute('UPDATE screen_time_entries SET time_spent = ? WHERE day = ? AND app_id = (SELECT id FROM apps WHERE name = ?)',
+                     (minutes, day, app))
+
+
+def set_clock(path, value):
+    """Move the change clock of a database, ms since 1970"""
+    with closing(sqlite3.connect(path)) as conn, conn:
+        conn.execute("UPDATE sync_meta SET value = ? WHERE key = 'clock'", (value,))
+
+
+def device(path):
+    with closing(sqlite3.connect(path)) as conn:
+        return sync.device_id(conn)
+
+
+def totals(path):
+    with closing(sqlite3.connect(path)) as conn:
+        return dict(((app, day), minutes) for app, day, minutes in conn.execute('''
+            SELECT a.name, se.day, SUM(se.time_spent) FROM screen_time_entries se
+            JOIN apps a ON a.id = se.app_id GROUP BY a.name, se.day
+        '''))
+
+
+def exchange(a, b):
+    """Both peers build their payload before either applies, as in a simultaneous sync"""
+    to_b, to_a = sync.build_payload(db_path=a), sync.build_payload(db_path=b)
+    sync.apply_payload(to_a, a)
+    sync.apply_payload(to_b, b)
+
+
+@pytest.fixture
+def peers(tmp_path):
+    a = make_db(tmp_path / 'a.db', [('Editor', DAY, 30)])
+    b = make_db(tmp_path / 'b.db', [('Browser', DAY + 1, 20)])
+    return a, b
+
+
+def test_file_exchange(peers):
+    a, b = peers
+    exchange(a, b)
+    assert totals(a) == totals(b) == {('Editor', DAY): 30, ('Browser', DAY + 1): 20}
+
+
+def test_socket_exchange(peers):
+    a, b = peers
+    with closing(socket.socket()) as probe:
+        probe.bind((sync.SYNC_HOST, 0))
+        port = probe.getsockname()[1]
+    server = threading.Thread(target=sync.serve, kwargs={'port': port, 'db_path': b, 'once': True})
+    server.start()
+    for _ in range(100):
+        try:
+            _, _, received, updated = sync.sync_with(port=port, db_path=a)
+            break
+        except ConnectionRefusedError:
+            time.sleep(0.05)
+    server.join(5)
+    assert (received, updated) == (1, 1)
+    assert totals(a) == totals(b) == {('Editor', DAY): 30, ('Browser', DAY + 1): 20}
+
+
+@pytest.mark.parametrize('order', ['a first', 'b first'])
+def test_later_edit_wins_in_either_sync_order(peers, order):
+    a, b = peers
+    exchange(a, b)
+    set_total(a, 'Editor', DAY, 45)
+    set_clock(b, FUTURE)  # b's edit is logged at FUTURE + 1, after a's
+    set_total(b, 'Editor', DAY, 50)
+    for source, target in [(a, b), (b, a)] if order == 'a first' else [(b, a), (a, b)]:
+        sync.apply_payload(sync.build_payload(db_path=source), target)
+    assert totals(a) == totals(b)
+    assert totals(a)[('Editor', DAY)] == 50
+
+
+def test_same_time_edit_goes_to_the_greater_device(peers):
+    a, b = peers
+    exchange(a, b)
+    set_clock(a, FUTURE)
+    set_clock(b, FUTURE)  # Both edits are logged at FUTURE + 1
+    set_total(a, 'Editor', DAY, 45)
+    set_total(b, 'Editor', DAY, 50)
+    exchange(a, b)
+    assert totals(a) == totals(b)
+    assert totals(a)[('Editor', DAY)] == (45 if device(a) > device(b) else 50)
+
+
+def test_delete_propagates(peers):
+    a, b = peers
+    exchange(a, b)
+    with closing(sqlite3.connect(a)) as conn, conn:
+        conn.execute('DELETE FROM screen_time_entries WHERE day = ?', (DAY,))
+    exchange(a, b)
+    assert totals(a) == totals(b) == {('Browser', DAY + 1): 20}
+
+
+def test_replaying_a_payload_is_a_no_op(peers):
+    a, b = peers
+    payload = sync.build_payload(db_path=a)
+    assert sync.apply_payload(payload, b) == (1, 1)
+    with closing(sqlite3.connect(b)) as conn:
+        logged = conn.execute('SELECT COUNT(*) FROM change_log').fetchone()[0]
+    assert sync.apply_payload(payload, b) == (1, 0)
+    with closing(sqlite3.connect(b)) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM change_log').fetchone()[0] == logged
+    assert totals(b) == {('Editor', DAY): 30, ('Browser', DAY + 1): 20}
+
+
+def test_archived_days_stay_out_of_the_live_table(peers):
+    a, b = peers
+    old_day = to_day('2024-06-01')
+    add_entry(a, 'Editor', old_day, 10)
+    archive.archive_year(2024, a)
+    add_entry(b, 'Editor', old_day, 15)
+    exchange(a, b)
+    assert ('Editor', old_day) not in totals(a)
+    assert archive.list_archives(a)[0][2:] == (1, 10)
@@ -0,0 +1,144 @@
+from bisect import bisect_left
+from collections import namedtuple
+
+# A change set: inserts/updates map key -> (values, tags), deletes is a set of keys
+ChangeSet = namedtuple('ChangeSet', ['inserts', 'updates', 'deletes'])
+
+
+class TreeviewSync:
+    """
+    Keyed view of a ttk.Treeview. Rows are identified by a key instead of
+    the Treeview item id, so callers can apply just the rows that changed
+    rather than deleting and re-inserting everything.
+    """
+
+    def __init__(self, tree, sort_key=None):
+        self.tree = tree
+        self.sort_key = sort_key or (lambda key, values: key)
+        self.items = {}       # key -> Treeview item id
+        self.item_keys = {}   # Treeview item id -> key
+        self.rows = {}        # key -> (values, tags)
+        self.order = []       # (sort value, key) in display order, for bisect
+        self.visible = None   # Keys shown by the current filter (None = all)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def keys(self):
+        """Row keys in display order"""
+        return [key for _, key in self.order]
+
+    def values(self, key):
+        return self.rows[key][0]
+
+    def key_for(self, item):
+        """Find the key of a Treeview item id"""
+        return self.item_keys.get(item)
+
+    def diff(self, rows):
+        """Build the change set that turns the current rows into the given ones"""
+        inserts, updates = {}, {}
+        for key, values, tags in rows:
+            row = (tuple(values), tuple(tags))
+            if key not in self.rows:
+                inserts[key] = row
+            elif self.rows[key] != row:
+                updates[key] = row
+        deletes = set(self.rows) - {key for key, _, _ in rows}
+        return ChangeSet(inserts, updates, deletes)
+
+    def apply(self, changes):
+        """Apply a change set, touching only the affected items"""
+        for key in changes.deletes:
+            self.delete(key)
+        for key, (values, tags) in changes.updates.items():
+            self.update(key, values, tags)
+        for key, (values, tags) in changes.inserts.items():
+            self.insert(key, values, tags)
+
+    def sync(self, rows):
+        """Diff the given (key, values, tags) rows against the tree and apply"""
+        self.apply(self.diff(rows))
+
+    def _is_visible(self, key):
+        return self.visible is None or key in self.visible
+
+    def _place(self, key, values):
+        """Insert key into the display order and return its position"""
+        entry = (self.sort_key(key, values), key)
+        pos = bisect_left(self.order, entry)
+        self.order.insert(pos, entry)
+        return pos
+
+    def _tree_index(self, pos):
+        """Treeview index of position pos, skipping filtered-out rows"""
+        if self.visible is None:
+            return pos
+        return sum(1 for _, key in self.order[:pos] if key in self.visible)
+
+    def insert(self, key, values, tags=()):
+        if key in self.items:
+            self.update(key, values, tags)
+            return
+        pos = self._place(key, values)
+        self.rows[key] = (tuple(values), tuple(tags))
+
+        item = self.tree.insert('', self._tree_index(pos), values=values, tags=tags)
+        if not self._is_visible(key):
+            self.tree.detach(item)
+        self.items[key] = item
+        self.item_keys[item] = key
+
+    def update(self, key, values, tags=()):
+        """Update a row in place, moving it only if its sort position changed"""
+        row = (tuple(values), tuple(tags))
+        if self.rows.get(key) == row:
+            return
+        pos = self._position(key)
+        self.rows[key] = row
+        item = self.items[key]
+        self.tree.item(item, values=values, tags=tags)
+
+        if self.order[pos][0] != self.sort_key(key, values):
+            del self.order[pos]
+            pos = self._place(key, values)
+            if self._is_visible(key):
+                self.tree.move(item, '', self._tree_index(pos))
+
+    def set(self, key, column, value):
+        """Update a single cell"""
+        values = list(self.rows[key][0])
+        values[list(self.tree['columns']).index(column)] = value
+        self.update(key, values, self.rows[key][1])
+
+    def delete(self, key):
+        del self.order[self._position(key)]
+        del self.rows[key]
+        item = self.items.pop(key)
+        del self.item_keys[item]
+        self.tree.delete(item)
+
+    def clear(self):
+        for key in list(self.items):
+            self.delete(key)
+
+    def _position(self, key):
+        """Current position of key, found from its stored values"""
+        return bisect_left(self.order, (self.sort_key(key, self.rows[key][0]), key))
+
+    def filter(self, keys=None):
+        """Show only the given keys (None shows all), keeping display order"""
+        previous = self.visible
+        self.visible = None if keys is None else set(keys)
+        position = 0
+        for _, key in self.order:
+            shown_before = previous is None or key in previous
+            if self._is_visible(key):
+                if not shown_before:
+                    self.tree.move(self.items[key], '', position)
+                position += 1
+            elif shown_before:
+                self.tree.detach(self.items[key])
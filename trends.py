@@ -0,0 +1,138 @@
+import math
+from collections import deque, namedtuple
+from database import fetch_screen_time_days
+
+# --- CONFIGURATION ---
+SHORT_WINDOW = 7             # Days in the short rolling mean and week-over-week delta
+LONG_WINDOW = 28             # Days in the long rolling mean and the outlier baseline
+OUTLIER_Z = 2.5              # |z-score| from which a day counts as an outlier
+MIN_BASELINE_DAYS = 7        # Days of history needed before z-scores are computed
+HISTORY = max(LONG_WINDOW, 2 * SHORT_WINDOW) + 1
+
+# One entry per calendar day, days without records have a total of 0
+DailyTrend = namedtuple('DailyTrend', ['day', 'total', 'mean_short', 'mean_long',
+                                       'week_delta', 'zscore', 'outlier'])
+
+# Consecutive days with usage; current when last is the last day seen
+Streak = namedtuple('Streak', ['start', 'last', 'longest'])
+
+Trends = namedtuple('Trends', ['daily', 'streaks'])
+
+
+class TrendTracker:
+    """
+    Rolling statistics over daily totals, fed one day at a time in order.
+    Window sums (and the sum of squares for the z-score) are updated by
+    adding the new day and subtracting the one leaving the window.
+    """
+
+    def __init__(self):
+        self.history = deque(maxlen=HISTORY)
+        self.sum_short = 0           # Last SHORT_WINDOW days
+        self.sum_previous = 0        # The SHORT_WINDOW days before those
+        self.sum_long = 0
+        self.sumsq_long = 0
+        self.streaks = {}            # app -> Streak
+        self.last_day = None
+
+    def zscore(self, total):
+        """z-score of a total against the days before it"""
+        count = min(len(self.history), LONG_WINDOW)
+        if count < MIN_BASELINE_DAYS:
+            return 0.0
+        mean = self.sum_long / count
+        std = math.sqrt(max(self.sumsq_long / count - mean * mean, 0))
+        return (total - mean) / std if std > 0 else 0.0
+
+    def push(self, day, total, apps=()):
+        """Add the next day and return its DailyTrend"""
+        zscore = self.zscore(total)
+
+        history = self.history
+        history.append(total)
+        size = len(history)
+        self.sum_short += total
+        if size > SHORT_WINDOW:
+            leaving = history[-SHORT_WINDOW - 1]
+            self.sum_short -= leaving
+            self.sum_previous += leaving
+            if size > 2 * SHORT_WINDOW:
+                self.sum_previous -= history[-2 * SHORT_WINDOW - 1]
+        self.sum_long += total
+        self.sumsq_long += total * total
+        if size > LONG_WINDOW:
+            leaving = history[-LONG_WINDOW - 1]
+            self.sum_long -= leaving
+            self.sumsq_long -= leaving * leaving
+
+        for app in apps:
+            streak = self.streaks.get(app)
+            if streak is not None and streak.last == day - 1:
+                start = streak.start
+                longest = max(streak.longest, day - start + 1)
+            else:
+                start = day
+                longest = max(streak.longest if streak else 0, 1)
+            self.streaks[app] = Streak(start, day, longest)
+        self.last_day = day
+
+        return DailyTrend(
+            day, total,
+            self.sum_short / min(size, SHORT_WINDOW),
+            self.sum_long / min(size, LONG_WINDOW),
+            self.sum_short - self.sum_previous if size >= 2 * SHORT_WINDOW else None,
+            zscore,
+            abs(zscore) >= OUTLIER_Z
+        )
+
+
+def compute_trends(records):
+    """
+    Trends from (app, category, minutes, day) records sorted by day, in a
+    single pass. Missing days are filled with zero totals.
+    """
+    tracker = TrendTracker()
+    daily = []
+    day = None
+    total = 0
+    apps = set()
+    for app, _, minutes, record_day in records:
+        if record_day != day:
+            if day is not None:
+                daily.append(tracker.push(day, total, apps))
+                for gap in range(day + 1, record_day):
+                    daily.append(tracker.push(gap, 0))
+            day, total, apps = record_day, 0, set()
+        total += minutes
+        apps.add(app)
+    if day is not None:
+        daily.append(tracker.push(day, total, apps))
+    return Trends(daily, tracker.streaks)
+
+
+def fetch_trends(start_day=None, end_day=None):
+    """Trends straight from the database"""
+    return compute_trends(fetch_screen_time_days(start_day, end_day, ordered=True))
+
+
+def trend_for(trends, day):
+    """DailyTrend of a day, None outside the covered range"""
+    if not trends.daily:
+        return None
+    index = int(day) - trends.daily[0].day
+    return trends.daily[index] if 0 <= index < len(trends.daily) else None
+
+
+def current_streaks(trends, limit=None):
+    """Streaks still running on the last day, longest first"""
+    if not trends.daily:
+        return []
+    last_day = trends.daily[-1].day
+    running = [(app, streak.last - streak.start + 1) for app, streak in trends.streaks.items()
+               if streak.last == last_day]
+    running.sort(key=lambda item: (-item[1], item[0]))
+    return running[:limit]
+
+
+def outliers(trends):
+    return [trend for trend in trends.daily if trend.outlier]
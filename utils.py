@@ -1,4 +1,8 @@
-from datetime import datetime
+from datetime import datetime, date, time
+import numpy as np
+
+# Dates are stored as day numbers: days since 1970-01-01, the same unit numpy's datetime64[D] uses
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
 
 def format_date_for_display(date_str):
     """Convert YYYY-MM-DD to DD/MM/YYYY"""
@@ -25,4 +29,33 @@ def format_time_display(minutes):
     remaining_mins = minutes % 60
     if remaining_mins == 0:
         return f"{hours} h"
-    return f"{hours} h {remaining_mins} min" 
\ No newline at end of file
+    return f"{hours} h {remaining_mins} min"
+
+def to_day(value):
+    """Convert a YYYY-MM-DD string, date or datetime to a day number"""
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    return value.toordinal() - EPOCH_ORDINAL
+
+def from_day(day):
+    """Convert a day number back to a date"""
+    return date.fromordinal(int(day) + EPOCH_ORDINAL)
+
+def day_weekday(day):
+    """Weekday of a day number, Monday is 0 (1970-01-01 was a Thursday)"""
+    return (day + 3) % 7
+
+def days_to_datetime64(days):
+    """Build a datetime64 array from day numbers without any string parsing"""
+    return np.asarray(days, dtype='int64').astype('datetime64[D]')
+
+def to_minute(value):
+    """Convert a datetime or YYYY-MM-DD HH:MM string to minutes since 1970-01-01 00:00"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return to_day(value) * 1440 + value.hour * 60 + value.minute
+
+def from_minute(minute):
+    """Convert minutes since 1970-01-01 00:00 back to a datetime"""
+    day, minute = divmod(int(minute), 1440)
+    return datetime.combine(from_day(day), time(minute // 60, minute % 60))
@@ -3,11 +3,19 @@ from tkinter import ttk
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import pandas as pd
 import matplotlib.pyplot as plt
-from utils import format_date_for_display
+from utils import format_date_for_display, days_to_datetime64, to_day, from_day
 from datetime import datetime, timedelta
 from tkcalendar import DateEntry
 import calendar
-from database import fetch_categories
+from collections import namedtuple
+from database import EntryColumns
+from metadata import get_registry
+from aggregates import AggregateCache, frame_from_columns, get_date_range, rank_page
+import numpy as np
+import trends
+import events
+from heatmap import DayTotals, WEEKS
+import instrumentation
 
 # Constants for visualization
 INITIAL_ITEMS_SHOWN = 5      # Number of items shown initially in lists
@@ -25,6 +33,10 @@ NORMAL_FONT = ("Arial", 10)
 DATE_FORMAT = "dd/mm/yyyy"   # Format for date picker
 TIME_SPANS = ["Day", "Week", "Month", "Year"]
 PIE_CHART_THRESHOLD = 2.5    # Percentage threshold for grouping small values in pie chart
+HEATMAP_SIZE = (9, 1.6)      # Size of the calendar heatmap figure
+HEATMAP_CMAP = 'Greens'      # Colormap of the calendar heatmap
+WEEKDAY_LABELS = ["Mon", "", "Wed", "", "Fri", "", "Sun"]
+TRENDS_SHOWN = 3             # Outlier days and streaks listed in the trends panel
 
 def format_time(minutes):
     """
@@ -63,28 +75,39 @@ def format_time(minutes):
     # Return the formatted string with appropriate units
     return " ".join(parts)
 
-def format_autopct(value, total_minutes):
-    """Format the value inside pie chart to show both percentage and time"""
-    minutes = int(total_minutes * value / 100)
-    return f'{format_time(minutes)}\n({value:.1f}%)'
-
-def get_date_range(date, span):
-    """Get start and end dates for the selected time span"""
-    if span == "Day":
-        return date, date
-    elif span == "Week":
-        start = date - timedelta(days=date.weekday())
-        end = start + timedelta(days=6)
-    elif span == "Month":
-        start = date.replace(day=1)
-        if date.month == 12:
-            end = date.replace(year=date.year + 1, month=1, day=1) - timedelta(days=1)
-        else:
-            end = date.replace(month=date.month + 1, day=1) - timedelta(days=1)
-    else:  # Year
-        start = date.replace(month=1, day=1)
-        end = date.replace(month=12, day=31)
-    return start, end
+# Everything needed to redraw a pie without re-aggregating, with both label texts precomputed
+PieData = namedtuple('PieData', ['labels', 'values', 'colors', 'explode', 'minutes_texts', 'percent_texts'])
+
+def pie_label_texts(pct, total_minutes):
+    """Minutes and percentage label of a wedge"""
+    # Round the percentage first to avoid floating point errors
+    pct = round(pct, 1)
+    # Calculate minutes and round to nearest integer
+    minutes = int(round((total_minutes * pct) / 100))
+    return format_time(minutes), f'{pct:.1f}%'
+
+def build_pie_data(series, colors=None, explode=None):
+    """Precompute a pie's values and label texts from a summary Series"""
+    total = series.sum()
+    texts = [pie_label_texts(100 * value / total if total else 0, total) for value in series.values]
+    return PieData(list(series.index), series.values, colors, explode,
+                   [minutes for minutes, _ in texts], [percent for _, percent in texts])
+
+def draw_pie(ax, data, title, show_percentage=False, shadow=False):
+    """
+    Draw a pie from PieData and return its value labels as
+    (text artist, minutes text, percent text). The labels are animated so
+    they can be redrawn on their own without a full figure draw.
+    """
+    _, _, autotexts = ax.pie(data.values, labels=data.labels, colors=data.colors,
+                             explode=data.explode, shadow=shadow, autopct=lambda pct: '')
+    ax.set_title(title)
+    ax.set_ylabel('')
+    labels = list(zip(autotexts, data.minutes_texts, data.percent_texts))
+    for text, minutes, percent in labels:
+        text.set_text(percent if show_percentage else minutes)
+        text.set_animated(True)
+    return labels
 
 def format_date_range(start_date, end_date, span):
     """Format date range for display"""
@@ -140,7 +163,12 @@ def create_scrollable_frame(parent):
 
     return scrollable_frame
 
-def display_visualization(data):
+def display_visualization(data, category_colors=None):
+    """
+    Open the analysis window. data is a list of (app, category, minutes,
+    date) rows, an EntryColumns, or an already typed DataFrame (e.g. from
+    a snapshot). category_colors skips the database lookup when given.
+    """
     class Visualizer:
         def __init__(self):
             self.show_percentage = False
@@ -149,76 +177,126 @@ def display_visualization(data):
 
         def toggle_display_mode(self):
             self.show_percentage = not self.show_percentage
-            update_visualization()
-
-        def format_value(self, value, total_minutes):
-            # Round the percentage first to avoid floating point errors
-            value = round(value, 1)
-            # Calculate minutes and round to nearest integer
-            minutes = round((total_minutes * value) / 100)
-            
-            if self.show_percentage:
-                return f'{value:.1f}%'
-            else:
-                return format_time(minutes)
+            # Only the label text changes, no re-aggregation or layout
+            refresh_pie_labels()
 
     viz = Visualizer()
+    colors_source = category_colors
+    pie_cache = {}            # (start, end, selected category) -> (apps PieData, categories PieData)
+    pie_labels = []           # (text artist, minutes text, percent text) of both pies
+    label_background = [None] # Figure pixels without the pie labels, for blitting
     categories_summary = None  # Initialize at module level
 
     # Create DataFrame
-    df = pd.DataFrame(data, columns=["App Name", "Category Name", "Time Spent", "Date"])
-    df["Date"] = pd.to_datetime(df["Date"])
+    if isinstance(data, pd.DataFrame):
+        df = data
+    elif isinstance(data, EntryColumns):
+        df = frame_from_columns(data)
+    else:
+        df = pd.DataFrame(data, columns=["App Name", "Category Name", "Time Spent", "Date"])
+    if pd.api.types.is_datetime64_any_dtype(df["Date"]):
+        pass
+    elif pd.api.types.is_integer_dtype(df["Date"]):
+        # Day numbers convert straight to datetime64 without string parsing
+        df["Date"] = days_to_datetime64(df["Date"].to_numpy())
+    else:
+        df["Date"] = pd.to_datetime(df["Date"])
+    aggregates = AggregateCache(df)
+    trends_cache = [None]  # Computed on first use, covers the whole DataFrame
+    day_totals = DayTotals.from_columns(df["Category Name"].to_numpy(), df["Time Spent"].to_numpy(),
+                                        df["Date"].to_numpy().astype('datetime64[D]').astype(np.int64))
+    heatmap_year = [None]
+    heatmap_grids = {}  # (year, category) -> grid, cleared when a record is added
     current_date = [df["Date"].max()]  # Use list to make it mutable
     time_spans = ["Day", "Week", "Month", "Year"]
     current_span = ["Day"]  # Use list to make it mutable
 
-    def create_expandable_list(parent, items, title, total_time, filtered_df):
+    def create_expandable_list(parent, items, title, period_total):
+        """Ranked list showing a page of items, "Show More" appends the next page"""
         frame = ttk.LabelFrame(parent, text=title, padding=10)
         items_frame = ttk.Frame(frame)
         items_frame.pack(fill=tk.X, expand=True)
-        
-        shown_items = [INITIAL_ITEMS_SHOWN]
-        
-        def show_items():
-            # Clear current items
-            for widget in items_frame.winfo_children():
-                widget.destroy()
-            
-            # Calculate the total time for percentage calculation
-            start_date, end_date = get_date_range(current_date[0], current_span[0])
-            period_df = df[(df["Date"] >= start_date) & (df["Date"] <= end_date)]
-            total_for_percentage = period_df["Time Spent"].sum()
-            
-            # Show items up to current limit
-            for item, time in list(items.items())[:shown_items[0]]:
-                percentage = (time / total_for_percentage) * 100 if total_for_percentage > 0 else 0
-                ttk.Label(items_frame, 
-                         text=f"{item}: {format_time(time)} ({percentage:.1f}%)", 
-                         font=NORMAL_FONT).pack(anchor="w")
-            
+        buttons_frame = ttk.Frame(frame)
+        buttons_frame.pack(pady=5)
+
+        labels = []
+        remaining = [0]
+
+        def append_items(count):
+            page = rank_page(items, len(labels), count)
+            for item, time in page.items:
+                percentage = (time / period_total) * 100 if period_total > 0 else 0
+                label = ttk.Label(items_frame,
+                                  text=f"{item}: {format_time(time)} ({percentage:.1f}%)",
+                                  font=NORMAL_FONT)
+                label.pack(anchor="w")
+                labels.append(label)
+            remaining[0] = page.remaining
+            update_buttons()
+
+        def show_more():
+            append_items(ITEMS_PER_EXPANSION)
+
+        def show_less():
+            for label in labels[INITIAL_ITEMS_SHOWN:]:
+                label.destroy()
+            remaining[0] += len(labels) - INITIAL_ITEMS_SHOWN
+            del labels[INITIAL_ITEMS_SHOWN:]
+            update_buttons()
+
+        more_button = ttk.Button(buttons_frame, command=show_more)
+        less_button = ttk.Button(buttons_frame, text="Show Less", command=show_less)
+
+        def update_buttons():
             # Show buttons based on current state
-            buttons_frame = ttk.Frame(items_frame)
-            buttons_frame.pack(pady=5)
-            
-            if shown_items[0] < len(items):
-                def show_more():
-                    shown_items[0] += ITEMS_PER_EXPANSION
-                    show_items()
-                
-                remaining = len(items) - shown_items[0]
-                ttk.Button(buttons_frame, 
-                          text=f"Show More ({remaining} remaining)", 
-                          command=show_more).pack(side='left', padx=2)
-            
-            if shown_items[0] > INITIAL_ITEMS_SHOWN:
-                def show_less():
-                    shown_items[0] = INITIAL_ITEMS_SHOWN
-                    show_items()
-                
-                ttk.Button(buttons_frame, text="Show Less", 
-                          command=show_less).pack(side='left', padx=2)
-        
-        show_items()
+            if remaining[0] > 0:
+                more_button.config(text=f"Show More ({remaining[0]} remaining)")
+                more_button.grid(row=0, column=0, padx=2)
+            else:
+                more_button.grid_remove()
+            if len(labels) > INITIAL_ITEMS_SHOWN:
+                less_button.grid(row=0, column=1, padx=2)
+            else:
+                less_button.grid_remove()
+
+        append_items(INITIAL_ITEMS_SHOWN)
+        return frame
+
+    def get_trends():
+        if trends_cache[0] is None:
+            days = df["Date"].to_numpy().astype('datetime64[D]').astype(np.int64)
+            order = np.argsort(days, kind='stable')
+            records = zip(df["App Name"].to_numpy()[order], df["Category Name"].to_numpy()[order],
+                          df["Time Spent"].to_numpy()[order].tolist(), days[order].tolist())
+            trends_cache[0] = trends.compute_trends(records)
+        return trends_cache[0]
+
+    def create_trends_panel(parent, start_date, end_date):
+        """Rolling averages at the end of the period, its outlier days and running streaks"""
+        frame = ttk.LabelFrame(parent, text="Trends", padding=10)
+        data = get_trends()
+        first_day, last_day = to_day(start_date), to_day(end_date)
+        trend = trends.trend_for(data, min(last_day, data.daily[-1].day) if data.daily else last_day)
+
+        lines = []
+        if trend is not None:
+            lines.append(f"{trends.SHORT_WINDOW}-day average: {format_time(round(trend.mean_short))}    "
+                         f"{trends.LONG_WINDOW}-day average: {format_time(round(trend.mean_long))}")
+            if trend.week_delta is not None:
+                sign = "+" if trend.week_delta >= 0 else "-"
+                lines.append(f"Week over week: {sign}{format_time(abs(trend.week_delta))}")
+        unusual = [t for t in trends.outliers(data) if first_day <= t.day <= last_day]
+        if unusual:
+            days = ", ".join(f"{format_date_for_display(from_day(t.day))} "
+                             f"({format_time(t.total)})" for t in unusual[:TRENDS_SHOWN])
+            lines.append(f"Unusual days: {days}" + (f" and {len(unusual) - TRENDS_SHOWN} more"
+                                                    if len(unusual) > TRENDS_SHOWN else ""))
+        streaks = trends.current_streaks(data, TRENDS_SHOWN)
+        if streaks:
+            lines.append("Streaks: " + ", ".join(f"{app} ({days} days)" for app, days in streaks))
+
+        for line in lines or ["No data"]:
+            ttk.Label(frame, text=line, font=NORMAL_FONT).pack(anchor="w")
         return frame
 
     def on_category_click(event):
@@ -237,107 +315,173 @@ def display_visualization(data):
                     update_visualization()
                     break
 
+    @instrumentation.traced('visualizer.update_visualization', 'render')
     def update_visualization():
         nonlocal categories_summary
-        start_date, end_date = get_date_range(current_date[0], current_span[0])
-        filtered_df = df[(df["Date"] >= start_date) & (df["Date"] <= end_date)]
-        filtered_df = filtered_df.copy()  # Create a copy to avoid SettingWithCopyWarning
-        filtered_df["Time Spent"] = filtered_df["Time Spent"].astype(int)  # Force integer values
-
-        # Clear previous data
-        for widget in summary_frame.winfo_children():
-            widget.destroy()
-
-        # Calculate full categories summary first
-        categories_summary = filtered_df.groupby("Category Name")["Time Spent"].sum().astype(int)
-        categories_summary = categories_summary.sort_values(ascending=False)
-        
-        # Filter apps by selected category if one is selected
-        if viz.selected_category:
-            filtered_df = filtered_df[filtered_df["Category Name"] == viz.selected_category]
-            apps_summary = filtered_df.groupby("App Name")["Time Spent"].sum().astype(int)
-            apps_summary = apps_summary.sort_values(ascending=False)
-            total_time = filtered_df["Time Spent"].sum()
-        else:
-            apps_summary = filtered_df.groupby("App Name")["Time Spent"].sum().astype(int)
-            apps_summary = apps_summary.sort_values(ascending=False)
-            total_time = filtered_df["Time Spent"].sum()
-
-        # Group small app percentages into "Other" (only for pie chart)
-        total_apps_time = apps_summary.sum()
-        main_apps = apps_summary[apps_summary/total_apps_time * 100 >= PIE_CHART_THRESHOLD]
-        other_time = apps_summary[apps_summary/total_apps_time * 100 < PIE_CHART_THRESHOLD].sum()
+        with instrumentation.span('visualizer.aggregate', 'pandas') as timing:
+            start_date, end_date = get_date_range(current_date[0], current_span[0])
+
+            # Summaries come from the cache when the period was already shown
+            summary = aggregates.get(start_date, end_date, viz.selected_category)
+            categories_summary = summary.categories
+            apps_summary = summary.apps
+            total_time = summary.total
+
+            # Group small app percentages into "Other" (only for pie chart)
+            total_apps_time = apps_summary.sum()
+            main_apps = apps_summary[apps_summary/total_apps_time * 100 >= PIE_CHART_THRESHOLD]
+            other_time = apps_summary[apps_summary/total_apps_time * 100 < PIE_CHART_THRESHOLD].sum()
         
-        if other_time > 0:
-            main_apps_pie = main_apps.copy()
-            main_apps_pie['Other'] = other_time
-        else:
-            main_apps_pie = main_apps
-
-        # Create summary frames
-        date_text = f"Period: {format_date_range(start_date, end_date, current_span[0])}"
-        if viz.selected_category:
-            date_text += f" (Filtered by: {viz.selected_category})"
-        date_label = ttk.Label(summary_frame, text=date_text, font=TITLE_FONT)
-        date_label.pack(pady=5)
+            if other_time > 0:
+                main_apps_pie = main_apps.copy()
+                main_apps_pie['Other'] = other_time
+            else:
+                main_apps_pie = main_apps
+            timing['rows'] = summary.rows
+
+        with instrumentation.span('visualizer.widgets', 'tk'):
+            # Clear previous data
+            for widget in summary_frame.winfo_children():
+                widget.destroy()
+
+            # Create summary frames
+            date_text = f"Period: {format_date_range(start_date, end_date, current_span[0])}"
+            if viz.selected_category:
+                date_text += f" (Filtered by: {viz.selected_category})"
+            date_label = ttk.Label(summary_frame, text=date_text, font=TITLE_FONT)
+            date_label.pack(pady=5)
         
-        total_label = ttk.Label(summary_frame, 
-                               text=f"Total Screen Time: {format_time(total_time)}", 
-                               font=SUBTITLE_FONT)
-        total_label.pack(pady=5)
-
-        # Create two columns for apps and categories summaries
-        columns_frame = ttk.Frame(summary_frame)
-        columns_frame.pack(fill=tk.X, expand=True, padx=10, anchor="n")
-
-        # Apps summary (left column)
-        apps_frame = create_expandable_list(columns_frame, apps_summary, "Top Apps", total_time, filtered_df)
-        apps_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, anchor="n")
-
-        # Categories summary (right column)
-        categories_frame = create_expandable_list(columns_frame, categories_summary, "Top Categories", total_time, filtered_df)
-        categories_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=5, anchor="n")
-
-        # Update the plots
-        for ax in axs:
-            ax.clear()
-
-        # Apps pie chart with grouped small percentages
-        main_apps_pie.plot(
-            kind='pie',
-            ax=axs[0],
-            autopct=lambda pct: viz.format_value(pct, main_apps_pie.sum()),
-            title='Time by App',
-            ylabel=''
-        )
-
-        # Get category colors
-        categories = fetch_categories()
-        category_colors = {name: color for name, color in categories}
-
-        # Create explode array for pie chart - make selected category stand out
-        explode = [0.1 if cat == viz.selected_category else 0 for cat in categories_summary.index]
-
-        # Categories pie chart with colors and explode effect
-        if len(categories_summary) > 0:  # Only plot if we have data
+            total_label = ttk.Label(summary_frame, 
+                                   text=f"Total Screen Time: {format_time(total_time)}", 
+                                   font=SUBTITLE_FONT)
+            total_label.pack(pady=5)
+
+            # Create two columns for apps and categories summaries
+            columns_frame = ttk.Frame(summary_frame)
+            columns_frame.pack(fill=tk.X, expand=True, padx=10, anchor="n")
+
+            # Apps summary (left column)
+            apps_frame = create_expandable_list(columns_frame, apps_summary, "Top Apps", summary.period_total)
+            apps_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, anchor="n")
+
+            # Categories summary (right column)
+            categories_frame = create_expandable_list(columns_frame, categories_summary, "Top Categories", summary.period_total)
+            categories_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=5, anchor="n")
+
+            # Trends across periods (below the columns)
+            trends_frame = create_trends_panel(summary_frame, start_date, end_date)
+            trends_frame.pack(fill=tk.X, padx=15, pady=5)
+
+        with instrumentation.span('visualizer.plot', 'matplotlib'):
+            # Update the plots
+            for ax in axs:
+                ax.clear()
+
+            apps_pie, categories_pie = pie_geometry(start_date, end_date, main_apps_pie, categories_summary)
+
+            # Apps pie chart with grouped small percentages
+            pie_labels[:] = draw_pie(axs[0], apps_pie, 'Time by App', viz.show_percentage)
+
+            # Categories pie chart with colors and explode effect
+            if categories_pie is not None:  # Only plot if we have data
+                pie_labels.extend(draw_pie(axs[1], categories_pie, 'Time by Category',
+                                           viz.show_percentage, shadow=bool(viz.selected_category)))
+
+            # Create bar chart - pass the full df instead of filtered_df
+            create_history_chart(df, current_date[0], current_span[0], axs[2])
+
+            plt.tight_layout()
+            canvas.draw()
+
+            heatmap_year[0] = current_date[0].year
+            refresh_heatmap()
+
+    def pie_geometry(start_date, end_date, main_apps_pie, categories_summary):
+        """Pie data for the period, cached so revisiting a period skips the rebuild"""
+        key = (start_date, end_date, viz.selected_category)
+        if key not in pie_cache:
+            # Get category colors
+            category_colors = colors_source or get_registry().category_colors
+
+            # Create explode array for pie chart - make selected category stand out
+            explode = [0.1 if cat == viz.selected_category else 0 for cat in categories_summary.index]
             colors = [category_colors.get(cat, '#808080') for cat in categories_summary.index]
-            if colors:  # Only plot if we have colors
-                categories_summary.plot(
-                    kind='pie',
-                    ax=axs[1],
-                    autopct=lambda pct: viz.format_value(pct, categories_summary.sum()),
-                    title='Time by Category',
-                    ylabel='',
-                    colors=colors,
-                    explode=explode,
-                    shadow=bool(viz.selected_category)
-                )
-
-        # Create bar chart - pass the full df instead of filtered_df
-        create_history_chart(df, current_date[0], current_span[0], axs[2])
-
-        plt.tight_layout()
-        canvas.draw()
+
+            categories_pie = build_pie_data(categories_summary, colors, explode) if colors else None
+            pie_cache[key] = (build_pie_data(main_apps_pie), categories_pie)
+        return pie_cache[key]
+
+    def on_draw(event):
+        # A full draw skips the animated labels: keep the background, then draw them on top
+        label_background[0] = canvas.copy_from_bbox(fig.bbox)
+        for text, _, _ in pie_labels:
+            fig.draw_artist(text)
+
+    def refresh_pie_labels():
+        """Swap the pie label texts in place and blit them over the cached background"""
+        with instrumentation.span('visualizer.toggle_labels', 'matplotlib'):
+            for text, minutes, percent in pie_labels:
+                text.set_text(percent if viz.show_percentage else minutes)
+            if label_background[0] is None:
+                canvas.draw()  # No background yet, on_draw draws the labels
+                return
+            canvas.restore_region(label_background[0])
+            for text, _, _ in pie_labels:
+                fig.draw_artist(text)
+            canvas.blit(fig.bbox)
+
+    def refresh_heatmap():
+        """Show heatmap_year, only the image data and ticks change"""
+        year, category = heatmap_year[0], viz.selected_category
+        grid = heatmap_grids.get((year, category))
+        if grid is None:
+            grid = heatmap_grids[(year, category)] = day_totals.year_grid(year, category)
+        heat_image.set_data(grid)
+        heat_image.set_clim(0, max(np.nanmax(grid), 1))
+
+        # Month labels at the week column of each month's first day
+        first_weekday = datetime(year, 1, 1).weekday()
+        heat_ax.set_xticks([(datetime(year, month, 1).timetuple().tm_yday - 1 + first_weekday) // 7
+                            for month in range(1, 13)], list(calendar.month_abbr)[1:])
+        heat_ax.set_title(f"{year}" + (f" - {category}" if category else ""), fontsize=9)
+        heat_canvas.draw_idle()
+
+    def scroll_heatmap(step):
+        years = day_totals.years()
+        if years and years[0] <= heatmap_year[0] + step <= years[-1]:
+            heatmap_year[0] += step
+            refresh_heatmap()
+
+    def on_heatmap_scroll(event):
+        scroll_heatmap(1 if event.button == 'up' else -1)
+
+    def on_heatmap_click(event):
+        if event.inaxes != heat_ax or event.xdata is None:
+            return
+        day = day_totals.day_at(heatmap_year[0], int(round(event.ydata)), int(round(event.xdata)))
+        if day is not None:
+            # Click through to the day view
+            clicked = from_day(day)
+            current_date[0] = datetime(clicked.year, clicked.month, clicked.day)
+            current_span[0] = "Day"
+            span_combobox.set("Day")
+            update_date_picker()
+            update_visualization()
+
+    def on_record_added(app_id, time_spent, day):
+        targets = get_registry().app_targets(app_id)
+        if targets is None:  # An app the registry has not seen, as in LimitTracker.record
+            return
+        day_totals.add(day, targets[1], time_spent)
+        heatmap_grids.clear()
+        if from_day(day).year == heatmap_year[0]:
+            refresh_heatmap()
+
+    def on_category_color_changed(name, color):
+        # Pie colors are baked into the cached pie data
+        if not colors_source:
+            pie_cache.clear()
+            update_visualization()
 
     def change_time_span(event):
         current_span[0] = span_combobox.get()
@@ -375,6 +519,7 @@ def display_visualization(data):
         update_date_picker()
         update_visualization()
 
+    @instrumentation.traced('visualizer.create_history_chart', 'render')
     def create_history_chart(df, start_date, span, ax):
         """Create a minimal bar chart showing total screen time for the last HISTORY_PERIODS"""
         dates = []
@@ -610,6 +755,30 @@ def display_visualization(data):
     canvas_widget = canvas.get_tk_widget()
     canvas_widget.pack(fill=tk.BOTH, expand=True, padx=10)  # Added padding
 
+    # Calendar heatmap below the charts: a single image artist, one cell per day
+    heatmap_frame = ttk.Frame(main_container, padding=10)
+    heatmap_frame.pack(fill=tk.X)
+    heatmap_nav = ttk.Frame(heatmap_frame)
+    heatmap_nav.pack(fill=tk.X)
+    ttk.Button(heatmap_nav, text="◀", width=3, command=lambda: scroll_heatmap(-1)).pack(side=tk.LEFT, padx=10)
+    ttk.Button(heatmap_nav, text="▶", width=3, command=lambda: scroll_heatmap(1)).pack(side=tk.RIGHT, padx=10)
+
+    heat_fig = plt.figure(figsize=HEATMAP_SIZE)
+    heat_ax = heat_fig.add_subplot(111)
+    heat_image = heat_ax.imshow(np.full((7, WEEKS), np.nan), cmap=HEATMAP_CMAP,
+                                aspect='equal', interpolation='nearest')
+    heat_ax.set_yticks(range(7), WEEKDAY_LABELS, fontsize=7)
+    heat_ax.tick_params(axis='x', labelsize=7, length=0)
+    heat_ax.tick_params(axis='y', length=0)
+    for spine in heat_ax.spines.values():
+        spine.set_visible(False)
+    heat_canvas = FigureCanvasTkAgg(heat_fig, master=heatmap_frame)
+    heat_canvas.get_tk_widget().pack(fill=tk.X, padx=10)
+    heat_fig.canvas.mpl_connect('button_press_event', on_heatmap_click)
+    heat_fig.canvas.mpl_connect('scroll_event', on_heatmap_scroll)
+    events.subscribe('record_added', on_record_added)
+    events.subscribe('category_color_changed', on_category_color_changed)
+
     # Add checkbox to nav_frame
     display_checkbox = ttk.Checkbutton(
         nav_frame, 
@@ -622,6 +791,18 @@ def display_visualization(data):
 
     # Connect the click handler once, outside of update_visualization
     fig.canvas.mpl_connect('button_press_event', on_category_click)
+    fig.canvas.mpl_connect('draw_event', on_draw)
+
+    def on_destroy(event):
+        if event.widget is window:
+            aggregates.close()  # Frees the shared memory and worker pool, if any
+            events.unsubscribe('record_added', on_record_added)
+            events.unsubscribe('category_color_changed', on_category_color_changed)
+            plt.close(heat_fig)
+
+    window.bind('<Destroy>', on_destroy)
 
     # Initialize Visualization
     update_visualization()
+
+    return window